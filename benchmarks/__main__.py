@@ -0,0 +1,193 @@
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Optional
+
+import click
+from click.core import Context
+
+DEFAULT_SIZES = "10,100,1000,10000,100000"
+DEFAULT_VALUE_SIZES = "32,1024,32768,1048576"
+
+
+def _parse_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item]
+
+
+@click.group(help="Benchmarks of the keyring implementations")
+def cli() -> None:
+    pass
+
+
+@cli.command("run", help="Run the benchmarks and write the results as JSON")
+@click.option("--sizes", default=DEFAULT_SIZES, show_default=True)
+@click.option("--value-sizes", default=DEFAULT_VALUE_SIZES, show_default=True)
+@click.option(
+    "--max-bytes",
+    default=64 * 1024 * 1024,
+    show_default=True,
+    type=int,
+    help="Skip cases whose keyring holds more secret data than this",
+)
+@click.option(
+    "--backend",
+    "backends",
+    multiple=True,
+    type=click.Choice(["secrets_manager", "secrets_manager_tpm"]),
+    help="Backends to benchmark (default: all)",
+)
+@click.option("--operation", "operations", multiple=True, help="Operations to run")
+@click.option("--repeat", default=3, show_default=True, type=click.IntRange(min=1))
+@click.option(
+    "-o",
+    "--output",
+    default="benchmark-results.json",
+    show_default=True,
+    type=click.Path(path_type=Path),
+)
+@click.option(
+    "--compare",
+    "baseline",
+    type=click.Path(exists=True, path_type=Path),
+    help="Baseline results to compare against",
+)
+@click.option("--threshold", default=0.2, show_default=True, type=float)
+@click.pass_context
+def run(
+    ctx: Context,
+    sizes: str,
+    value_sizes: str,
+    max_bytes: int,
+    backends: List[str],
+    operations: List[str],
+    repeat: int,
+    output: Path,
+    baseline: Optional[Path],
+    threshold: float,
+) -> None:
+    output = output.resolve()
+    baseline = baseline.resolve() if baseline else None
+    workdir = tempfile.TemporaryDirectory(prefix="secrets-manager-bench-")
+    os.chdir(workdir.name)
+
+    from benchmarks import suite
+
+    results = list(suite.run_kdf(repeat))
+    for result in suite.run_compression(repeat):
+        click.echo(
+            f"{result['backend']:<36} {result['operation']:<7} "
+            f"{result['median'] * 1000:10.2f} ms {result['size']:>10} B",
+            err=True,
+        )
+        results.append(result)
+    for result in suite.run_durability(repeat):
+        click.echo(
+            f"{result['backend']:<28} {result['operation']:<12} "
+            f"{result['writes_per_second']:10.0f} writes/s",
+            err=True,
+        )
+        results.append(result)
+    for result in suite.run_namespace(repeat):
+        click.echo(
+            f"{result['backend']:<20} {result['operation']:<16} "
+            f"{result['secrets']:>7}  {result['median'] * 1000:10.3f} ms",
+            err=True,
+        )
+        results.append(result)
+    for result in suite.run_container(repeat):
+        click.echo(
+            f"{result['backend']:<20} {result['operation']:<16} "
+            f"{result['secrets']:>7} x {result['value_size']:>8} B  "
+            f"{result['median'] * 1000:10.3f} ms {result['size']:>10} B",
+            err=True,
+        )
+        results.append(result)
+    for name in backends or list(suite.BACKENDS):
+        backend = suite.BACKENDS[name]()
+        for secrets, value_size in suite.cases(
+            _parse_list(sizes), _parse_list(value_sizes), max_bytes
+        ):
+            for result in suite.run_case(
+                backend,
+                secrets,
+                value_size,
+                list(operations or suite.OPERATIONS),
+                repeat,
+            ):
+                click.echo(
+                    f"{result['backend']:<20} {result['operation']:<7} "
+                    f"{result['secrets']:>7} x {result['value_size']:>8} B  "
+                    f"{result['median'] * 1000:10.2f} ms",
+                    err=True,
+                )
+                results.append(result)
+    workdir.cleanup()
+
+    report = {
+        "meta": {
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        },
+        "results": results,
+    }
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    if baseline is not None:
+        ctx.invoke(compare, baseline=baseline, current=output, threshold=threshold)
+
+
+@cli.command("compare", help="Compare results against a baseline")
+@click.argument("baseline", type=click.Path(exists=True, path_type=Path))
+@click.argument("current", type=click.Path(exists=True, path_type=Path))
+@click.option("--threshold", default=0.2, show_default=True, type=float)
+@click.pass_context
+def compare(ctx: Context, baseline: Path, current: Path, threshold: float) -> None:
+    from benchmarks import suite
+
+    with open(baseline) as f:
+        baseline_results = json.load(f)["results"]
+    with open(current) as f:
+        current_results = json.load(f)["results"]
+
+    regressions = suite.compare(baseline_results, current_results, threshold)
+    for previous, result, ratio in regressions:
+        click.echo(
+            f"Regression: {result['backend']} {result['operation']} "
+            f"{result['secrets']} x {result['value_size']} B: "
+            f"{previous['median'] * 1000:.2f} ms -> {result['median'] * 1000:.2f} ms "
+            f"({ratio:.2f}x)"
+        )
+    if regressions:
+        ctx.exit(1)
+    click.echo("No regressions.")
+
+
+@cli.command("imports", help="Check the imports of commands that need no crypto")
+@click.option("--repeat", default=3, show_default=True, type=click.IntRange(min=1))
+@click.pass_context
+def imports(ctx: Context, repeat: int) -> None:
+    from benchmarks import imports as import_check
+
+    failed = False
+    with tempfile.TemporaryDirectory(prefix="secrets-manager-bench-") as store:
+        for command in import_check.FAST_PATHS:
+            measurements = [
+                import_check.measure(command, Path(store)) for _ in range(repeat)
+            ]
+            import_ms = min(import_ms for import_ms, _ in measurements)
+            imported = measurements[0][1]
+            status = f"imports {', '.join(imported)}" if imported else "ok"
+            failed = failed or bool(imported)
+            click.echo(f"{' '.join(command):<40} {import_ms:8.2f} ms  {status}")
+    if failed:
+        ctx.exit(1)
+
+
+if __name__ == "__main__":
+    cli()
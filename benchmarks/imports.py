@@ -0,0 +1,91 @@
+import importlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, Final, List, Tuple
+
+FAST_PATHS: Final[List[Tuple[str, ...]]] = [
+    ("secrets_manager", "--help"),
+    ("secrets_manager", "keyring", "--help"),
+    ("secrets_manager", "keyring", "list"),
+    ("secrets_manager_tpm", "--help"),
+    ("secrets_manager_tpm", "keyring", "--help"),
+    ("secrets_manager_tpm", "keyring", "list"),
+]
+HEAVY_MODULES: Final[List[str]] = [
+    "cryptography",
+    "tpm2_pytss",
+    "multiprocessing",
+    "concurrent.futures",
+    "secrets_manager.crypto",
+    "secrets_manager.keyring",
+    "secrets_manager.agent",
+    "secrets_manager_tpm.keyring",
+    "secrets_manager_tpm.tpm",
+]
+
+_DRIVER: Final[str] = """
+import json, runpy, sys
+package, output = sys.argv[1], sys.argv[2]
+sys.argv = [package, *sys.argv[3:]]
+try:
+    runpy.run_module(package, run_name="__main__", alter_sys=True)
+except SystemExit:
+    pass
+with open(output, "w") as f:
+    json.dump(sorted(sys.modules), f)
+"""
+
+
+def subcommand_modules(package: str) -> Dict[str, str]:
+    cli = importlib.import_module(f"{package}.cli")
+    return {name: path.split(":")[0] for name, (path, _) in cli.COMMANDS.items()}
+
+
+def forbidden_modules(command: Tuple[str, ...]) -> List[str]:
+    package, *args = command
+    invoked = args[0] if args else None
+    subcommands = subcommand_modules(package)
+    return HEAVY_MODULES + [
+        module for name, module in subcommands.items() if name != invoked
+    ]
+
+
+def _import_time(stderr: str) -> float:
+    total = 0
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us = line.split(":", 1)[1].split("|")[0].strip()
+        if self_us.isdigit():
+            total += int(self_us)
+    return total / 1000
+
+
+def measure(command: Tuple[str, ...], store: Path) -> Tuple[float, List[str]]:
+    package, *args = command
+    with tempfile.NamedTemporaryFile(suffix=".json") as output:
+        process = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", _DRIVER, package, output.name]
+            + args,
+            env={
+                **os.environ,
+                "PYTHONPATH": os.pathsep.join(path for path in sys.path if path),
+                "SECRETS_MANAGER_STORE": str(store),
+            },
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=True,
+            check=True,
+        )
+        with open(output.name) as f:
+            modules = set(json.load(f))
+    imported = [
+        module
+        for module in forbidden_modules(command)
+        if any(name == module or name.startswith(module + ".") for name in modules)
+    ]
+    return _import_time(process.stderr), imported
@@ -0,0 +1,426 @@
+import json
+import os
+import pickle
+import statistics
+import time
+from typing import Any, Callable, Dict, Final, Iterator, List, Protocol, Tuple
+
+from secrets_manager.compression import available_compressions, compression_params
+from secrets_manager.crypto import (
+    CIPHER_AES_GCM,
+    CIPHER_FERNET,
+    KDF_BACKENDS,
+    default_kdf,
+    generate_key,
+)
+from secrets_manager.fileformat import (
+    BACKEND,
+    COMPRESSION_NONE,
+    FORMAT_LOG,
+    FORMAT_RECORDS,
+    pack_mapping,
+    pack_preamble,
+    unpack_header,
+    unpack_mapping,
+)
+from secrets_manager.keyring import Keyring, KeyringNotFoundError
+from secrets_manager.locking import DURABILITIES
+from secrets_manager.store import keyring_path
+from secrets_manager_tpm import tpm
+from secrets_manager_tpm.keyring import Keyring as TpmKeyring
+from secrets_manager_tpm.keyring import KeyringNotFoundError as TpmKeyringNotFoundError
+from secrets_manager_tpm.software import SoftwareFapi
+
+PASSWORD: Final[str] = "benchmark"
+OPERATIONS: Final[List[str]] = [
+    "create",
+    "open",
+    "get",
+    "add",
+    "update",
+    "remove",
+    "list",
+]
+COMPRESSION_SECRETS: Final[int] = 1000
+NAMESPACE_SECRETS: Final[int] = 20_000
+DURABILITY_WRITES: Final[int] = 200
+COMMIT_WINDOW: Final[float] = 0.01
+NAMESPACE_PREFIX: Final[str] = "prod/service-7/"
+CONTAINER_CASES: Final[List[Tuple[int, int]]] = [
+    (100, 32),
+    (10_000, 32),
+    (10_000, 1024),
+]
+COMPRESSION_STORAGES: Final[Dict[str, int]] = {
+    "records": FORMAT_RECORDS,
+    "log": FORMAT_LOG,
+}
+
+
+class Backend(Protocol):
+    name: str
+
+    def create(self, keyring: str) -> None: ...
+
+    def open(self, keyring: str, read_only: bool = False) -> Any: ...
+
+    def remove(self, keyring: str) -> None: ...
+
+
+class SoftwareBackend:
+    name = "secrets_manager"
+
+    def create(self, keyring: str) -> None:
+        Keyring.create_keyring(keyring, PASSWORD.encode())
+
+    def open(self, keyring: str, read_only: bool = False) -> Any:
+        return Keyring(keyring, PASSWORD, read_only=read_only)
+
+    def remove(self, keyring: str) -> None:
+        _remove(keyring)
+
+
+class TpmBackend:
+    name = "secrets_manager_tpm"
+
+    def __init__(self, latency: float = 0.0) -> None:
+        tpm.set_provider(lambda: SoftwareFapi(latency=latency))
+
+    def create(self, keyring: str) -> None:
+        TpmKeyring.create_keyring(keyring, PASSWORD.encode(), False)
+
+    def open(self, keyring: str, read_only: bool = False) -> Any:
+        return TpmKeyring(keyring, PASSWORD.encode(), read_only)
+
+    def remove(self, keyring: str) -> None:
+        try:
+            TpmKeyring.remove_keyring(keyring)
+        except TpmKeyringNotFoundError:
+            pass
+
+
+BACKENDS: Final[Dict[str, Callable[[], Backend]]] = {
+    SoftwareBackend.name: SoftwareBackend,
+    TpmBackend.name: TpmBackend,
+}
+
+
+def _value(i: int, value_size: int) -> str:
+    return str(i).rjust(value_size, "x")
+
+
+def _populate(backend: Backend, keyring: str, secrets: int, value_size: int) -> None:
+    backend.create(keyring)
+    with backend.open(keyring) as instance:
+        for i in range(secrets):
+            instance.add_secret(f"secret-{i}", _value(i, value_size))
+
+
+def _remove(keyring: str) -> None:
+    try:
+        Keyring.remove_keyring(keyring)
+    except KeyringNotFoundError:
+        pass
+
+
+def _measure(
+    backend: Backend, operation: str, keyring: str, value: str, counter: int
+) -> float:
+    if operation == "create":
+        name = f"{keyring}-create-{counter}"
+        start = time.perf_counter()
+        backend.create(name)
+        elapsed = time.perf_counter() - start
+        backend.remove(name)
+        return elapsed
+
+    if operation == "remove":
+        with backend.open(keyring) as instance:
+            instance.add_secret(f"removed-{counter}", value)
+
+    start = time.perf_counter()
+    with backend.open(keyring, operation in ("open", "get", "list")) as instance:
+        if operation == "get":
+            instance.get_secret("secret-0")
+        elif operation == "add":
+            instance.add_secret(f"added-{counter}", value)
+        elif operation == "update":
+            instance.update_secret("secret-0", value)
+        elif operation == "remove":
+            instance.remove_secret(f"removed-{counter}")
+        elif operation == "list":
+            instance.list_secrets()
+    return time.perf_counter() - start
+
+
+def cases(
+    sizes: List[int], value_sizes: List[int], max_bytes: int
+) -> Iterator[Tuple[int, int]]:
+    for secrets in sizes:
+        for value_size in value_sizes:
+            if secrets * value_size <= max_bytes:
+                yield secrets, value_size
+
+
+def run_kdf(repeat: int) -> Iterator[Dict[str, Any]]:
+    for algorithm in KDF_BACKENDS:
+        kdf = default_kdf(algorithm)
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            generate_key(PASSWORD.encode(), os.urandom(16), kdf)
+            timings.append(time.perf_counter() - start)
+        yield _result("crypto", f"kdf-{algorithm}", 0, 0, timings)
+
+
+def _config(i: int) -> str:
+    return json.dumps(
+        {
+            "service": f"service-{i}",
+            "replicas": [
+                {"host": f"db-{i}-{j}.internal", "port": 5432, "tls": True}
+                for j in range(24)
+            ],
+        }
+    )
+
+
+def run_compression(repeat: int) -> Iterator[Dict[str, Any]]:
+    variants = [(CIPHER_FERNET, COMPRESSION_NONE)] + [
+        (CIPHER_AES_GCM, algorithm) for algorithm in available_compressions()
+    ]
+    value_size = len(_config(0))
+    for storage, version in COMPRESSION_STORAGES.items():
+        for cipher, algorithm in variants:
+            keyring = f"bench-compression-{storage}-{cipher}-{algorithm}"
+            name = f"compression-{storage}-{cipher}-{algorithm}"
+            Keyring.create_keyring(
+                keyring,
+                PASSWORD.encode(),
+                version,
+                compression=compression_params(algorithm),
+                cipher=cipher,
+            )
+            with Keyring(keyring, PASSWORD) as instance:
+                for i in range(COMPRESSION_SECRETS):
+                    instance.add_secret(f"secret-{i}", _config(i))
+                instance.compact()
+            with Keyring(keyring, PASSWORD, read_only=True) as instance:
+                key = instance.key
+
+            try:
+                for operation in ("open", "save"):
+                    timings = []
+                    for _ in range(repeat):
+                        start = time.perf_counter()
+                        with Keyring(keyring, None, key=key) as instance:
+                            for secret in instance.list_secrets():
+                                instance.get_secret(secret)
+                            if operation == "save":
+                                instance.update_secret("secret-0", _config(0))
+                                instance.compact()
+                        timings.append(time.perf_counter() - start)
+                    result = _result(
+                        name, operation, COMPRESSION_SECRETS, value_size, timings
+                    )
+                    result["size"] = os.path.getsize(keyring_path(keyring))
+                    yield result
+            finally:
+                _remove(keyring)
+
+
+def _timings(function: Callable[[], Any], repeat: int) -> List[float]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def run_container(repeat: int) -> Iterator[Dict[str, Any]]:
+    params = {"salt": os.urandom(16), "kdf": default_kdf(), "cipher": CIPHER_AES_GCM}
+    header = pack_preamble(FORMAT_RECORDS, params, BACKEND)
+    legacy_header = pickle.dumps(params)
+    headers: List[Tuple[str, str, Callable[[], Any], int]] = [
+        (
+            "pickle",
+            "header-serialize",
+            lambda: pickle.dumps(params),
+            len(legacy_header),
+        ),
+        (
+            "pickle",
+            "header-parse",
+            lambda: pickle.loads(legacy_header),
+            len(legacy_header),
+        ),
+        (
+            "container",
+            "header-serialize",
+            lambda: pack_preamble(FORMAT_RECORDS, params, BACKEND),
+            len(header),
+        ),
+        ("container", "header-parse", lambda: unpack_header(header), len(header)),
+    ]
+    for codec, operation, function, size in headers:
+        result = _result(codec, operation, 0, 0, _timings(function, repeat))
+        result["size"] = size
+        yield result
+
+    codecs: List[Tuple[str, Callable[[Any], bytes], Callable[[bytes], Any]]] = [
+        ("pickle", pickle.dumps, pickle.loads),
+        ("container", pack_mapping, unpack_mapping),
+    ]
+    for secrets, value_size in CONTAINER_CASES:
+        mapping = {f"secret-{i}": _value(i, value_size) for i in range(secrets)}
+        for codec, dumps, loads in codecs:
+            data = dumps(mapping)
+            for operation, function in (
+                ("serialize", lambda dumps=dumps, mapping=mapping: dumps(mapping)),
+                ("parse", lambda loads=loads, data=data: loads(data)),
+            ):
+                timings = _timings(function, repeat)
+                result = _result(codec, operation, secrets, value_size, timings)
+                result["size"] = len(data)
+                yield result
+
+
+def _namespaced(i: int) -> str:
+    environment = ("prod", "stage", "dev")[i % 3]
+    return (
+        f"{environment}/service-{i // 3 % 40}/component-{i // 120 % 50}/key-{i // 6000}"
+    )
+
+
+def run_namespace(repeat: int) -> Iterator[Dict[str, Any]]:
+    keyring = "bench-namespace"
+    Keyring.create_keyring(keyring, PASSWORD.encode(), FORMAT_RECORDS)
+    with Keyring(keyring, PASSWORD) as instance:
+        for i in range(NAMESPACE_SECRETS):
+            instance.add_secret(_namespaced(i), "x")
+    with Keyring(keyring, PASSWORD, read_only=True) as instance:
+        key = instance.key
+
+    timings: Dict[str, List[float]] = {"scan": [], "index": [], "prefix": []}
+    try:
+        for _ in range(repeat):
+            with Keyring(keyring, None, read_only=True, key=key) as instance:
+                start = time.perf_counter()
+                for name in instance.list_secrets():
+                    name.startswith(NAMESPACE_PREFIX)
+                timings["scan"].append(time.perf_counter() - start)
+
+                for operation in ("index", "prefix"):
+                    start = time.perf_counter()
+                    instance.list_names(NAMESPACE_PREFIX, 1)
+                    timings[operation].append(time.perf_counter() - start)
+    finally:
+        _remove(keyring)
+
+    for operation, operation_timings in timings.items():
+        yield _result(
+            "namespace", f"list-{operation}", NAMESPACE_SECRETS, 0, operation_timings
+        )
+
+
+def run_durability(repeat: int) -> Iterator[Dict[str, Any]]:
+    keyring = "bench-durability"
+    Keyring.create_keyring(keyring, PASSWORD.encode(), FORMAT_LOG)
+    with Keyring(keyring, PASSWORD, read_only=True) as instance:
+        key = instance.key
+
+    try:
+        for durability in DURABILITIES:
+            for commit_window in (None, COMMIT_WINDOW):
+                timings = []
+                for counter in range(repeat):
+                    with Keyring(
+                        keyring,
+                        None,
+                        key=key,
+                        durability=durability,
+                        commit_window=commit_window,
+                    ) as instance:
+                        start = time.perf_counter()
+                        for i in range(DURABILITY_WRITES):
+                            instance.add_secret(f"secret-{counter}-{i}", "x")
+                            instance.commit()
+                        instance.save()
+                        timings.append(time.perf_counter() - start)
+                        for name in instance.list_secrets():
+                            instance.remove_secret(name)
+                mode = "commit" if commit_window is None else "group-commit"
+                result = _result(
+                    f"durability-{durability}", mode, DURABILITY_WRITES, 1, timings
+                )
+                result["writes_per_second"] = DURABILITY_WRITES / result["median"]
+                yield result
+    finally:
+        _remove(keyring)
+
+
+def run_case(
+    backend: Backend,
+    secrets: int,
+    value_size: int,
+    operations: List[str],
+    repeat: int,
+) -> Iterator[Dict[str, Any]]:
+    keyring = f"bench-{backend.name}-{secrets}-{value_size}"
+    value = _value(secrets, value_size)
+    _populate(backend, keyring, secrets, value_size)
+    try:
+        for operation in operations:
+            timings = [
+                _measure(backend, operation, keyring, value, counter)
+                for counter in range(repeat)
+            ]
+            yield _result(backend.name, operation, secrets, value_size, timings)
+    finally:
+        backend.remove(keyring)
+
+
+def _result(
+    backend: str,
+    operation: str,
+    secrets: int,
+    value_size: int,
+    timings: List[float],
+) -> Dict[str, Any]:
+    return {
+        "backend": backend,
+        "operation": operation,
+        "secrets": secrets,
+        "value_size": value_size,
+        "repeat": len(timings),
+        "median": statistics.median(timings),
+        "min": min(timings),
+        "max": max(timings),
+    }
+
+
+def result_key(result: Dict[str, Any]) -> Tuple[str, str, int, int]:
+    return (
+        result["backend"],
+        result["operation"],
+        result["secrets"],
+        result["value_size"],
+    )
+
+
+def compare(
+    baseline: List[Dict[str, Any]],
+    current: List[Dict[str, Any]],
+    threshold: float,
+) -> List[Tuple[Dict[str, Any], Dict[str, Any], float]]:
+    baseline_results = {result_key(result): result for result in baseline}
+    regressions = []
+    for result in current:
+        previous = baseline_results.get(result_key(result))
+        if previous is None or previous["median"] == 0:
+            continue
+        ratio = result["median"] / previous["median"]
+        if ratio > 1 + threshold:
+            regressions.append((previous, result, ratio))
+    return regressions
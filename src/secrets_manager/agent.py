@@ -0,0 +1,246 @@
+import json
+import os
+import socket
+import socketserver
+import stat
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Final, Optional, Tuple
+
+from secrets_manager.profiling import phase
+
+AGENT_SOCKET_ENV: Final[str] = "SECRETS_MANAGER_AGENT_SOCK"
+AGENT_TTL: Final[int] = 900
+AGENT_MAX_ENTRIES: Final[int] = 64
+AGENT_TIMEOUT: Final[float] = 2.0
+PRIVATE_MODE_MASK: Final[int] = 0o077
+
+
+class AgentNotRunningError(Exception):
+    def __init__(self) -> None:
+        pass
+
+
+class AgentProtocolError(Exception):
+    def __init__(self) -> None:
+        pass
+
+
+class AgentAlreadyRunningError(Exception):
+    def __init__(self) -> None:
+        pass
+
+
+class AgentSocketInsecureError(Exception):
+    def __init__(self, path: Path) -> None:
+        self.path = path
+
+
+def default_socket_path() -> Path:
+    env = os.environ.get(AGENT_SOCKET_ENV)
+    if env:
+        return Path(env)
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return Path(runtime_dir) / "secrets-manager" / "agent.sock"
+    return Path(f"/tmp/secrets-manager-{os.getuid()}") / "agent.sock"
+
+
+def _check_private(
+    path: Path, is_type: Callable[[int], bool], mask: int = PRIVATE_MODE_MASK
+) -> None:
+    info = os.lstat(path)
+    if not is_type(info.st_mode) or info.st_uid != os.getuid() or info.st_mode & mask:
+        raise AgentSocketInsecureError(path)
+
+
+def check_socket(path: Path) -> None:
+    _check_private(path.parent, stat.S_ISDIR)
+    _check_private(path, stat.S_ISSOCK)
+
+
+def _alive(path: Path) -> bool:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+        try:
+            conn.connect(str(path))
+        except OSError:
+            return False
+    return True
+
+
+def peer_uid(conn: socket.socket) -> Optional[int]:
+    if not hasattr(socket, "SO_PEERCRED"):
+        return None
+    creds = conn.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, 12)
+    return int.from_bytes(creds[4:8], "little")
+
+
+class KeyCache:
+    def __init__(self, ttl: int, max_entries: int) -> None:
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._keys: OrderedDict[Tuple[str, bytes], Tuple[bytes, float]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def expire(self) -> None:
+        deadline = time.monotonic() - self._ttl
+        for entry, (_, last_used) in list(self._keys.items()):
+            if last_used < deadline:
+                del self._keys[entry]
+
+    def get(self, keyring: str, salt: bytes) -> Optional[bytes]:
+        self.expire()
+        entry = (keyring, salt)
+        if entry not in self._keys:
+            return None
+        key, _ = self._keys[entry]
+        self._keys[entry] = (key, time.monotonic())
+        self._keys.move_to_end(entry)
+        return key
+
+    def add(self, keyring: str, salt: bytes, key: bytes) -> None:
+        entry = (keyring, salt)
+        self._keys[entry] = (key, time.monotonic())
+        self._keys.move_to_end(entry)
+        while len(self._keys) > self._max_entries:
+            self._keys.popitem(last=False)
+
+    def forget(self, keyring: str) -> int:
+        entries = [entry for entry in self._keys if entry[0] == keyring]
+        for entry in entries:
+            del self._keys[entry]
+        return len(entries)
+
+    def clear(self) -> int:
+        count = len(self._keys)
+        self._keys.clear()
+        return count
+
+
+class _AgentHandler(socketserver.StreamRequestHandler):
+    server: "AgentServer"
+
+    def handle(self) -> None:
+        uid = peer_uid(self.connection)
+        if uid is not None and uid != os.getuid():
+            return
+        line = self.rfile.readline()
+        if not line:
+            return
+        try:
+            request = json.loads(line)
+            response = self.server.dispatch(request)
+        except (ValueError, KeyError, TypeError):
+            response = {"ok": False, "error": "bad request"}
+        self.wfile.write(json.dumps(response).encode() + b"\n")
+
+
+class AgentServer(socketserver.UnixStreamServer):
+    def __init__(self, path: Path, ttl: int, max_entries: int) -> None:
+        self.cache = KeyCache(ttl, max_entries)
+        path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        _check_private(path.parent, stat.S_ISDIR)
+        if os.path.lexists(path):
+            check_socket(path)
+            if _alive(path):
+                raise AgentAlreadyRunningError
+            path.unlink()
+        old_umask = os.umask(0o177)
+        try:
+            super().__init__(str(path), _AgentHandler)
+        finally:
+            os.umask(old_umask)
+        self._path = path
+
+    def service_actions(self) -> None:
+        self.cache.expire()
+
+    def server_close(self) -> None:
+        super().server_close()
+        self.cache.clear()
+        if self._path.exists():
+            self._path.unlink()
+
+    def dispatch(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        op = request["op"]
+        if op == "get":
+            key = self.cache.get(request["keyring"], bytes.fromhex(request["salt"]))
+            if key is None:
+                return {"ok": False}
+            return {"ok": True, "key": key.decode()}
+        elif op == "add":
+            self.cache.add(
+                request["keyring"],
+                bytes.fromhex(request["salt"]),
+                request["key"].encode(),
+            )
+            return {"ok": True}
+        elif op == "forget":
+            return {"ok": True, "count": self.cache.forget(request["keyring"])}
+        elif op == "lock":
+            return {"ok": True, "count": self.cache.clear()}
+        return {"ok": False, "error": "unknown operation"}
+
+
+def serve(
+    path: Path, ttl: int = AGENT_TTL, max_entries: int = AGENT_MAX_ENTRIES
+) -> None:
+    with AgentServer(path, ttl, max_entries) as server:
+        try:
+            server.serve_forever(poll_interval=1.0)
+        except KeyboardInterrupt:
+            pass
+
+
+def _request(request: Dict[str, Any], path: Optional[Path] = None) -> Dict[str, Any]:
+    path = path or default_socket_path()
+    try:
+        check_socket(path)
+        with phase("agent"), socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+            conn.settimeout(AGENT_TIMEOUT)
+            conn.connect(str(path))
+            uid = peer_uid(conn)
+            if uid is not None and uid != os.getuid():
+                raise AgentSocketInsecureError(path)
+            conn.sendall(json.dumps(request).encode() + b"\n")
+            with conn.makefile("rb") as f:
+                line = f.readline()
+    except OSError:
+        raise AgentNotRunningError
+    try:
+        response: Dict[str, Any] = json.loads(line)
+    except ValueError:
+        raise AgentProtocolError
+    return response
+
+
+def get_key(keyring: str, salt: bytes) -> Optional[bytes]:
+    try:
+        response = _request({"op": "get", "keyring": keyring, "salt": salt.hex()})
+    except (AgentNotRunningError, AgentProtocolError, AgentSocketInsecureError):
+        return None
+    if not response.get("ok"):
+        return None
+    return str(response["key"]).encode()
+
+
+def add_key(keyring: str, salt: bytes, key: bytes) -> None:
+    try:
+        _request(
+            {"op": "add", "keyring": keyring, "salt": salt.hex(), "key": key.decode()}
+        )
+    except (AgentNotRunningError, AgentProtocolError, AgentSocketInsecureError):
+        pass
+
+
+def forget(keyring: str) -> int:
+    response = _request({"op": "forget", "keyring": keyring})
+    return int(response.get("count", 0))
+
+
+def lock() -> int:
+    response = _request({"op": "lock"})
+    return int(response.get("count", 0))
@@ -0,0 +1,84 @@
+import json
+from typing import Any, Dict, Final, Iterable, Iterator, List, Mapping, Protocol, Type
+
+OPERATIONS: Final[List[str]] = ["add", "update", "get", "list", "remove"]
+
+
+class SecretStore(Protocol):
+    def add_secret(self, name: str, value: str) -> None: ...
+
+    def update_secret(self, name: str, value: str) -> None: ...
+
+    def get_secret(self, name: str) -> str: ...
+
+    def list_secrets(self) -> List[str]: ...
+
+    def remove_secret(self, name: str) -> None: ...
+
+
+class BatchOperationError(Exception):
+    def __init__(self, message: str) -> None:
+        self.message = message
+
+
+def parse(line: str) -> Dict[str, Any]:
+    try:
+        operation = json.loads(line)
+    except ValueError:
+        raise BatchOperationError("Invalid JSON.")
+    if not isinstance(operation, dict):
+        raise BatchOperationError("Operation is not an object.")
+    return operation
+
+
+def apply(store: SecretStore, operation: Dict[str, Any]) -> Dict[str, Any]:
+    op = operation.get("op")
+    if op not in OPERATIONS:
+        raise BatchOperationError("Unknown operation.")
+    if op == "list":
+        return {"secrets": store.list_secrets()}
+
+    name = operation.get("name")
+    if not isinstance(name, str):
+        raise BatchOperationError("Missing secret name.")
+    if op == "get":
+        return {"value": store.get_secret(name)}
+    elif op == "remove":
+        store.remove_secret(name)
+        return {}
+
+    value = operation.get("value")
+    if not isinstance(value, str):
+        raise BatchOperationError("Missing secret value.")
+    if op == "add":
+        store.add_secret(name, value)
+    else:
+        store.update_secret(name, value)
+    return {}
+
+
+def run(
+    store: SecretStore,
+    lines: Iterable[str],
+    errors: Mapping[Type[Exception], str],
+    stop_on_error: bool = False,
+) -> Iterator[Dict[str, Any]]:
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        result: Dict[str, Any] = {"line": number}
+        try:
+            operation = parse(line)
+            result["op"] = operation.get("op")
+            if "name" in operation:
+                result["name"] = operation["name"]
+            result.update(apply(store, operation))
+            result["ok"] = True
+        except BatchOperationError as e:
+            result.update(ok=False, error=e.message)
+        except tuple(errors) as e:
+            message = next(msg for cls, msg in errors.items() if isinstance(e, cls))
+            result.update(ok=False, error=message)
+        yield result
+        if stop_on_error and not result["ok"]:
+            return
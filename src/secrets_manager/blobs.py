@@ -0,0 +1,148 @@
+import os
+import shutil
+import struct
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Final, Iterator, Optional
+
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+from secrets_manager.crypto import generate_data_key
+from secrets_manager.locking import sync_directory, sync_file
+from secrets_manager.profiling import phase
+
+BLOB_MAGIC: Final[bytes] = b"SMBL"
+BLOB_VERSION: Final[int] = 1
+CHUNK_SIZE: Final[int] = 64 * 1024
+TAG_SIZE: Final[int] = 16
+
+_HEADER: Final[struct.Struct] = struct.Struct(">4sBI7s")
+_NONCE: Final[struct.Struct] = struct.Struct(">7sI?")
+
+BlobRef = Dict[str, Any]
+
+
+class BlobNotFoundError(Exception):
+    def __init__(self) -> None:
+        pass
+
+
+class BlobInvalidError(Exception):
+    def __init__(self) -> None:
+        pass
+
+
+def is_blob(value: Any) -> bool:
+    return isinstance(value, dict) and "blob" in value
+
+
+def new_blob() -> BlobRef:
+    return {"blob": os.urandom(16).hex(), "key": generate_data_key(), "size": 0}
+
+
+def _nonce(prefix: bytes, counter: int, last: bool) -> bytes:
+    return _NONCE.pack(prefix, counter, last)
+
+
+def _read(source: BinaryIO, size: int) -> bytes:
+    data = source.read(size)
+    while data and len(data) < size:
+        more = source.read(size - len(data))
+        if not more:
+            break
+        data += more
+    return data
+
+
+def write_blob(
+    directory: Path,
+    blob: BlobRef,
+    source: BinaryIO,
+    chunk_size: int = CHUNK_SIZE,
+    durability: Optional[str] = None,
+) -> BlobRef:
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / blob["blob"]
+    path_tmp = path.with_name(f".{path.name}.tmp")
+    aead = AESGCM(blob["key"])
+    header = _HEADER.pack(BLOB_MAGIC, BLOB_VERSION, chunk_size, os.urandom(7))
+    _, _, _, prefix = _HEADER.unpack(header)
+
+    size = 0
+    try:
+        with open(path_tmp, "wb") as f:
+            f.write(header)
+            chunk = _read(source, chunk_size)
+            counter = 0
+            while True:
+                following = _read(source, chunk_size) if chunk else b""
+                last = not following
+                nonce = _nonce(prefix, counter, last)
+                with phase("encrypt", len(chunk)):
+                    sealed = aead.encrypt(nonce, chunk, header)
+                f.write(sealed)
+                size += len(chunk)
+                if last:
+                    break
+                chunk = following
+                counter += 1
+            f.flush()
+            sync_file(f.fileno(), durability)
+        os.replace(path_tmp, path)
+        sync_directory(directory, durability)
+    except BaseException:
+        path_tmp.unlink(missing_ok=True)
+        raise
+    return {**blob, "size": size}
+
+
+def iter_blob(directory: Path, blob: BlobRef) -> Iterator[bytes]:
+    try:
+        f = open(directory / blob["blob"], "rb")
+    except FileNotFoundError:
+        raise BlobNotFoundError
+
+    with f:
+        header = f.read(_HEADER.size)
+        try:
+            magic, version, chunk_size, prefix = _HEADER.unpack(header)
+        except struct.error:
+            raise BlobInvalidError
+        if magic != BLOB_MAGIC or version != BLOB_VERSION:
+            raise BlobInvalidError
+
+        aead = AESGCM(blob["key"])
+        chunk = f.read(chunk_size + TAG_SIZE)
+        counter = 0
+        while True:
+            following = f.read(chunk_size + TAG_SIZE)
+            last = not following
+            try:
+                with phase("decrypt", len(chunk)):
+                    opened = aead.decrypt(_nonce(prefix, counter, last), chunk, header)
+            except InvalidTag:
+                raise BlobInvalidError
+            yield opened
+            if last:
+                return
+            chunk = following
+            counter += 1
+
+
+def save_file(path: Path, chunks: Iterator[bytes]) -> None:
+    path_tmp = path.with_name(f".{path.name}.tmp")
+    fd = os.open(path_tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    try:
+        with open(fd, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path_tmp, path)
+    except BaseException:
+        path_tmp.unlink(missing_ok=True)
+        raise
+
+
+def remove_blobs(directory: Path) -> None:
+    shutil.rmtree(directory, ignore_errors=True)
@@ -0,0 +1,92 @@
+from pathlib import Path
+from typing import Optional
+
+import click
+from click.core import Context
+
+from secrets_manager import agent as key_agent
+from secrets_manager.agent import (
+    AGENT_MAX_ENTRIES,
+    AGENT_SOCKET_ENV,
+    AGENT_TTL,
+    AgentAlreadyRunningError,
+    AgentNotRunningError,
+    AgentProtocolError,
+    AgentSocketInsecureError,
+)
+from secrets_manager.keyring import Keyring
+
+
+@click.group("agent", help="Unlock agent caching derived keyring keys")
+def agent() -> None:
+    pass
+
+
+@agent.command("start", help="Run the agent in the foreground")
+@click.option(
+    "-s",
+    "--socket",
+    "socket_path",
+    required=False,
+    type=click.Path(path_type=Path),
+    help=f"Path of the agent socket (default: ${AGENT_SOCKET_ENV})",
+)
+@click.option(
+    "--ttl",
+    default=AGENT_TTL,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help="Seconds an unused key stays cached",
+)
+@click.option(
+    "--max-entries",
+    default=AGENT_MAX_ENTRIES,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help="Maximum number of cached keys",
+)
+@click.pass_context
+def agent_start(
+    ctx: Context, socket_path: Optional[Path], ttl: int, max_entries: int
+) -> None:
+    path = socket_path or key_agent.default_socket_path()
+    click.echo(f"{AGENT_SOCKET_ENV}={path}; export {AGENT_SOCKET_ENV};")
+    try:
+        key_agent.serve(path, ttl, max_entries)
+    except AgentAlreadyRunningError:
+        click.echo("Error: Agent already running.", err=True)
+        ctx.exit(1)
+    except AgentSocketInsecureError as e:
+        click.echo(f"Error: {e.path} is not private to this user.", err=True)
+        ctx.exit(1)
+
+
+@agent.command("lock", help="Remove all cached keys from the agent")
+@click.pass_context
+def agent_lock(ctx: Context) -> None:
+    try:
+        key_agent.lock()
+    except (AgentNotRunningError, AgentProtocolError):
+        click.echo("Error: Agent not running.", err=True)
+        ctx.exit(1)
+    except AgentSocketInsecureError as e:
+        click.echo(f"Error: {e.path} is not private to this user.", err=True)
+        ctx.exit(1)
+
+
+@agent.command("forget", help="Remove the cached keys of a keyring from the agent")
+@click.argument("name", required=True, type=str)
+@click.pass_context
+def agent_forget(ctx: Context, name: str) -> None:
+    try:
+        count = key_agent.forget(Keyring.agent_id(name))
+    except (AgentNotRunningError, AgentProtocolError):
+        click.echo("Error: Agent not running.", err=True)
+        ctx.exit(1)
+    except AgentSocketInsecureError as e:
+        click.echo(f"Error: {e.path} is not private to this user.", err=True)
+        ctx.exit(1)
+
+    if count == 0:
+        click.echo("Error: Keyring not cached by the agent.", err=True)
+        ctx.exit(1)
@@ -0,0 +1,50 @@
+import importlib
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+import click
+from click.core import Context
+from click.formatting import HelpFormatter
+
+LazyCommand = Tuple[str, str]
+
+
+class LazyGroup(click.Group):
+    def __init__(
+        self,
+        *args: Any,
+        lazy_commands: Optional[Mapping[str, LazyCommand]] = None,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self.lazy_commands: Dict[str, LazyCommand] = dict(lazy_commands or {})
+
+    def list_commands(self, ctx: Context) -> List[str]:
+        return sorted([*super().list_commands(ctx), *self.lazy_commands])
+
+    def get_command(self, ctx: Context, cmd_name: str) -> Optional[click.Command]:
+        if cmd_name not in self.lazy_commands:
+            return super().get_command(ctx, cmd_name)
+        import_path, _ = self.lazy_commands[cmd_name]
+        module_name, attribute = import_path.split(":")
+        command: click.Command = getattr(
+            importlib.import_module(module_name), attribute
+        )
+        return command
+
+    def format_commands(self, ctx: Context, formatter: HelpFormatter) -> None:
+        commands = []
+        for name in self.list_commands(ctx):
+            command: Optional[click.Command]
+            if name in self.lazy_commands:
+                command = click.Command(name, help=self.lazy_commands[name][1])
+            else:
+                command = super().get_command(ctx, name)
+            if command is not None and not command.hidden:
+                commands.append((name, command))
+        if not commands:
+            return
+
+        limit = formatter.width - 6 - max(len(name) for name, _ in commands)
+        rows = [(name, command.get_short_help_str(limit)) for name, command in commands]
+        with formatter.section("Commands"):
+            formatter.write_dl(rows)
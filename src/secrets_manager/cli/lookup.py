@@ -0,0 +1,119 @@
+import json
+import os
+from typing import Dict, Final, Optional, Tuple, Type
+
+import click
+from click.core import Context
+
+from secrets_manager import lookup
+from secrets_manager.keyring import (
+    KeyringFileInvalidError,
+    KeyringNotFoundError,
+    PasswordRequiredError,
+)
+from secrets_manager.locking import (
+    DEFAULT_LOCK_TIMEOUT,
+    LOCK_TIMEOUT_ENV,
+    LockTimeoutError,
+)
+from secrets_manager.lookup import (
+    KeyringLookupError,
+    ReferenceInvalidError,
+    SecretsNotFoundError,
+)
+from secrets_manager.store import KeyringNameInvalidError
+
+LOOKUP_ERRORS: Final[Dict[Type[Exception], str]] = {
+    KeyringNotFoundError: "Keyring {} not found.",
+    KeyringNameInvalidError: "Keyring name {} invalid.",
+    KeyringFileInvalidError: "Keyring {} file invalid",
+    LockTimeoutError: "Keyring {} is locked by another process.",
+    PasswordRequiredError: "Password required for keyring {}.",
+    ValueError: "Invalid password for keyring {}.",
+}
+
+
+@click.command(
+    "get",
+    help="Get secrets from several keyrings as a JSON object, "
+    "each reference being KEYRING/SECRET",
+)
+@click.argument("references", nargs=-1, required=True, type=str)
+@click.option(
+    "-p",
+    "--password",
+    required=False,
+    type=str,
+    help="Password of the keyrings, prompted per keyring if no agent holds its key",
+)
+@click.option(
+    "--password-fd",
+    required=False,
+    type=int,
+    help="Read the password from a file descriptor",
+)
+@click.option(
+    "--no-agent",
+    is_flag=True,
+    default=False,
+    help="Do not use the unlock agent",
+)
+@click.option(
+    "--lock-timeout",
+    type=click.FloatRange(min=0),
+    default=DEFAULT_LOCK_TIMEOUT,
+    show_default=True,
+    envvar=LOCK_TIMEOUT_ENV,
+    help="Seconds to wait for other processes using a keyring",
+)
+@click.option("--indent", type=click.IntRange(min=0), help="Indent the JSON output")
+@click.pass_context
+def get(
+    ctx: Context,
+    references: Tuple[str, ...],
+    password: Optional[str],
+    password_fd: Optional[int],
+    no_agent: bool,
+    lock_timeout: float,
+    indent: Optional[int],
+) -> None:
+    if password_fd is not None:
+        with os.fdopen(password_fd) as f:
+            password = f.readline().rstrip("\n")
+
+    try:
+        keyrings = lookup.group_references(references)
+    except ReferenceInvalidError as e:
+        click.echo(f"Error: Invalid reference {e.reference}.", err=True)
+        ctx.exit(1)
+
+    passwords = {}
+    if password is None:
+        for name in keyrings:
+            try:
+                if not no_agent and lookup.has_cached_key(name):
+                    continue
+            except (
+                KeyringNotFoundError,
+                KeyringNameInvalidError,
+                KeyringFileInvalidError,
+            ):
+                continue
+            passwords[name] = click.prompt(
+                f"Password for {name}", hide_input=True, type=str
+            )
+
+    try:
+        values = lookup.get_many(
+            references, password, passwords, not no_agent, lock_timeout
+        )
+    except KeyringLookupError as e:
+        for error, message in LOOKUP_ERRORS.items():
+            if isinstance(e.error, error):
+                click.echo(f"Error: {message.format(e.keyring)}", err=True)
+                ctx.exit(1)
+        raise e.error
+    except SecretsNotFoundError as e:
+        click.echo(f"Error: Secret not found: {', '.join(e.references)}", err=True)
+        ctx.exit(1)
+    click.echo(json.dumps(values, indent=indent))
@@ -0,0 +1,144 @@
+import os
+from pathlib import Path
+from typing import Optional, Tuple
+
+import click
+from click.core import Context
+
+from secrets_manager import server as secrets_server
+from secrets_manager.agent import AgentSocketInsecureError
+from secrets_manager.keyring import (
+    KeyringFileInvalidError,
+    KeyringNotFoundError,
+    PasswordRequiredError,
+)
+from secrets_manager.locking import LockTimeoutError
+from secrets_manager.server import (
+    SERVER_POLL_INTERVAL,
+    SERVER_SOCKET_ENV,
+    ServedKeyring,
+    ServerAlreadyRunningError,
+)
+from secrets_manager.store import KeyringNameInvalidError
+
+
+@click.command("serve", help="Serve secrets of unlocked keyrings over a local socket")
+@click.option(
+    "-k",
+    "--keyring",
+    "keyrings",
+    required=True,
+    multiple=True,
+    type=str,
+    help="Name of a keyring to serve, repeatable",
+)
+@click.option(
+    "-s",
+    "--socket",
+    "socket_path",
+    required=False,
+    type=click.Path(path_type=Path),
+    help=f"Path of the server socket (default: ${SERVER_SOCKET_ENV})",
+)
+@click.option(
+    "--password-fd",
+    required=False,
+    type=int,
+    help="Read the passwords from a file descriptor, one line per keyring",
+)
+@click.option(
+    "--no-agent",
+    is_flag=True,
+    default=False,
+    help="Do not use the unlock agent",
+)
+@click.option(
+    "--allow-uid",
+    "allowed_uids",
+    multiple=True,
+    type=int,
+    help="Also accept clients running as this user id, repeatable (needs --socket)",
+)
+@click.option(
+    "--allow-gid",
+    "allowed_gids",
+    multiple=True,
+    type=int,
+    help="Also accept clients running as this group id, repeatable (needs --socket)",
+)
+@click.option(
+    "--poll-interval",
+    default=SERVER_POLL_INTERVAL,
+    show_default=True,
+    type=click.FloatRange(min=0.01),
+    help="Seconds between checks of the keyring files for changes",
+)
+@click.pass_context
+def serve(
+    ctx: Context,
+    keyrings: Tuple[str, ...],
+    socket_path: Optional[Path],
+    password_fd: Optional[int],
+    no_agent: bool,
+    allowed_uids: Tuple[int, ...],
+    allowed_gids: Tuple[int, ...],
+    poll_interval: float,
+) -> None:
+    if (allowed_uids or allowed_gids) and socket_path is None:
+        click.echo("Error: --allow-uid and --allow-gid need --socket.", err=True)
+        ctx.exit(1)
+
+    passwords = None
+    if password_fd is not None:
+        with os.fdopen(password_fd) as f:
+            passwords = [line.rstrip("\n") for line in f]
+
+    served = []
+    for i, name in enumerate(keyrings):
+        password = passwords[i] if passwords and i < len(passwords) else None
+        try:
+            try:
+                served.append(ServedKeyring(name, password, not no_agent))
+            except PasswordRequiredError:
+                password = click.prompt(
+                    f"Password for {name}", hide_input=True, type=str
+                )
+                served.append(ServedKeyring(name, password, not no_agent))
+        except KeyringNotFoundError:
+            click.echo(f"Error: Keyring {name} not found.", err=True)
+            ctx.exit(1)
+        except KeyringNameInvalidError:
+            click.echo(f"Error: Keyring name {name} invalid.", err=True)
+            ctx.exit(1)
+        except KeyringFileInvalidError:
+            click.echo(f"Error: Keyring {name} file invalid", err=True)
+            ctx.exit(1)
+        except LockTimeoutError:
+            click.echo(f"Error: Keyring {name} is locked by another process.", err=True)
+            ctx.exit(1)
+        except ValueError:
+            click.echo(f"Error: Invalid password for keyring {name}.", err=True)
+            ctx.exit(1)
+
+    def reload_error(name: str, error: Exception) -> None:
+        click.echo(
+            f"Error: Keyring {name} could not be reloaded ({type(error).__name__}), "
+            "serving the previous secrets.",
+            err=True,
+        )
+
+    path = socket_path or secrets_server.default_socket_path()
+    click.echo(f"{SERVER_SOCKET_ENV}={path}; export {SERVER_SOCKET_ENV};")
+    try:
+        secrets_server.serve(
+            path, served, allowed_uids, allowed_gids, poll_interval, reload_error
+        )
+    except ServerAlreadyRunningError:
+        click.echo("Error: Server already running.", err=True)
+        ctx.exit(1)
+    except AgentSocketInsecureError as e:
+        click.echo(f"Error: {e.path} is not private to this user.", err=True)
+        ctx.exit(1)
+    except OSError as e:
+        click.echo(f"Error: Cannot create socket {path}: {e.strerror}.", err=True)
+        ctx.exit(1)
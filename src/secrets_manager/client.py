@@ -0,0 +1,103 @@
+import socket
+from pathlib import Path
+from types import TracebackType
+from typing import Any, Dict, Final, List, Literal, Optional, Self, Type
+
+from secrets_manager.keyring import KeyringNotFoundError, SecretNotFoundError
+from secrets_manager.server import (
+    ProtocolError,
+    default_socket_path,
+    recv_frame,
+    send_frame,
+)
+
+CLIENT_TIMEOUT: Final[float] = 5.0
+
+
+class ServerNotRunningError(Exception):
+    def __init__(self) -> None:
+        pass
+
+
+class ServerError(Exception):
+    def __init__(self, message: str) -> None:
+        self.message = message
+
+
+class Client:
+    def __init__(
+        self, path: Optional[Path] = None, timeout: float = CLIENT_TIMEOUT
+    ) -> None:
+        self._path = path or default_socket_path()
+        self._timeout = timeout
+        self._conn: Optional[socket.socket] = None
+
+    def connect(self) -> None:
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        conn.settimeout(self._timeout)
+        try:
+            conn.connect(str(self._path))
+        except OSError:
+            conn.close()
+            raise ServerNotRunningError
+        self._conn = conn
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def __enter__(self) -> Self:
+        self.connect()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        exc_tb: Optional[TracebackType],
+    ) -> Literal[False]:
+        self.close()
+        return False
+
+    def _request(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        if self._conn is None:
+            self.connect()
+        assert self._conn is not None
+        try:
+            send_frame(self._conn, request)
+            response = recv_frame(self._conn)
+        except (OSError, ProtocolError):
+            self.close()
+            raise ServerNotRunningError
+        if response is None:
+            self.close()
+            raise ServerNotRunningError
+
+        if not response.get("ok"):
+            error = response.get("error", "")
+            if error == "keyring not found":
+                raise KeyringNotFoundError
+            elif error == "secret not found":
+                raise SecretNotFoundError
+            raise ServerError(error)
+        return response
+
+    def keyrings(self) -> List[str]:
+        keyrings: List[str] = self._request({"op": "keyrings"})["keyrings"]
+        return keyrings
+
+    def get(self, keyring: str, name: str) -> str:
+        response = self._request({"op": "get", "keyring": keyring, "name": name})
+        return str(response["value"])
+
+    def get_many(self, keyring: str, names: List[str]) -> Dict[str, Optional[str]]:
+        response = self._request({"op": "get_many", "keyring": keyring, "names": names})
+        values: Dict[str, Optional[str]] = response["values"]
+        return values
+
+    def list(self, keyring: str) -> List[str]:
+        secrets: List[str] = self._request({"op": "list", "keyring": keyring})[
+            "secrets"
+        ]
+        return secrets
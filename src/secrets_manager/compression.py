@@ -0,0 +1,101 @@
+import zlib
+from typing import Any, Dict, Final, List, Mapping, Optional
+
+from secrets_manager.fileformat import (
+    COMPRESSION_NONE,
+    COMPRESSION_ZLIB,
+    COMPRESSION_ZSTD,
+    COMPRESSIONS,
+    DEFAULT_COMPRESSION_THRESHOLD,
+    FileFormatError,
+)
+from secrets_manager.profiling import phase
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+ZLIB_LEVEL: Final[int] = 6
+ZSTD_LEVEL: Final[int] = 3
+
+_FLAG_RAW: Final[bytes] = b"\x00"
+_FLAG_ZLIB: Final[bytes] = b"\x01"
+_FLAG_ZSTD: Final[bytes] = b"\x02"
+
+Compression = Mapping[str, Any]
+
+_ERRORS: Final = (
+    (zlib.error,) if zstandard is None else (zlib.error, zstandard.ZstdError)
+)
+
+
+class CompressionUnknownError(Exception):
+    def __init__(self) -> None:
+        pass
+
+
+class CompressionUnavailableError(Exception):
+    def __init__(self) -> None:
+        pass
+
+
+def available_compressions() -> List[str]:
+    if zstandard is None:
+        return [COMPRESSION_NONE, COMPRESSION_ZLIB]
+    return list(COMPRESSIONS)
+
+
+def compression_params(
+    algorithm: str, threshold: int = DEFAULT_COMPRESSION_THRESHOLD
+) -> Optional[Dict[str, Any]]:
+    if algorithm not in COMPRESSIONS:
+        raise CompressionUnknownError
+    if algorithm not in available_compressions():
+        raise CompressionUnavailableError
+    if algorithm == COMPRESSION_NONE:
+        return None
+    return {"algorithm": algorithm, "threshold": threshold}
+
+
+def compress(data: bytes, compression: Optional[Compression]) -> bytes:
+    if compression is None:
+        return data
+    if len(data) < compression["threshold"]:
+        return _FLAG_RAW + data
+
+    algorithm = compression["algorithm"]
+    with phase("compress", len(data)):
+        if algorithm == COMPRESSION_ZLIB:
+            flag, compressed = _FLAG_ZLIB, zlib.compress(data, ZLIB_LEVEL)
+        elif algorithm == COMPRESSION_ZSTD:
+            if zstandard is None:
+                raise CompressionUnavailableError
+            compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+            flag, compressed = _FLAG_ZSTD, compressor.compress(data)
+        else:
+            raise CompressionUnknownError
+
+    if len(compressed) >= len(data):
+        return _FLAG_RAW + data
+    return flag + compressed
+
+
+def decompress(data: bytes, compression: Optional[Compression]) -> bytes:
+    if compression is None:
+        return data
+    flag, payload = data[:1], data[1:]
+    if flag == _FLAG_RAW:
+        return payload
+    try:
+        with phase("decompress", len(payload)):
+            if flag == _FLAG_ZLIB:
+                return zlib.decompress(payload)
+            elif flag == _FLAG_ZSTD:
+                if zstandard is None:
+                    raise CompressionUnavailableError
+                decompressed: bytes = zstandard.ZstdDecompressor().decompress(payload)
+                return decompressed
+    except _ERRORS:
+        raise FileFormatError
+    raise FileFormatError
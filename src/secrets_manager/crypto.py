@@ -1,29 +1,196 @@
 import base64
+import os
+import time
+from abc import ABC, abstractmethod
+from typing import Any, ClassVar, Dict, Final, Mapping, Optional
+
+from cryptography.exceptions import InvalidTag
 from cryptography.fernet import Fernet, InvalidToken
 from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.argon2 import Argon2id
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from cryptography.hazmat.primitives.kdf.scrypt import Scrypt
+
+from secrets_manager.fileformat import KDF_ARGON2ID, KDF_PBKDF2_SHA256, KDF_SCRYPT
+from secrets_manager.profiling import phase
+
+NONCE_SIZE: Final[int] = 12
+KEY_LENGTH: Final[int] = 32
+CIPHER_FERNET: Final[str] = "fernet"
+CIPHER_AES_GCM: Final[str] = "aes-256-gcm"
+DEFAULT_KDF: Final[Dict[str, Any]] = {
+    "algorithm": KDF_PBKDF2_SHA256,
+    "iterations": 1_000_000,
+}
+
+
+class KdfUnknownError(Exception):
+    def __init__(self) -> None:
+        pass
+
+
+class KdfBackend(ABC):
+    name: ClassVar[str]
+    defaults: ClassVar[Dict[str, Any]]
+    cost: ClassVar[str]
+    minimum: ClassVar[int]
+
+    @abstractmethod
+    def derive(
+        self, password: bytes, salt: bytes, params: Mapping[str, Any]
+    ) -> bytes: ...
+
+    def scale(self, cost: float) -> int:
+        return max(self.minimum, int(cost))
+
+    def calibrate(self, target_ms: float) -> Dict[str, Any]:
+        params = {**self.defaults, self.cost: self.minimum}
+        start = time.perf_counter()
+        self.derive(b"calibration", os.urandom(16), params)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        params[self.cost] = self.scale(self.minimum * target_ms / elapsed_ms)
+        return {"algorithm": self.name, **params}
+
+
+class Pbkdf2Backend(KdfBackend):
+    name = KDF_PBKDF2_SHA256
+    defaults: ClassVar[Dict[str, Any]] = {"iterations": 1_000_000}
+    cost = "iterations"
+    minimum = 100_000
+
+    def derive(self, password: bytes, salt: bytes, params: Mapping[str, Any]) -> bytes:
+        return PBKDF2HMAC(
+            algorithm=hashes.SHA256(),
+            length=KEY_LENGTH,
+            salt=salt,
+            iterations=params["iterations"],
+        ).derive(password)
+
+    def scale(self, cost: float) -> int:
+        return max(self.minimum, int(cost) // 1000 * 1000)
+
+
+class ScryptBackend(KdfBackend):
+    name = KDF_SCRYPT
+    defaults: ClassVar[Dict[str, Any]] = {"n": 2**17, "r": 8, "p": 1}
+    cost = "n"
+    minimum = 2**15
+
+    def derive(self, password: bytes, salt: bytes, params: Mapping[str, Any]) -> bytes:
+        return Scrypt(
+            salt=salt,
+            length=KEY_LENGTH,
+            n=params["n"],
+            r=params["r"],
+            p=params["p"],
+        ).derive(password)
+
+    def scale(self, cost: float) -> int:
+        return max(self.minimum, 1 << (int(cost).bit_length() - 1))
+
 
+class Argon2idBackend(KdfBackend):
+    name = KDF_ARGON2ID
+    defaults: ClassVar[Dict[str, Any]] = {
+        "iterations": 3,
+        "lanes": 4,
+        "memory_cost": 64 * 1024,
+    }
+    cost = "memory_cost"
+    minimum = 19 * 1024
 
-def generate_key(password: bytes, salt: bytes) -> bytes:
-    kdf = PBKDF2HMAC(
-        algorithm=hashes.SHA256(),
-        length=32,
-        salt=salt,
-        iterations=1_000_000,
-    )
-    key = base64.urlsafe_b64encode(kdf.derive(password))
-    return key
+    def derive(self, password: bytes, salt: bytes, params: Mapping[str, Any]) -> bytes:
+        return Argon2id(
+            salt=salt,
+            length=KEY_LENGTH,
+            iterations=params["iterations"],
+            lanes=params["lanes"],
+            memory_cost=params["memory_cost"],
+        ).derive(password)
 
 
-def encrypt(key: bytes, data: bytes) -> bytes:
+KDF_BACKENDS: Final[Dict[str, KdfBackend]] = {
+    backend.name: backend
+    for backend in (Pbkdf2Backend(), ScryptBackend(), Argon2idBackend())
+}
+
+
+def get_kdf(algorithm: str) -> KdfBackend:
+    try:
+        return KDF_BACKENDS[algorithm]
+    except KeyError:
+        raise KdfUnknownError
+
+
+def default_kdf(algorithm: str = KDF_PBKDF2_SHA256) -> Dict[str, Any]:
+    return {"algorithm": algorithm, **get_kdf(algorithm).defaults}
+
+
+def generate_key(
+    password: bytes, salt: bytes, kdf: Optional[Mapping[str, Any]] = None
+) -> bytes:
+    kdf = kdf if kdf is not None else DEFAULT_KDF
+    with phase("kdf"):
+        key = get_kdf(kdf["algorithm"]).derive(password, salt, kdf)
+    return base64.urlsafe_b64encode(key)
+
+
+def calibrate_kdf(
+    target_ms: float, algorithm: str = KDF_PBKDF2_SHA256
+) -> Dict[str, Any]:
+    return get_kdf(algorithm).calibrate(target_ms)
+
+
+def encrypt(
+    key: bytes,
+    data: bytes,
+    cipher: str = CIPHER_FERNET,
+    associated_data: Optional[bytes] = None,
+) -> bytes:
+    if cipher == CIPHER_AES_GCM:
+        return seal(base64.urlsafe_b64decode(key), data, associated_data)
     fernet = Fernet(key)
-    return fernet.encrypt(data)
+    with phase("encrypt", len(data)):
+        return fernet.encrypt(data)
 
 
-def decrypt(key: bytes, data: bytes) -> bytes:
+def decrypt(
+    key: bytes,
+    data: bytes,
+    cipher: str = CIPHER_FERNET,
+    associated_data: Optional[bytes] = None,
+) -> bytes:
+    if cipher == CIPHER_AES_GCM:
+        try:
+            return unseal(base64.urlsafe_b64decode(key), data, associated_data)
+        except ValueError:
+            raise ValueError("InvalidPassword")
     fernet = Fernet(key)
     try:
-        data = fernet.decrypt(data)
+        with phase("decrypt", len(data)):
+            data = fernet.decrypt(data)
     except InvalidToken:
         raise ValueError("InvalidPassword")
     return data
+
+
+def generate_data_key() -> bytes:
+    return AESGCM.generate_key(bit_length=256)
+
+
+def seal(key: bytes, data: bytes, associated_data: Optional[bytes] = None) -> bytes:
+    nonce = os.urandom(NONCE_SIZE)
+    with phase("encrypt", len(data)):
+        return nonce + AESGCM(key).encrypt(nonce, data, associated_data)
+
+
+def unseal(key: bytes, data: bytes, associated_data: Optional[bytes] = None) -> bytes:
+    aead = AESGCM(key)
+    try:
+        with phase("decrypt", len(data)):
+            data = aead.decrypt(data[:NONCE_SIZE], data[NONCE_SIZE:], associated_data)
+    except InvalidTag:
+        raise ValueError("InvalidData")
+    return data
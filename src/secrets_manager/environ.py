@@ -0,0 +1,44 @@
+import re
+from typing import Dict, Final, Iterable, List, Protocol, Tuple
+
+ENV_NAME_PATTERN: Final[re.Pattern[str]] = re.compile(r"[^A-Za-z0-9_]")
+
+
+class SecretSource(Protocol):
+    def get_secret(self, name: str) -> str: ...
+
+    def list_secrets(self) -> List[str]: ...
+
+
+class MappingInvalidError(Exception):
+    def __init__(self, mapping: str) -> None:
+        self.mapping = mapping
+
+
+def env_name(secret: str, prefix: str = "") -> str:
+    return prefix + ENV_NAME_PATTERN.sub("_", secret).upper()
+
+
+def parse_mappings(mappings: Iterable[str]) -> List[Tuple[str, str]]:
+    parsed = []
+    for mapping in mappings:
+        variable, separator, secret = mapping.partition("=")
+        if not separator or not variable or not secret:
+            raise MappingInvalidError(mapping)
+        parsed.append((variable, secret))
+    return parsed
+
+
+def resolve(
+    source: SecretSource,
+    mappings: Iterable[Tuple[str, str]],
+    all_secrets: bool = False,
+    prefix: str = "",
+) -> Dict[str, str]:
+    environment = {}
+    if all_secrets:
+        for secret in source.list_secrets():
+            environment[env_name(secret, prefix)] = source.get_secret(secret)
+    for variable, secret in mappings:
+        environment[variable] = source.get_secret(secret)
+    return environment
@@ -0,0 +1,402 @@
+import hashlib
+import io
+import pickle
+import struct
+from itertools import accumulate
+from mmap import mmap
+from pickle import UnpicklingError
+from typing import (
+    Any,
+    Dict,
+    Final,
+    FrozenSet,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+from secrets_manager.profiling import phase
+
+LEGACY_MAGIC: Final[bytes] = b"SMKR"
+CONTAINER_MAGIC: Final[bytes] = b"SMKC"
+CONTAINER_VERSION: Final[int] = 1
+
+FORMAT_PICKLE: Final[int] = 1
+FORMAT_RECORDS: Final[int] = 2
+FORMAT_LOG: Final[int] = 3
+FORMAT_ENVELOPE: Final[int] = 4
+
+STORAGE_FORMATS: Final[Dict[str, int]] = {
+    "records": FORMAT_RECORDS,
+    "log": FORMAT_LOG,
+}
+
+TPM_STORAGE_FORMATS: Final[Dict[str, int]] = {
+    "envelope": FORMAT_ENVELOPE,
+    "log": FORMAT_LOG,
+}
+
+FORMAT_NAMES: Final[Dict[int, str]] = {
+    FORMAT_PICKLE: "pickle",
+    FORMAT_RECORDS: "records",
+    FORMAT_LOG: "log",
+    FORMAT_ENVELOPE: "envelope",
+}
+
+BACKEND: Final[str] = "secrets-manager"
+BACKEND_TPM: Final[str] = "secrets-manager-tpm"
+BACKEND_IDS: Final[Dict[str, int]] = {BACKEND: 1, BACKEND_TPM: 2}
+_BACKEND_NAMES: Final[Dict[int, str]] = {
+    backend_id: name for name, backend_id in BACKEND_IDS.items()
+}
+
+KDF_PBKDF2_SHA256: Final[str] = "pbkdf2-sha256"
+KDF_SCRYPT: Final[str] = "scrypt"
+KDF_ARGON2ID: Final[str] = "argon2id"
+KDF_ALGORITHMS: Final[Tuple[str, ...]] = (KDF_PBKDF2_SHA256, KDF_SCRYPT, KDF_ARGON2ID)
+
+COMPRESSION_NONE: Final[str] = "none"
+COMPRESSION_ZLIB: Final[str] = "zlib"
+COMPRESSION_ZSTD: Final[str] = "zstd"
+COMPRESSIONS: Final[Tuple[str, ...]] = (
+    COMPRESSION_NONE,
+    COMPRESSION_ZLIB,
+    COMPRESSION_ZSTD,
+)
+DEFAULT_COMPRESSION_THRESHOLD: Final[int] = 1024
+
+LOG_PUT: Final[str] = "put"
+LOG_DELETE: Final[str] = "del"
+
+ENTRY_TEXT: Final[int] = 1
+ENTRY_FILE: Final[int] = 2
+ENTRY_DELETE: Final[int] = 3
+ENTRY_RECORD: Final[int] = 4
+
+FIELD_BYTES: Final[str] = "bytes"
+FIELD_STR: Final[str] = "str"
+FIELD_U32: Final[str] = "u32"
+CHAIN_SIZE: Final[int] = 32
+
+HEADER_FIELDS: Final[Dict[int, Tuple[Tuple[str, ...], str]]] = {
+    1: (("salt",), FIELD_BYTES),
+    2: (("key",), FIELD_BYTES),
+    3: (("cipher",), FIELD_STR),
+    4: (("chain",), FIELD_U32),
+    5: (("aad",), FIELD_U32),
+    16: (("kdf", "algorithm"), FIELD_STR),
+    17: (("kdf", "iterations"), FIELD_U32),
+    18: (("kdf", "n"), FIELD_U32),
+    19: (("kdf", "r"), FIELD_U32),
+    20: (("kdf", "p"), FIELD_U32),
+    21: (("kdf", "lanes"), FIELD_U32),
+    22: (("kdf", "memory_cost"), FIELD_U32),
+    32: (("compression", "algorithm"), FIELD_STR),
+    33: (("compression", "threshold"), FIELD_U32),
+}
+
+_FIELD_TAGS: Final[Dict[Tuple[str, ...], Tuple[int, str]]] = {
+    path: (tag, kind) for tag, (path, kind) in HEADER_FIELDS.items()
+}
+
+_PREAMBLE: Final[struct.Struct] = struct.Struct(">4sBI")
+_CONTAINER: Final[struct.Struct] = struct.Struct(">4sBBBxI")
+_FIELD: Final[struct.Struct] = struct.Struct(">BH")
+_U32: Final[struct.Struct] = struct.Struct(">I")
+_LENGTH: Final[struct.Struct] = struct.Struct(">I")
+_FILE: Final[struct.Struct] = struct.Struct(">16s32sQ")
+_RECORD: Final[struct.Struct] = struct.Struct(">QQ")
+
+_LEGACY_GLOBALS: Final[FrozenSet[Tuple[str, str]]] = frozenset(
+    {
+        ("builtins", "bytearray"),
+        ("builtins", "frozenset"),
+        ("builtins", "set"),
+        ("__builtin__", "bytearray"),
+        ("__builtin__", "frozenset"),
+        ("__builtin__", "set"),
+        ("_codecs", "encode"),
+    }
+)
+
+Buffer = Union[bytes, mmap]
+Record = Tuple[str, str, Any]
+
+
+class FileFormatError(Exception):
+    def __init__(self) -> None:
+        pass
+
+
+class _LegacyUnpickler(pickle.Unpickler):
+    def find_class(self, module: str, name: str) -> Any:
+        if (module, name) not in _LEGACY_GLOBALS:
+            raise UnpicklingError(f"{module}.{name} is not allowed")
+        return super().find_class(module, name)
+
+
+def legacy_loads(data: Buffer) -> Any:
+    try:
+        with phase("parse", len(data)):
+            return _LegacyUnpickler(io.BytesIO(data)).load()
+    except (UnpicklingError, EOFError, ValueError, TypeError, IndexError):
+        raise FileFormatError
+
+
+def is_container(data: Buffer) -> bool:
+    return data[: len(CONTAINER_MAGIC)] == CONTAINER_MAGIC
+
+
+def detect_format(data: Buffer) -> int:
+    if is_container(data):
+        if len(data) < _CONTAINER.size:
+            raise FileFormatError
+        _, _, version, _, _ = _CONTAINER.unpack_from(data)
+        return int(version)
+    if data[: len(LEGACY_MAGIC)] != LEGACY_MAGIC:
+        return FORMAT_PICKLE
+    if len(data) < _PREAMBLE.size:
+        raise FileFormatError
+    _, version, _ = _PREAMBLE.unpack_from(data)
+    return int(version)
+
+
+def _pack_field(tag: int, kind: str, value: Any) -> bytes:
+    if kind == FIELD_U32:
+        raw = _U32.pack(value)
+    elif kind == FIELD_STR:
+        raw = value.encode()
+    else:
+        raw = bytes(value)
+    return _FIELD.pack(tag, len(raw)) + raw
+
+
+def _paths(params: Dict[str, Any]) -> Iterator[Tuple[Tuple[str, ...], Any]]:
+    for key, value in params.items():
+        if isinstance(value, dict):
+            for sub, item in value.items():
+                yield (key, sub), item
+        else:
+            yield (key,), value
+
+
+def pack_preamble(version: int, params: Dict[str, Any], backend: str) -> bytes:
+    fields = []
+    for path, value in _paths(params):
+        if path not in _FIELD_TAGS:
+            raise FileFormatError
+        tag, kind = _FIELD_TAGS[path]
+        fields.append(_pack_field(tag, kind, value))
+
+    raw = b"".join(fields)
+    header = _CONTAINER.pack(
+        CONTAINER_MAGIC, CONTAINER_VERSION, version, BACKEND_IDS[backend], len(raw)
+    )
+    return header + raw
+
+
+def _unpack_fields(view: memoryview) -> Dict[str, Any]:
+    params: Dict[str, Any] = {}
+    offset = 0
+    while offset < len(view):
+        tag, length = _FIELD.unpack_from(view, offset)
+        offset += _FIELD.size
+        raw = view[offset : offset + length]
+        if len(raw) != length or tag not in HEADER_FIELDS:
+            raise FileFormatError
+        offset += length
+
+        path, kind = HEADER_FIELDS[tag]
+        if kind == FIELD_U32:
+            (value,) = _U32.unpack(raw)
+        elif kind == FIELD_STR:
+            value = str(raw, "utf-8")
+        else:
+            value = raw.tobytes()
+        target = params
+        for key in path[:-1]:
+            target = target.setdefault(key, {})
+        target[path[-1]] = value
+    return params
+
+
+def unpack_header(data: Buffer) -> Tuple[int, Optional[str], Dict[str, Any], int]:
+    version = detect_format(data)
+    try:
+        if is_container(data):
+            _, container, version, backend_id, length = _CONTAINER.unpack_from(data)
+            if container != CONTAINER_VERSION:
+                raise FileFormatError
+            offset = _CONTAINER.size
+            view = memoryview(data[offset : offset + length])
+            if len(view) != length:
+                raise FileFormatError
+            params = _unpack_fields(view)
+            return version, _BACKEND_NAMES.get(backend_id), params, offset + length
+
+        if version == FORMAT_PICKLE:
+            params = legacy_loads(data)
+            offset = len(data)
+        else:
+            _, _, length = _PREAMBLE.unpack_from(data)
+            offset = _PREAMBLE.size
+            params = legacy_loads(data[offset : offset + length])
+            offset += length
+        if not isinstance(params, dict):
+            raise FileFormatError
+        backend = BACKEND if "salt" in params else BACKEND_TPM
+        return version, backend, params, offset
+    except (struct.error, UnicodeDecodeError):
+        raise FileFormatError
+
+
+def unpack_preamble(
+    data: Buffer, backend: Optional[str] = None
+) -> Tuple[int, Dict[str, Any], int]:
+    version, found, params, offset = unpack_header(data)
+    if version == FORMAT_PICKLE:
+        raise FileFormatError
+    if backend is not None and found != backend:
+        raise FileFormatError
+    return version, params, offset
+
+
+def _pack_value(op: str, value: Any) -> Tuple[int, bytes]:
+    if op == LOG_DELETE:
+        return ENTRY_DELETE, b""
+    elif isinstance(value, str):
+        return ENTRY_TEXT, value.encode()
+    elif isinstance(value, tuple):
+        return ENTRY_RECORD, _RECORD.pack(*value)
+    elif isinstance(value, dict):
+        blob = bytes.fromhex(value["blob"])
+        return ENTRY_FILE, _FILE.pack(blob, value["key"], value["size"])
+    raise FileFormatError
+
+
+def _pack_records(records: Sequence[Record]) -> bytes:
+    count = len(records)
+    names = [name.encode() for _, name, _ in records]
+    if all(op == LOG_PUT and type(value) is str for op, _, value in records):
+        kinds = bytes([ENTRY_TEXT]) * count
+        values = [value.encode() for _, _, value in records]
+    else:
+        packed = [_pack_value(op, value) for op, _, value in records]
+        kinds = bytes(kind for kind, _ in packed)
+        values = [raw for _, raw in packed]
+
+    lengths = struct.pack(f">{2 * count}I", *map(len, names), *map(len, values))
+    return b"".join([_LENGTH.pack(count), kinds, lengths, *names, *values])
+
+
+def _split(data: memoryview, lengths: Sequence[int]) -> List[str]:
+    text = str(data, "utf-8")
+    bounds = zip(accumulate(lengths, initial=0), accumulate(lengths))
+    if len(text) == len(data):
+        return [text[start:end] for start, end in bounds]
+    return [str(data[start:end], "utf-8") for start, end in bounds]
+
+
+def _unpack_records(data: Buffer) -> List[Record]:
+    view = memoryview(data)
+    try:
+        (count,) = _LENGTH.unpack_from(view)
+        kinds = view[_LENGTH.size : _LENGTH.size + count]
+        offset = _LENGTH.size + count
+        lengths = struct.unpack_from(f">{2 * count}I", view, offset)
+    except struct.error:
+        raise FileFormatError
+    name_lengths, value_lengths = lengths[:count], lengths[count:]
+    names_start = offset + 8 * count
+    values_start = names_start + sum(name_lengths)
+    if values_start + sum(value_lengths) != len(view):
+        raise FileFormatError
+
+    try:
+        names = _split(view[names_start:values_start], name_lengths)
+        if kinds == bytes([ENTRY_TEXT]) * count:
+            values = _split(view[values_start:], value_lengths)
+            return [(LOG_PUT, name, value) for name, value in zip(names, values)]
+
+        records: List[Record] = []
+        entries = zip(
+            kinds, names, accumulate(value_lengths, initial=values_start), value_lengths
+        )
+        for kind, name, value_start, value_length in entries:
+            raw = view[value_start : value_start + value_length]
+            if kind == ENTRY_TEXT:
+                records.append((LOG_PUT, name, str(raw, "utf-8")))
+            elif kind == ENTRY_DELETE:
+                records.append((LOG_DELETE, name, None))
+            elif kind == ENTRY_RECORD:
+                records.append((LOG_PUT, name, _RECORD.unpack(raw)))
+            elif kind == ENTRY_FILE:
+                blob, key, size = _FILE.unpack(raw)
+                value = {"blob": blob.hex(), "key": key, "size": size}
+                records.append((LOG_PUT, name, value))
+            else:
+                raise FileFormatError
+    except (struct.error, UnicodeDecodeError):
+        raise FileFormatError
+    return records
+
+
+def pack_records(records: Sequence[Record]) -> bytes:
+    with phase("serialize") as current:
+        data = _pack_records(records)
+        current.add(len(data))
+    return data
+
+
+def unpack_records(data: Buffer) -> List[Record]:
+    with phase("parse", len(data)):
+        return _unpack_records(data)
+
+
+def pack_mapping(mapping: Dict[str, Any]) -> bytes:
+    return pack_records([(LOG_PUT, name, value) for name, value in mapping.items()])
+
+
+def unpack_mapping(data: Buffer) -> Dict[str, Any]:
+    return {name: value for op, name, value in unpack_records(data) if op == LOG_PUT}
+
+
+def chain_start(preamble: Buffer) -> bytes:
+    return hashlib.sha256(preamble).digest()
+
+
+def chain_next(chain: bytes, block: Buffer) -> bytes:
+    return hashlib.sha256(chain + bytes(block)).digest()
+
+
+def unchain(data: bytes, chain: bytes) -> bytes:
+    if data[:CHAIN_SIZE] != chain:
+        raise FileFormatError
+    return data[CHAIN_SIZE:]
+
+
+def pack_block(data: bytes) -> bytes:
+    return _LENGTH.pack(len(data)) + data
+
+
+def unpack_block(data: Buffer, offset: int) -> Tuple[bytes, int]:
+    try:
+        (length,) = _LENGTH.unpack_from(data, offset)
+    except struct.error:
+        raise FileFormatError
+    start = offset + _LENGTH.size
+    if start + length > len(data):
+        raise FileFormatError
+    return data[start : start + length], start + length
+
+
+def unpack_blocks(data: Buffer, offset: int) -> Iterator[Tuple[bytes, int]]:
+    while offset < len(data):
+        try:
+            block, offset = unpack_block(data, offset)
+        except FileFormatError:
+            return
+        yield block, offset
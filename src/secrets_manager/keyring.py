@@ -1,14 +1,98 @@
+import mmap
 import os
-import pickle
-from pickle import UnpicklingError
+import time
 from pathlib import Path
-from typing import Final, Dict, Self, Optional, Literal, Type, List
+from typing import (
+    Final,
+    Dict,
+    Self,
+    Optional,
+    Literal,
+    Type,
+    List,
+    Tuple,
+    Any,
+    BinaryIO,
+    Iterator,
+)
 from types import TracebackType
 
-from secrets_manager.crypto import encrypt, decrypt, generate_key
-
-BASE_PATH: Final[Path] = Path.cwd()
-FILE_EXTENSION: Final[str] = ".db"
+from secrets_manager import agent
+from secrets_manager.agent import (
+    AgentNotRunningError,
+    AgentProtocolError,
+    AgentSocketInsecureError,
+)
+from secrets_manager.blobs import (
+    BlobRef,
+    is_blob,
+    iter_blob,
+    new_blob,
+    remove_blobs,
+    write_blob,
+)
+from secrets_manager.compression import (
+    Compression,
+    CompressionUnavailableError,
+    CompressionUnknownError,
+    compress,
+    decompress,
+)
+from secrets_manager.crypto import (
+    CIPHER_AES_GCM,
+    CIPHER_FERNET,
+    DEFAULT_KDF,
+    KdfUnknownError,
+    encrypt,
+    decrypt,
+    generate_key,
+)
+from secrets_manager.fileformat import (
+    BACKEND,
+    FORMAT_LOG,
+    FORMAT_PICKLE,
+    FORMAT_RECORDS,
+    LOG_DELETE,
+    LOG_PUT,
+    FileFormatError,
+    detect_format,
+    is_container,
+    legacy_loads,
+    chain_next,
+    chain_start,
+    pack_block,
+    pack_mapping,
+    pack_preamble,
+    pack_records,
+    unpack_block,
+    unpack_blocks,
+    unpack_header,
+    unpack_mapping,
+    unpack_preamble,
+    unpack_records,
+    unchain,
+)
+from secrets_manager.namespace import NameIndex
+from secrets_manager.profiling import phase
+from secrets_manager.store import (
+    Catalog,
+    CatalogEntry,
+    KeyringNameInvalidError,
+    blobs_path,
+    keyring_path,
+)
+from secrets_manager.locking import (
+    DEFAULT_LOCK_TIMEOUT,
+    FileLock,
+    LockTimeoutError,
+    get_durability,
+    lock_path,
+    sync_file,
+    write_atomic,
+)
+
+COMPACT_MIN_RECORDS: Final[int] = 64
+COMPACT_DEAD_RATIO: Final[float] = 0.5
 
 
 class KeyringFileInvalidError(Exception):
@@ -26,6 +110,16 @@ class KeyringAlreadyExistsError(Exception):
         pass
 
 
+class PasswordRequiredError(Exception):
+    def __init__(self) -> None:
+        pass
+
+
+class KeyringReadOnlyError(Exception):
+    def __init__(self) -> None:
+        pass
+
+
 class SecretNotFoundError(Exception):
     def __init__(self) -> None:
         pass
@@ -36,43 +130,435 @@ class SecretAlreadyExistsError(Exception):
         pass
 
 
+class SecretTypeError(Exception):
+    def __init__(self) -> None:
+        pass
+
+
+KEYRING_ERRORS: Final[Tuple[Type[Exception], ...]] = (
+    KeyringNotFoundError,
+    KeyringFileInvalidError,
+    KeyringNameInvalidError,
+    KeyringReadOnlyError,
+    PasswordRequiredError,
+    SecretTypeError,
+    LockTimeoutError,
+    KdfUnknownError,
+    CompressionUnknownError,
+    CompressionUnavailableError,
+    ValueError,
+    OSError,
+)
+
+
+def split_files(values: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, BlobRef]]:
+    files = {name: value for name, value in values.items() if is_blob(value)}
+    others = {name: value for name, value in values.items() if name not in files}
+    return others, files
+
+
+def bind(header: Optional[bytes], name: str = "") -> Optional[bytes]:
+    return header + name.encode() if header is not None else None
+
+
 class Keyring:
-    def __init__(self, name: str, password: str) -> None:
+    def __init__(
+        self,
+        name: str,
+        password: Optional[str],
+        use_agent: bool = False,
+        read_only: bool = False,
+        lock_timeout: Optional[float] = DEFAULT_LOCK_TIMEOUT,
+        key: Optional[bytes] = None,
+        durability: Optional[str] = None,
+        commit_window: Optional[float] = None,
+    ) -> None:
         self._name = name
-        self._password = password.encode()
+        self._password = password.encode() if password is not None else None
+        self._use_agent = use_agent
+        self._read_only = read_only
+        self._lock_timeout = lock_timeout
+        self._known_key = key
+        self._durability = get_durability(durability)
+        self._commit_window = commit_window
+        self._dirty = False
+        self._dirty_since = 0.0
+        self._log: List[Tuple[str, str, Any]] = []
+        self._log_records = 0
+        self._compact = False
         self._load()
 
     def _load(self) -> None:
-        self._path = BASE_PATH / Path(f"{self._name}{FILE_EXTENSION}")
-        try:
-            self._file = open(self._path, "rb+")
-        except FileNotFoundError:
+        self._path = keyring_path(self._name)
+        if not self._path.exists():
             raise KeyringNotFoundError
+        self._lock = FileLock(
+            lock_path(self._path), self._read_only, self._lock_timeout
+        )
+        with phase("lock"):
+            self._lock.acquire()
+        try:
+            self._open()
+        except Exception:
+            self._lock.release()
+            raise
+
+    def _open(self) -> None:
+        self._names: Optional[NameIndex] = None
+        self._header: Optional[bytes] = None
+        with phase("read") as current:
+            try:
+                self._file = open(self._path, "rb" if self._read_only else "rb+")
+            except FileNotFoundError:
+                raise KeyringNotFoundError
+
+            try:
+                self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                self._file.close()
+                raise KeyringFileInvalidError
+            current.add(len(self._map))
 
         try:
-            keyring_db = pickle.load(self._file)
-            self._salt = keyring_db["salt"]
+            self._format = detect_format(self._map)
+            self._container = is_container(self._map)
+            if self._format == FORMAT_PICKLE:
+                self._load_pickle()
+            elif self._format == FORMAT_RECORDS:
+                self._load_records()
+            elif self._format == FORMAT_LOG:
+                self._load_log()
+            else:
+                raise KeyringFileInvalidError
+        except FileFormatError:
+            self._close_file()
+            raise KeyringFileInvalidError
+        except Exception:
+            self._close_file()
+            raise
+
+    def _load_pickle(self) -> None:
+        keyring_db = legacy_loads(self._map)
+        try:
+            self._set_params(keyring_db)
             secrets_encrypted = keyring_db["secrets"]
-        except UnpicklingError:
+        except (KeyError, TypeError):
             raise KeyringFileInvalidError
 
-        self._key = generate_key(self._password, self._salt)
-        secrets_decrypted = decrypt(self._key, secrets_encrypted)
-        self._secrets: Dict[str, str] = pickle.loads(secrets_decrypted)
+        secrets_decrypted = self._unlock(secrets_encrypted)
+        self._secrets: Dict[str, str]
+        self._files: Dict[str, BlobRef]
+        self._secrets, self._files = split_files(self._loads_mapping(secrets_decrypted))
+        self._index: Dict[str, Tuple[int, int]] = {}
+
+    def _load_records(self) -> None:
+        _, params, offset = unpack_preamble(self._map, BACKEND)
+        self._set_params(params)
+        self._load_header(params, offset)
+        index_encrypted, self._records_offset = unpack_block(self._map, offset)
+
+        index_decrypted = self._unlock(index_encrypted, self._associated_data())
+        self._index, self._files = split_files(self._loads_mapping(index_decrypted))
+        self._secrets = {}
+
+    def _load_log(self) -> None:
+        _, params, offset = unpack_preamble(self._map, BACKEND)
+        self._set_params(params)
+        self._index = {}
+        self._secrets = {}
+        self._files = {}
+
+        self._chained = bool(params.get("chain"))
+        self._chain = chain_start(self._map[:offset])
+        blocks = unpack_blocks(self._map, offset)
+        try:
+            block, end = next(blocks)
+        except StopIteration:
+            raise KeyringFileInvalidError
+        self._replay_block(self._unlock(block), block, end)
+        for block, end in blocks:
+            try:
+                data = self._decrypt(block)
+            except ValueError:
+                if end < len(self._map):
+                    raise KeyringFileInvalidError
+                break
+            self._replay_block(data, block, end)
+
+    def _replay_block(self, data: bytes, block: bytes, end: int) -> None:
+        if self._chained:
+            data = unchain(data, self._chain)
+            self._chain = chain_next(self._chain, block)
+        self._replay(self._loads_records(data))
+        self._log_end = end
+
+    def _loads_mapping(self, data: bytes) -> Dict[str, Any]:
+        if self._container:
+            return unpack_mapping(data)
+        mapping: Dict[str, Any] = legacy_loads(data)
+        return mapping
+
+    def _loads_records(self, data: bytes) -> List[Tuple[str, str, Any]]:
+        if self._container:
+            return unpack_records(data)
+        records: List[Tuple[str, str, Any]] = legacy_loads(data)
+        return records
+
+    def _load_header(self, params: Dict[str, Any], offset: int) -> None:
+        if params.get("aad"):
+            self._header = chain_start(self._map[:offset])
+
+    def _associated_data(self, name: str = "") -> Optional[bytes]:
+        return bind(self._header, name)
+
+    def _set_params(self, params: Dict[str, Any]) -> None:
+        self._salt = params["salt"]
+        self._kdf = params.get("kdf", DEFAULT_KDF)
+        self._cipher = params.get("cipher", CIPHER_FERNET)
+        self._compression: Optional[Compression] = params.get("compression")
+
+    def _encrypt(self, data: bytes, associated_data: Optional[bytes] = None) -> bytes:
+        data = compress(data, self._compression)
+        return encrypt(self._key, data, self._cipher, associated_data)
+
+    def _decrypt(
+        self,
+        data: bytes,
+        key: Optional[bytes] = None,
+        associated_data: Optional[bytes] = None,
+    ) -> bytes:
+        key = key if key is not None else self._key
+        data = decrypt(key, data, self._cipher, associated_data)
+        return decompress(data, self._compression)
+
+    def _replay(self, records: List[Tuple[str, str, Any]]) -> None:
+        for op, name, value in records:
+            if op == LOG_PUT and is_blob(value):
+                self._files[name] = value
+                self._secrets.pop(name, None)
+            elif op == LOG_PUT and value is not None:
+                self._secrets[name] = value
+                self._files.pop(name, None)
+            elif op == LOG_DELETE:
+                self._secrets.pop(name, None)
+                self._files.pop(name, None)
+        self._log_records += len(records)
+
+    def _unlock(
+        self, secrets_encrypted: bytes, associated_data: Optional[bytes] = None
+    ) -> bytes:
+        rejected: Optional[ValueError] = None
+        if self._known_key is not None:
+            try:
+                secrets_decrypted = self._decrypt(
+                    secrets_encrypted, self._known_key, associated_data
+                )
+                self._key = self._known_key
+                return secrets_decrypted
+            except ValueError as e:
+                self._known_key = None
+                rejected = e
+
+        keyring_id = self.agent_id(self._name)
+        if self._use_agent:
+            key = agent.get_key(keyring_id, self._salt)
+            if key is not None:
+                try:
+                    secrets_decrypted = self._decrypt(
+                        secrets_encrypted, key, associated_data
+                    )
+                    self._key = key
+                    return secrets_decrypted
+                except ValueError:
+                    pass
+
+        if self._password is None:
+            if rejected is not None:
+                raise rejected
+            raise PasswordRequiredError
+        self._key = generate_key(self._password, self._salt, self._kdf)
+        secrets_decrypted = self._decrypt(secrets_encrypted, None, associated_data)
+        if self._use_agent:
+            agent.add_key(keyring_id, self._salt, self._key)
+        return secrets_decrypted
+
+    def _read_record(self, name: str) -> bytes:
+        start, length = self._index[name]
+        start += self._records_offset
+        return self._map[start : start + length]
+
+    def _params(self) -> Dict[str, Any]:
+        params = {"salt": self._salt, "kdf": self._kdf, "cipher": self._cipher}
+        if self._compression is not None:
+            params["compression"] = dict(self._compression)
+        return params
+
+    def _dump_records(self) -> Tuple[bytes, int, Dict[str, Tuple[int, int]]]:
+        params = self._params()
+        if self._cipher == CIPHER_AES_GCM:
+            params["aad"] = 1
+        preamble = pack_preamble(FORMAT_RECORDS, params, BACKEND)
+        header = chain_start(preamble) if "aad" in params else None
+
+        index: Dict[str, Any] = {}
+        records: List[bytes] = []
+        offset = 0
+        for name in self._name_index().scope():
+            if name in self._files:
+                index[name] = self._files[name]
+                continue
+            if name in self._secrets or header != self._header:
+                record = self._encrypt(
+                    self.get_secret(name).encode(), bind(header, name)
+                )
+            else:
+                record = self._read_record(name)
+            index[name] = (offset, len(record))
+            records.append(record)
+            offset += len(record)
+
+        index_encrypted = self._encrypt(pack_mapping(index), bind(header))
+        preamble += pack_block(index_encrypted)
+        offsets = {
+            name: entry for name, entry in index.items() if name not in self._files
+        }
+        return preamble + b"".join(records), len(preamble), offsets
+
+    def _dump_log(self) -> bytes:
+        records: List[Tuple[str, str, Any]] = []
+        for name in self._name_index().scope():
+            value = self._files[name] if name in self._files else self.get_secret(name)
+            records.append((LOG_PUT, name, value))
+        preamble = pack_preamble(FORMAT_LOG, {**self._params(), "chain": 1}, BACKEND)
+        block = self._encrypt(chain_start(preamble) + pack_records(records))
+        return preamble + pack_block(block)
+
+    def _append_log(self) -> None:
+        block = self._encrypt(self._chain + pack_records(self._log))
+        self._chain = chain_next(self._chain, block)
+        block = pack_block(block)
+        self._map.close()
+
+        with phase("write", len(block)):
+            self._file.seek(self._log_end)
+            self._file.write(block)
+            self._file.truncate()
+            self._file.flush()
+        sync_file(self._file.fileno(), self._durability)
+        self._log_records += len(self._log)
+        self._log_end = self._file.tell()
+        self._remap()
+
+    def _needs_compaction(self) -> bool:
+        records = self._log_records + len(self._log)
+        if self._compact or not self._container or not self._chained:
+            return True
+        if records < COMPACT_MIN_RECORDS:
+            return False
+        live = len(self._secrets) + len(self._files)
+        return 1 - live / records > COMPACT_DEAD_RATIO
+
+    def _compact_log(self) -> None:
+        db = self._dump_log()
+        self._map.close()
+
+        write_atomic(self._path, db, self._durability)
+        self._reopen()
+        _, _, offset = unpack_preamble(self._map, BACKEND)
+        block, self._log_end = unpack_block(self._map, offset)
+        self._log_records = len(self._secrets) + len(self._files)
+        self._chained = True
+        self._chain = chain_next(chain_start(self._map[:offset]), block)
+
+    def _write_records(self) -> None:
+        self._format = FORMAT_RECORDS
+        db, self._records_offset, offsets = self._dump_records()
+        self._map.close()
+
+        write_atomic(self._path, db, self._durability)
+        self._reopen()
+        _, params, offset = unpack_preamble(self._map, BACKEND)
+        self._load_header(params, offset)
+        self._index = {
+            name: entry for name, entry in offsets.items() if name not in self._secrets
+        }
 
-    def _save(self) -> None:
-        secrets = encrypt(self._key, pickle.dumps(self._secrets))
+    def _remap(self) -> None:
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
 
-        db = {
-            "salt": self._salt,
-            "secrets": secrets,
-        }
+    def _reopen(self) -> None:
+        self._file.close()
+        self._file = open(self._path, "rb+")
+        self._remap()
+        self._container = True
+
+    def _write(self) -> None:
+        if self._format == FORMAT_LOG:
+            if self._needs_compaction():
+                self._compact_log()
+            else:
+                self._append_log()
+        else:
+            self._write_records()
+        self._collect()
+        self._record()
+
+    def _collect(self) -> None:
+        directory = blobs_path(self._path)
+        if not directory.is_dir():
+            return
+        referenced = {blob["blob"] for blob in self._files.values()}
+        for path in directory.iterdir():
+            if path.name not in referenced:
+                path.unlink(missing_ok=True)
+
+    def _record(self) -> None:
+        Catalog().record(
+            self._name,
+            backend=BACKEND,
+            version=self._format,
+            secrets=len(self.list_secrets()) + len(self._files),
+            size=os.path.getsize(self._path),
+        )
 
-        self._file.seek(0)
-        pickle.dump(db, self._file)
-        self._file.truncate()
+    def _save(self) -> None:
+        try:
+            self._write()
+        finally:
+            self._close()
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+        self._write()
+        self._log = []
+        self._compact = False
+        self._dirty = False
+        self._known_key = self._key
+
+    @property
+    def commit_deadline(self) -> Optional[float]:
+        if not self._dirty or self._commit_window is None:
+            return None
+        return self._dirty_since + self._commit_window
+
+    def commit(self) -> bool:
+        if not self._dirty:
+            return True
+        deadline = self.commit_deadline
+        if deadline is not None and time.monotonic() < deadline:
+            return False
+        self.save()
+        return True
+
+    def _close_file(self) -> None:
+        self._map.close()
         self._file.close()
 
+    def _close(self) -> None:
+        self._close_file()
+        self._lock.release()
+
     def __enter__(self) -> Self:
         return self
 
@@ -82,64 +568,301 @@ class Keyring:
         exc_value: Optional[BaseException],
         exc_tb: Optional[TracebackType],
     ) -> Literal[False]:
-        self._save()
+        if self._dirty:
+            self._save()
+        else:
+            self._close()
         return False
 
     @classmethod
-    def create_keyring(cls, name: str, password: bytes) -> None:
-        path = BASE_PATH / Path(f"{name}{FILE_EXTENSION}")
+    def create_keyring(
+        cls,
+        name: str,
+        password: bytes,
+        version: int = FORMAT_RECORDS,
+        kdf: Optional[Dict[str, Any]] = None,
+        compression: Optional[Compression] = None,
+        cipher: str = CIPHER_AES_GCM,
+    ) -> None:
+        path = keyring_path(name)
         if Path.exists(path):
             raise KeyringAlreadyExistsError
 
         salt = os.urandom(16)
-        key = generate_key(password, salt)
+        kdf = kdf if kdf is not None else DEFAULT_KDF
+        key = generate_key(password, salt, kdf)
+        params: Dict[str, Any] = {"salt": salt, "kdf": kdf, "cipher": cipher}
+        if compression is not None:
+            params["compression"] = dict(compression)
+
+        associated_data = None
+        if version == FORMAT_RECORDS:
+            if cipher == CIPHER_AES_GCM:
+                params["aad"] = 1
+            preamble = pack_preamble(version, params, BACKEND)
+            payload = pack_mapping({})
+            if cipher == CIPHER_AES_GCM:
+                associated_data = bind(chain_start(preamble))
+        elif version == FORMAT_LOG:
+            preamble = pack_preamble(version, {**params, "chain": 1}, BACKEND)
+            payload = chain_start(preamble) + pack_records([])
+        else:
+            raise ValueError("UnsupportedFormat")
+        payload = compress(payload, compression)
+        db = preamble + pack_block(encrypt(key, payload, cipher, associated_data))
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with FileLock(lock_path(path)):
+            if Path.exists(path):
+                raise KeyringAlreadyExistsError
+            write_atomic(path, db)
+            Catalog().record(
+                name, backend=BACKEND, version=version, secrets=0, size=len(db)
+            )
 
-        secrets = encrypt(key, pickle.dumps({}))
+    @classmethod
+    def kdf_params(cls, name: str) -> Tuple[bytes, Dict[str, Any]]:
+        path = keyring_path(name)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            raise KeyringNotFoundError
 
-        db = {
-            "salt": salt,
-            "secrets": secrets,
-        }
+        try:
+            _, backend, params, _ = unpack_header(data)
+        except FileFormatError:
+            raise KeyringFileInvalidError
+        if backend != BACKEND:
+            raise KeyringFileInvalidError
+        return params["salt"], params.get("kdf", DEFAULT_KDF)
 
-        with open(path, "wb") as f:
-            pickle.dump(db, f)
+    @classmethod
+    def agent_id(cls, name: str) -> str:
+        path = keyring_path(name)
+        return str(path.resolve())
 
     @classmethod
     def list_keyrings(cls) -> List[str]:
-        paths = BASE_PATH.glob("*" + FILE_EXTENSION)
-        files = [path for path in paths if path.is_file()]
-        return [file.name.rstrip(FILE_EXTENSION) for file in files]
+        return sorted(Catalog().entries(BACKEND))
+
+    @classmethod
+    def describe_keyrings(cls) -> Dict[str, CatalogEntry]:
+        return Catalog().entries(BACKEND)
 
     @classmethod
     def remove_keyring(cls, name: str) -> None:
-        path = BASE_PATH / Path(f"{name}{FILE_EXTENSION}")
-        if Path.exists(path):
-            path.unlink()
-        else:
+        path = keyring_path(name)
+        if not Path.exists(path):
             raise KeyringNotFoundError
+        with FileLock(lock_path(path)):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                raise KeyringNotFoundError
+            lock_path(path).unlink()
+            remove_blobs(blobs_path(path))
+            Catalog().remove(name)
+
+    @property
+    def version(self) -> int:
+        return self._format
+
+    @property
+    def dirty(self) -> bool:
+        return self._dirty
+
+    @property
+    def kdf(self) -> Dict[str, Any]:
+        return dict(self._kdf)
+
+    @property
+    def key(self) -> bytes:
+        return self._key
+
+    @property
+    def cipher(self) -> str:
+        return str(self._cipher)
+
+    @property
+    def compression(self) -> Optional[Dict[str, Any]]:
+        return dict(self._compression) if self._compression is not None else None
+
+    def _modify(self) -> None:
+        if self._read_only:
+            raise KeyringReadOnlyError
+        if not self._dirty:
+            self._dirty_since = time.monotonic()
+        self._dirty = True
+
+    def _materialize(self) -> None:
+        self._modify()
+        for name in list(self._index):
+            self._secrets[name] = self.get_secret(name)
+        self._index.clear()
+        self._cipher = CIPHER_AES_GCM
+        self._compact = True
+
+    def migrate(self, version: int = FORMAT_RECORDS) -> None:
+        if (
+            version != self._format
+            or self._cipher != CIPHER_AES_GCM
+            or not self._container
+            or version == FORMAT_RECORDS
+            and self._header is None
+        ):
+            self._materialize()
+            self._format = version
+
+    def set_compression(self, compression: Optional[Compression]) -> None:
+        self._materialize()
+        self._compression = compression
+
+    def rewrap(self, kdf: Dict[str, Any]) -> None:
+        if self._password is None:
+            raise PasswordRequiredError
+        self._materialize()
+
+        self._salt = os.urandom(16)
+        self._kdf = dict(kdf)
+        self._key = generate_key(self._password, self._salt, self._kdf)
+        if self._use_agent:
+            agent.add_key(self.agent_id(self._name), self._salt, self._key)
+
+    def rekey(self, password: str, kdf: Optional[Dict[str, Any]] = None) -> None:
+        self._modify()
+        if self._use_agent:
+            try:
+                agent.forget(self.agent_id(self._name))
+            except (
+                AgentNotRunningError,
+                AgentProtocolError,
+                AgentSocketInsecureError,
+            ):
+                pass
+        self._password = password.encode()
+        self.rewrap(kdf or self._kdf)
+        self.save()
+
+    def compact(self) -> None:
+        if self._format != FORMAT_LOG:
+            return
+        self._modify()
+        self._compact = True
+
+    def snapshot(self) -> Tuple[Any, ...]:
+        return (
+            dict(self._secrets),
+            dict(self._index),
+            dict(self._files),
+            list(self._log),
+            self._format,
+            self._compact,
+            self._dirty,
+        )
+
+    def restore(self, snapshot: Tuple[Any, ...]) -> None:
+        secrets, index, files, log, self._format, self._compact, self._dirty = snapshot
+        self._secrets = dict(secrets)
+        self._index = dict(index)
+        self._files = dict(files)
+        self._log = list(log)
+        self._names = None
 
     def _secret_exists(self, name: str) -> bool:
-        return True if name in self._secrets.keys() else False
+        return name in self._secrets or name in self._index or name in self._files
 
     def add_secret(self, name: str, value: str) -> None:
         if self._secret_exists(name):
             raise SecretAlreadyExistsError
+        self._modify()
         self._secrets[name] = value
+        self._log.append((LOG_PUT, name, value))
+        if self._names is not None:
+            self._names.add(name)
 
     def update_secret(self, name: str, value: str) -> None:
         if not self._secret_exists(name):
             raise SecretNotFoundError
+        if name in self._files:
+            raise SecretTypeError
+        self._modify()
+        self._index.pop(name, None)
         self._secrets[name] = value
+        self._log.append((LOG_PUT, name, value))
 
     def get_secret(self, name: str) -> str:
         if not self._secret_exists(name):
             raise SecretNotFoundError
-        return self._secrets[name]
+        if name in self._files:
+            raise SecretTypeError
+        if name in self._secrets:
+            return self._secrets[name]
+        record = self._read_record(name)
+        return self._decrypt(record, None, self._associated_data(name)).decode()
 
     def list_secrets(self) -> List[str]:
-        return list(self._secrets.keys())
+        return list(self._index.keys()) + list(self._secrets.keys())
+
+    def list_files(self) -> Dict[str, int]:
+        return {name: blob["size"] for name, blob in self._files.items()}
+
+    def _name_index(self) -> NameIndex:
+        if self._names is None:
+            self._names = NameIndex([*self._index, *self._secrets, *self._files])
+        return self._names
+
+    def list_names(
+        self,
+        prefix: str = "",
+        depth: Optional[int] = None,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> Tuple[List[str], Optional[str]]:
+        return self._name_index().list(prefix, depth, cursor, limit)
+
+    def put_file(self, name: str, source: BinaryIO) -> None:
+        if name in self._secrets or name in self._index:
+            raise SecretTypeError
+        self._modify()
+        blob = write_blob(
+            blobs_path(self._path), new_blob(), source, durability=self._durability
+        )
+        self._files[name] = blob
+        self._log.append((LOG_PUT, name, blob))
+        if self._names is not None:
+            self._names.add(name)
+
+    def iter_file(self, name: str) -> Iterator[bytes]:
+        if not self._secret_exists(name):
+            raise SecretNotFoundError
+        if name not in self._files:
+            raise SecretTypeError
+        return iter_blob(blobs_path(self._path), self._files[name])
+
+    def get_file(self, name: str, sink: BinaryIO) -> None:
+        for chunk in self.iter_file(name):
+            sink.write(chunk)
 
     def remove_secret(self, name: str) -> None:
         if not self._secret_exists(name):
             raise SecretNotFoundError
-        del self._secrets[name]
+        self._modify()
+        self._index.pop(name, None)
+        self._secrets.pop(name, None)
+        self._files.pop(name, None)
+        self._log.append((LOG_DELETE, name, None))
+        if self._names is not None:
+            self._names.remove(name)
+
+    def remove_prefix(self, prefix: str) -> List[str]:
+        if not self._name_index().scope(prefix):
+            return []
+        self._modify()
+        names = self._name_index().remove_scope(prefix)
+        for name in names:
+            self._index.pop(name, None)
+            self._secrets.pop(name, None)
+            self._files.pop(name, None)
+            self._log.append((LOG_DELETE, name, None))
+        return names
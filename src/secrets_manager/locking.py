@@ -0,0 +1,135 @@
+import fcntl
+import os
+import time
+from pathlib import Path
+from types import TracebackType
+from typing import Final, Literal, Optional, Self, Tuple, Type
+
+from secrets_manager.profiling import phase
+
+LOCK_TIMEOUT_ENV: Final[str] = "SECRETS_MANAGER_LOCK_TIMEOUT"
+DEFAULT_LOCK_TIMEOUT: Final[float] = 30.0
+LOCK_POLL_INTERVAL: Final[float] = 0.01
+LOCK_POLL_INTERVAL_MAX: Final[float] = 0.2
+DURABILITY_ENV: Final[str] = "SECRETS_MANAGER_DURABILITY"
+DURABILITY_NONE: Final[str] = "none"
+DURABILITY_FSYNC: Final[str] = "fsync"
+DURABILITY_DIRSYNC: Final[str] = "fsync+dirsync"
+DURABILITIES: Final[Tuple[str, ...]] = (
+    DURABILITY_NONE,
+    DURABILITY_FSYNC,
+    DURABILITY_DIRSYNC,
+)
+DEFAULT_DURABILITY: Final[str] = DURABILITY_FSYNC
+
+_durability: Optional[str] = None
+
+
+class LockTimeoutError(Exception):
+    def __init__(self) -> None:
+        pass
+
+
+class DurabilityUnknownError(Exception):
+    def __init__(self) -> None:
+        pass
+
+
+def set_durability(durability: Optional[str]) -> None:
+    global _durability
+    if durability is not None and durability not in DURABILITIES:
+        raise DurabilityUnknownError
+    _durability = durability
+
+
+def get_durability(durability: Optional[str] = None) -> str:
+    durability = durability or _durability or os.environ.get(DURABILITY_ENV)
+    if durability is None:
+        return DEFAULT_DURABILITY
+    if durability not in DURABILITIES:
+        raise DurabilityUnknownError
+    return durability
+
+
+def sync_file(fd: int, durability: Optional[str] = None) -> None:
+    if get_durability(durability) == DURABILITY_NONE:
+        return
+    with phase("fsync"):
+        os.fsync(fd)
+
+
+def sync_directory(path: Path, durability: Optional[str] = None) -> None:
+    if get_durability(durability) != DURABILITY_DIRSYNC:
+        return
+    fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        with phase("fsync"):
+            os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def lock_path(path: Path) -> Path:
+    return path.with_name(f".{path.name}.lock")
+
+
+class FileLock:
+    def __init__(
+        self, path: Path, shared: bool = False, timeout: Optional[float] = None
+    ) -> None:
+        self._path = path
+        self._operation = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+        self._timeout = timeout
+        self._fd: Optional[int] = None
+
+    def acquire(self) -> None:
+        fd = os.open(self._path, os.O_RDWR | os.O_CREAT, 0o600)
+        deadline = None if self._timeout is None else time.monotonic() + self._timeout
+        interval = LOCK_POLL_INTERVAL
+        while True:
+            try:
+                fcntl.flock(fd, self._operation | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                pass
+            if deadline is not None and time.monotonic() >= deadline:
+                os.close(fd)
+                raise LockTimeoutError
+            time.sleep(interval)
+            interval = min(interval * 2, LOCK_POLL_INTERVAL_MAX)
+        self._fd = fd
+
+    def release(self) -> None:
+        if self._fd is None:
+            return
+        fcntl.flock(self._fd, fcntl.LOCK_UN)
+        os.close(self._fd)
+        self._fd = None
+
+    def __enter__(self) -> Self:
+        self.acquire()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        exc_tb: Optional[TracebackType],
+    ) -> Literal[False]:
+        self.release()
+        return False
+
+
+def write_atomic(path: Path, data: bytes, durability: Optional[str] = None) -> None:
+    path_tmp = path.with_name(f".{path.name}.tmp")
+    try:
+        with open(path_tmp, "wb") as f:
+            with phase("write", len(data)):
+                f.write(data)
+                f.flush()
+            sync_file(f.fileno(), durability)
+        os.replace(path_tmp, path)
+    except BaseException:
+        path_tmp.unlink(missing_ok=True)
+        raise
+    sync_directory(path.parent, durability)
@@ -0,0 +1,121 @@
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+from secrets_manager import agent, store
+from secrets_manager.keyring import KEYRING_ERRORS, Keyring
+from secrets_manager.locking import DEFAULT_LOCK_TIMEOUT
+
+REFERENCE_SEPARATOR = "/"
+
+
+class ReferenceInvalidError(Exception):
+    def __init__(self, reference: str) -> None:
+        self.reference = reference
+
+
+class KeyringLookupError(Exception):
+    def __init__(self, keyring: str, error: Exception) -> None:
+        self.keyring = keyring
+        self.error = error
+
+
+class SecretsNotFoundError(Exception):
+    def __init__(self, references: List[str]) -> None:
+        self.references = references
+
+
+def parse_reference(reference: str) -> Tuple[str, str]:
+    keyring, separator, secret = reference.partition(REFERENCE_SEPARATOR)
+    if not separator or not keyring or not secret:
+        raise ReferenceInvalidError(reference)
+    return keyring, secret
+
+
+def group_references(references: Iterable[str]) -> Dict[str, List[str]]:
+    keyrings: Dict[str, List[str]] = {}
+    for reference in references:
+        keyring, secret = parse_reference(reference)
+        keyrings.setdefault(keyring, []).append(secret)
+    return keyrings
+
+
+def has_cached_key(name: str) -> bool:
+    salt, _ = Keyring.kdf_params(name)
+    return agent.get_key(Keyring.agent_id(name), salt) is not None
+
+
+def _lookup(
+    root: Path,
+    name: str,
+    password: Optional[str],
+    use_agent: bool,
+    lock_timeout: Optional[float],
+    secrets: List[str],
+) -> Dict[str, str]:
+    store.set_root(root)
+    with Keyring(name, password, use_agent, True, lock_timeout) as keyring:
+        available = set(keyring.list_secrets())
+        return {
+            secret: keyring.get_secret(secret)
+            for secret in secrets
+            if secret in available
+        }
+
+
+def _executor(workers: int) -> ProcessPoolExecutor:
+    context = multiprocessing.get_context("forkserver")
+    context.set_forkserver_preload(["secrets_manager.lookup"])
+    return ProcessPoolExecutor(max_workers=workers, mp_context=context)
+
+
+def get_many(
+    references: Iterable[str],
+    password: Optional[str] = None,
+    passwords: Optional[Mapping[str, str]] = None,
+    use_agent: bool = False,
+    lock_timeout: Optional[float] = DEFAULT_LOCK_TIMEOUT,
+    executor: Optional[Executor] = None,
+) -> Dict[str, str]:
+    references = list(references)
+    keyrings = group_references(references)
+    passwords = passwords or {}
+
+    workers = min(len(keyrings), os.cpu_count() or 1)
+    pool = executor or _executor(max(workers, 1))
+    try:
+        futures = {
+            name: pool.submit(
+                _lookup,
+                store.get_root(),
+                name,
+                passwords.get(name, password),
+                use_agent,
+                lock_timeout,
+                secrets,
+            )
+            for name, secrets in keyrings.items()
+        }
+        values = {}
+        for name, future in futures.items():
+            try:
+                values[name] = future.result()
+            except KEYRING_ERRORS as e:
+                raise KeyringLookupError(name, e)
+    finally:
+        if executor is None:
+            pool.shutdown(cancel_futures=True)
+
+    results = {}
+    missing = []
+    for reference in references:
+        keyring, secret = parse_reference(reference)
+        if secret in values[keyring]:
+            results[reference] = values[keyring][secret]
+        else:
+            missing.append(reference)
+    if missing:
+        raise SecretsNotFoundError(missing)
+    return results
@@ -0,0 +1,96 @@
+from bisect import bisect_left, bisect_right, insort
+from typing import Final, Iterable, List, Optional, Tuple
+
+SEPARATOR: Final[str] = "/"
+MAX_CHAR: Final[str] = chr(0x10FFFF)
+
+
+def _successor(prefix: str) -> Optional[str]:
+    prefix = prefix.rstrip(MAX_CHAR)
+    if not prefix:
+        return None
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def _namespace(name: str, prefix: str, depth: Optional[int]) -> Optional[str]:
+    if depth is None:
+        return None
+    end = len(prefix) - 1
+    for _ in range(depth):
+        end = name.find(SEPARATOR, end + 1)
+        if end == -1:
+            return None
+    return name[: end + 1]
+
+
+class NameIndex:
+    def __init__(self, names: Iterable[str] = ()) -> None:
+        self._names = sorted(names)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __contains__(self, name: object) -> bool:
+        if not isinstance(name, str):
+            return False
+        i = bisect_left(self._names, name)
+        return i < len(self._names) and self._names[i] == name
+
+    def add(self, name: str) -> None:
+        if name not in self:
+            insort(self._names, name)
+
+    def remove(self, name: str) -> None:
+        i = bisect_left(self._names, name)
+        if i < len(self._names) and self._names[i] == name:
+            del self._names[i]
+
+    def _bound(self, prefix: str) -> int:
+        successor = _successor(prefix)
+        if successor is None:
+            return len(self._names)
+        return bisect_left(self._names, successor)
+
+    def scope(self, prefix: str = "") -> List[str]:
+        start = bisect_left(self._names, prefix)
+        return self._names[start : self._bound(prefix)]
+
+    def remove_scope(self, prefix: str = "") -> List[str]:
+        start = bisect_left(self._names, prefix)
+        end = self._bound(prefix)
+        names = self._names[start:end]
+        del self._names[start:end]
+        return names
+
+    def list(
+        self,
+        prefix: str = "",
+        depth: Optional[int] = None,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> Tuple[List[str], Optional[str]]:
+        if depth is not None and depth < 1:
+            raise ValueError("InvalidDepth")
+        if limit is not None and limit < 1:
+            raise ValueError("InvalidLimit")
+
+        start = bisect_left(self._names, prefix)
+        end = self._bound(prefix)
+        if cursor is not None:
+            if _namespace(cursor, prefix, depth) == cursor:
+                start = max(start, self._bound(cursor))
+            else:
+                start = max(start, bisect_right(self._names, cursor))
+
+        entries: List[str] = []
+        while start < end:
+            if limit is not None and len(entries) == limit:
+                return entries, entries[-1]
+            namespace = _namespace(self._names[start], prefix, depth)
+            if namespace is None:
+                entries.append(self._names[start])
+                start += 1
+            else:
+                entries.append(namespace)
+                start = self._bound(namespace)
+        return entries, None
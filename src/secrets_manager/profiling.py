@@ -0,0 +1,113 @@
+import json
+import time
+from contextlib import contextmanager
+from types import TracebackType
+from typing import Any, Callable, Dict, Iterator, List, Literal, Optional, Type
+
+Hook = Callable[[str, float, int], None]
+
+_hooks: List[Hook] = []
+
+
+def add_hook(hook: Hook) -> None:
+    _hooks.append(hook)
+
+
+def remove_hook(hook: Hook) -> None:
+    _hooks.remove(hook)
+
+
+class Phase:
+    __slots__ = ("name", "size", "_start")
+
+    def __init__(self, name: str, size: int = 0) -> None:
+        self.name = name
+        self.size = size
+
+    def add(self, size: int) -> None:
+        self.size += size
+
+    def __enter__(self) -> "Phase":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        exc_tb: Optional[TracebackType],
+    ) -> Literal[False]:
+        elapsed = time.perf_counter() - self._start
+        for hook in list(_hooks):
+            hook(self.name, elapsed, self.size)
+        return False
+
+
+class _DisabledPhase(Phase):
+    __slots__ = ()
+
+    def __init__(self) -> None:
+        pass
+
+    def add(self, size: int) -> None:
+        pass
+
+    def __enter__(self) -> Phase:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        exc_tb: Optional[TracebackType],
+    ) -> Literal[False]:
+        return False
+
+
+_DISABLED = _DisabledPhase()
+
+
+def phase(name: str, size: int = 0) -> Phase:
+    if not _hooks:
+        return _DISABLED
+    return Phase(name, size)
+
+
+class Trace:
+    def __init__(self) -> None:
+        self._start = time.perf_counter()
+        self.events: List[Dict[str, Any]] = []
+
+    def __call__(self, name: str, seconds: float, size: int) -> None:
+        start = time.perf_counter() - seconds - self._start
+        self.events.append(
+            {"phase": name, "start": start, "seconds": seconds, "bytes": size}
+        )
+
+    def summary(self) -> Dict[str, Any]:
+        phases: Dict[str, Dict[str, Any]] = {}
+        for event in self.events:
+            totals = phases.setdefault(
+                event["phase"], {"count": 0, "seconds": 0.0, "bytes": 0}
+            )
+            totals["count"] += 1
+            totals["seconds"] += event["seconds"]
+            totals["bytes"] += event["bytes"]
+        return {
+            "seconds": time.perf_counter() - self._start,
+            "phases": phases,
+            "events": self.events,
+        }
+
+    def dumps(self) -> str:
+        return json.dumps(self.summary())
+
+
+@contextmanager
+def trace() -> Iterator[Trace]:
+    recorder = Trace()
+    add_hook(recorder)
+    try:
+        yield recorder
+    finally:
+        remove_hook(recorder)
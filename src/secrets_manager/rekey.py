@@ -0,0 +1,142 @@
+import json
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import (
+    Callable,
+    Final,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    TextIO,
+    Tuple,
+    Type,
+)
+
+from secrets_manager import store
+from secrets_manager.keyring import KEYRING_ERRORS, Keyring
+from secrets_manager.locking import DEFAULT_LOCK_TIMEOUT
+
+REKEY_DONE: Final[str] = "rekeyed"
+REKEY_ALREADY: Final[str] = "already rekeyed"
+REKEY_SKIPPED: Final[str] = "skipped"
+REKEY_FAILED: Final[str] = "failed"
+REKEY_COMPLETED: Final[Tuple[str, ...]] = (REKEY_DONE, REKEY_ALREADY)
+
+RekeyEntry = Tuple[str, str, str]
+RekeyResult = Tuple[str, str, Optional[Exception]]
+RekeyWorker = Callable[[Path, str, str, str, Optional[float]], str]
+
+
+class RekeyFileInvalidError(Exception):
+    def __init__(self, line: int) -> None:
+        self.line = line
+
+
+def read_rekey_file(f: TextIO) -> List[RekeyEntry]:
+    entries = []
+    for number, line in enumerate(f, 1):
+        line = line.rstrip("\n")
+        if not line or line.startswith("#"):
+            continue
+        fields = line.split("\t")
+        if len(fields) != 3 or not fields[0]:
+            raise RekeyFileInvalidError(number)
+        entries.append((fields[0], fields[1], fields[2]))
+    return entries
+
+
+class Journal:
+    def __init__(self, path: Optional[Path] = None) -> None:
+        self.path = path or store.get_root() / store.REKEY_JOURNAL
+
+    def completed(self) -> Set[str]:
+        status = {}
+        try:
+            with open(self.path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    status[entry["keyring"]] = entry["status"]
+        except FileNotFoundError:
+            pass
+        return {name for name, state in status.items() if state in REKEY_COMPLETED}
+
+    def record(self, name: str, status: str) -> None:
+        with open(self.path, "a") as f:
+            f.write(json.dumps({"keyring": name, "status": status}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def remove(self) -> None:
+        self.path.unlink(missing_ok=True)
+
+
+def rekey_keyring(
+    root: Path,
+    name: str,
+    old_password: str,
+    new_password: str,
+    lock_timeout: Optional[float] = DEFAULT_LOCK_TIMEOUT,
+) -> str:
+    store.set_root(root)
+    try:
+        with Keyring(name, old_password, lock_timeout=lock_timeout) as keyring:
+            keyring.rekey(new_password)
+    except ValueError:
+        with Keyring(name, new_password, read_only=True, lock_timeout=lock_timeout):
+            pass
+        return REKEY_ALREADY
+    return REKEY_DONE
+
+
+def _executor(jobs: int) -> ProcessPoolExecutor:
+    context = multiprocessing.get_context("forkserver")
+    return ProcessPoolExecutor(max_workers=jobs, mp_context=context)
+
+
+def rekey_all(
+    entries: Iterable[RekeyEntry],
+    journal: Journal,
+    worker: RekeyWorker = rekey_keyring,
+    jobs: Optional[int] = None,
+    lock_timeout: Optional[float] = DEFAULT_LOCK_TIMEOUT,
+    executor: Optional[Executor] = None,
+    errors: Tuple[Type[Exception], ...] = KEYRING_ERRORS,
+) -> Iterator[RekeyResult]:
+    completed = journal.completed()
+    pending = []
+    for name, old_password, new_password in entries:
+        if name in completed:
+            yield name, REKEY_SKIPPED, None
+        else:
+            pending.append((name, old_password, new_password))
+    if not pending:
+        return
+
+    pool = executor or _executor(min(len(pending), jobs or os.cpu_count() or 1))
+    try:
+        futures = {
+            pool.submit(
+                worker, store.get_root(), name, old_password, new_password, lock_timeout
+            ): name
+            for name, old_password, new_password in pending
+        }
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                status = future.result()
+            except errors as e:
+                journal.record(name, REKEY_FAILED)
+                yield name, REKEY_FAILED, e
+                continue
+            journal.record(name, status)
+            yield name, status, None
+    finally:
+        if executor is None:
+            pool.shutdown(cancel_futures=True)
@@ -0,0 +1,261 @@
+import json
+import os
+import socket
+import socketserver
+import stat
+import struct
+from pathlib import Path
+from typing import Any, Callable, Dict, Final, Iterable, List, Optional, Tuple
+
+from secrets_manager.agent import PRIVATE_MODE_MASK, _alive, _check_private
+from secrets_manager.keyring import KEYRING_ERRORS, Keyring
+from secrets_manager.store import keyring_path
+
+SERVER_SOCKET_ENV: Final[str] = "SECRETS_MANAGER_SERVER_SOCK"
+SERVER_POLL_INTERVAL: Final[float] = 1.0
+MAX_FRAME_SIZE: Final[int] = 16 * 1024 * 1024
+SHARED_DIR_MODE_MASK: Final[int] = 0o022
+PRIVATE_UMASK: Final[int] = 0o177
+GROUP_UMASK: Final[int] = 0o117
+SHARED_UMASK: Final[int] = 0o111
+
+_FRAME: Final[struct.Struct] = struct.Struct(">I")
+
+FileState = Tuple[int, int, int]
+ReloadErrorHandler = Callable[[str, Exception], None]
+
+
+class ProtocolError(Exception):
+    def __init__(self) -> None:
+        pass
+
+
+class ServerAlreadyRunningError(Exception):
+    def __init__(self) -> None:
+        pass
+
+
+def default_socket_path() -> Path:
+    env = os.environ.get(SERVER_SOCKET_ENV)
+    if env:
+        return Path(env)
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return Path(runtime_dir) / "secrets-manager" / "server.sock"
+    return Path(f"/tmp/secrets-manager-{os.getuid()}") / "server.sock"
+
+
+def peer_credentials(conn: socket.socket) -> Optional[Tuple[int, int, int]]:
+    if not hasattr(socket, "SO_PEERCRED"):
+        return None
+    creds = conn.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, 12)
+    pid, uid, gid = struct.unpack("iII", creds)
+    return pid, uid, gid
+
+
+def send_frame(conn: socket.socket, message: Dict[str, Any]) -> None:
+    payload = json.dumps(message, separators=(",", ":")).encode()
+    conn.sendall(_FRAME.pack(len(payload)) + payload)
+
+
+def _recv_exactly(conn: socket.socket, size: int) -> Optional[bytes]:
+    data = bytearray()
+    while len(data) < size:
+        chunk = conn.recv(size - len(data))
+        if not chunk:
+            if data:
+                raise ProtocolError
+            return None
+        data += chunk
+    return bytes(data)
+
+
+def recv_frame(conn: socket.socket) -> Optional[Dict[str, Any]]:
+    header = _recv_exactly(conn, _FRAME.size)
+    if header is None:
+        return None
+    (length,) = _FRAME.unpack(header)
+    if length > MAX_FRAME_SIZE:
+        raise ProtocolError
+    payload = _recv_exactly(conn, length)
+    if payload is None:
+        raise ProtocolError
+    try:
+        message = json.loads(payload)
+    except ValueError:
+        raise ProtocolError
+    if not isinstance(message, dict):
+        raise ProtocolError
+    return message
+
+
+class ServedKeyring:
+    def __init__(self, name: str, password: Optional[str], use_agent: bool) -> None:
+        self.name = name
+        self._password = password
+        self._use_agent = use_agent
+        self._key: Optional[bytes] = None
+        self._path = keyring_path(name)
+        self.state: Optional[FileState] = None
+        self.secrets: Dict[str, str] = {}
+        self.load()
+
+    def _stat(self) -> Optional[FileState]:
+        try:
+            stat = os.stat(self._path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+    def changed(self) -> bool:
+        return self._stat() != self.state
+
+    def load(self) -> None:
+        self.state = self._stat()
+        with Keyring(
+            self.name, self._password, self._use_agent, True, key=self._key
+        ) as keyring:
+            secrets = {
+                name: keyring.get_secret(name) for name in keyring.list_secrets()
+            }
+            self._key = keyring.key
+        self.secrets = secrets
+
+
+class _ServerHandler(socketserver.BaseRequestHandler):
+    server: "SecretsServer"
+
+    def handle(self) -> None:
+        creds = peer_credentials(self.request)
+        if creds is None or not self.server.allowed(creds[1], creds[2]):
+            return
+        while True:
+            try:
+                request = recv_frame(self.request)
+            except (ProtocolError, OSError):
+                return
+            if request is None:
+                return
+            try:
+                response = self.server.dispatch(request)
+            except (KeyError, TypeError):
+                response = {"ok": False, "error": "bad request"}
+            try:
+                send_frame(self.request, response)
+            except OSError:
+                return
+
+
+class SecretsServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        path: Path,
+        keyrings: Iterable[ServedKeyring],
+        allowed_uids: Iterable[int] = (),
+        allowed_gids: Iterable[int] = (),
+        on_reload_error: Optional[ReloadErrorHandler] = None,
+    ) -> None:
+        self.keyrings = {keyring.name: keyring for keyring in keyrings}
+        self._allowed_uids = {os.getuid(), *allowed_uids}
+        self._allowed_gids = set(allowed_gids)
+        self._on_reload_error = on_reload_error
+        shared = self._allowed_uids != {os.getuid()} or bool(self._allowed_gids)
+        path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        dir_mask = SHARED_DIR_MODE_MASK if shared else PRIVATE_MODE_MASK
+        _check_private(path.parent, stat.S_ISDIR, dir_mask)
+        if os.path.lexists(path):
+            _check_private(path, stat.S_ISSOCK, 0 if shared else PRIVATE_MODE_MASK)
+            if _alive(path):
+                raise ServerAlreadyRunningError
+            path.unlink()
+
+        group = len(self._allowed_gids) == 1 and self._allowed_uids == {os.getuid()}
+        if not shared:
+            umask = PRIVATE_UMASK
+        elif group:
+            umask = GROUP_UMASK
+        else:
+            umask = SHARED_UMASK
+        old_umask = os.umask(umask)
+        try:
+            super().__init__(str(path), _ServerHandler)
+        finally:
+            os.umask(old_umask)
+        self._path = path
+        if group:
+            try:
+                os.chown(path, -1, *self._allowed_gids)
+            except OSError:
+                self.server_close()
+                raise
+
+    def allowed(self, uid: int, gid: int) -> bool:
+        return uid in self._allowed_uids or gid in self._allowed_gids
+
+    def service_actions(self) -> None:
+        self.reload()
+
+    def reload(self) -> List[str]:
+        reloaded = []
+        for keyring in self.keyrings.values():
+            if not keyring.changed():
+                continue
+            try:
+                keyring.load()
+            except KEYRING_ERRORS as e:
+                if self._on_reload_error is not None:
+                    self._on_reload_error(keyring.name, e)
+                continue
+            reloaded.append(keyring.name)
+        return reloaded
+
+    def server_close(self) -> None:
+        super().server_close()
+        self.keyrings.clear()
+        if self._path.exists():
+            self._path.unlink()
+
+    def _secrets(self, request: Dict[str, Any]) -> Optional[Dict[str, str]]:
+        keyring = self.keyrings.get(request["keyring"])
+        if keyring is None:
+            return None
+        return keyring.secrets
+
+    def dispatch(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        op = request["op"]
+        if op == "keyrings":
+            return {"ok": True, "keyrings": list(self.keyrings)}
+
+        secrets = self._secrets(request)
+        if secrets is None:
+            return {"ok": False, "error": "keyring not found"}
+        if op == "get":
+            value = secrets.get(request["name"])
+            if value is None:
+                return {"ok": False, "error": "secret not found"}
+            return {"ok": True, "value": value}
+        elif op == "get_many":
+            values = {name: secrets.get(name) for name in request["names"]}
+            return {"ok": True, "values": values}
+        elif op == "list":
+            return {"ok": True, "secrets": list(secrets)}
+        return {"ok": False, "error": "unknown operation"}
+
+
+def serve(
+    path: Path,
+    keyrings: Iterable[ServedKeyring],
+    allowed_uids: Iterable[int] = (),
+    allowed_gids: Iterable[int] = (),
+    poll_interval: float = SERVER_POLL_INTERVAL,
+    on_reload_error: Optional[ReloadErrorHandler] = None,
+) -> None:
+    with SecretsServer(
+        path, keyrings, allowed_uids, allowed_gids, on_reload_error
+    ) as server:
+        try:
+            server.serve_forever(poll_interval=poll_interval)
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,186 @@
+import hashlib
+import json
+import os
+from contextlib import ExitStack
+from pathlib import Path
+from typing import Any, Dict, Final, Iterator, List, Optional
+
+from secrets_manager.fileformat import FileFormatError, unpack_header
+from secrets_manager.locking import (
+    DEFAULT_LOCK_TIMEOUT,
+    FileLock,
+    lock_path,
+    write_atomic,
+)
+
+STORE_ENV: Final[str] = "SECRETS_MANAGER_STORE"
+FILE_EXTENSION: Final[str] = ".db"
+LAYOUT_FILE: Final[str] = ".store.json"
+CATALOG_FILE: Final[str] = ".catalog.json"
+REKEY_JOURNAL: Final[str] = ".rekey.journal"
+CATALOG_VERSION: Final[int] = 1
+SHARD_WIDTH: Final[int] = 2
+MAX_SHARD_LEVELS: Final[int] = 4
+
+CatalogEntry = Dict[str, Any]
+
+_root: Optional[Path] = None
+
+
+class KeyringNameInvalidError(Exception):
+    def __init__(self) -> None:
+        pass
+
+
+def set_root(path: Optional[Path]) -> None:
+    global _root
+    _root = path
+
+
+def get_root() -> Path:
+    if _root is not None:
+        return _root
+    env = os.environ.get(STORE_ENV)
+    if env:
+        return Path(env)
+    return Path.cwd()
+
+
+def _read_json(path: Path) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path) as f:
+            data: Dict[str, Any] = json.load(f)
+    except FileNotFoundError:
+        return None
+    return data
+
+
+def shard_levels(root: Optional[Path] = None) -> int:
+    layout = _read_json((root or get_root()) / LAYOUT_FILE)
+    return int(layout["shards"]) if layout else 0
+
+
+def _shard(name: str, levels: int) -> Path:
+    digest = hashlib.sha256(name.encode()).hexdigest()
+    return Path(
+        *(digest[i * SHARD_WIDTH : (i + 1) * SHARD_WIDTH] for i in range(levels))
+    )
+
+
+def keyring_path(name: str, root: Optional[Path] = None) -> Path:
+    if not name or name.startswith(".") or "/" in name or "\0" in name:
+        raise KeyringNameInvalidError
+    root = root or get_root()
+    return root / _shard(name, shard_levels(root)) / f"{name}{FILE_EXTENSION}"
+
+
+def blobs_path(path: Path) -> Path:
+    return path.with_name(f".{path.name}.blobs")
+
+
+def _scan(root: Path, levels: int) -> Iterator[Path]:
+    pattern = "/".join(["*"] * levels + ["*" + FILE_EXTENSION])
+    for path in root.glob(pattern):
+        if path.is_file() and not path.name.startswith("."):
+            yield path
+
+
+def describe(path: Path) -> CatalogEntry:
+    with open(path, "rb") as f:
+        data = f.read()
+    entry: CatalogEntry = {"size": len(data), "secrets": None}
+    try:
+        entry["version"], entry["backend"], _, _ = unpack_header(data)
+    except FileFormatError:
+        entry.update(version=None, backend=None)
+    return entry
+
+
+class Catalog:
+    def __init__(self, root: Optional[Path] = None) -> None:
+        self._root = root or get_root()
+        self._path = self._root / CATALOG_FILE
+        self._lock_path = self._root / f"{CATALOG_FILE}.lock"
+
+    def _read(self) -> Optional[Dict[str, CatalogEntry]]:
+        catalog = _read_json(self._path)
+        if catalog is None or catalog.get("version") != CATALOG_VERSION:
+            return None
+        keyrings: Dict[str, CatalogEntry] = catalog["keyrings"]
+        return keyrings
+
+    def _write(self, keyrings: Dict[str, CatalogEntry]) -> None:
+        catalog = {"version": CATALOG_VERSION, "keyrings": keyrings}
+        write_atomic(self._path, json.dumps(catalog, sort_keys=True).encode())
+
+    def _scan(self) -> Dict[str, CatalogEntry]:
+        keyrings = {}
+        for path in _scan(self._root, shard_levels(self._root)):
+            try:
+                keyrings[path.name.removesuffix(FILE_EXTENSION)] = describe(path)
+            except OSError:
+                continue
+        return keyrings
+
+    def entries(self, backend: Optional[str] = None) -> Dict[str, CatalogEntry]:
+        keyrings = self._read()
+        if keyrings is None:
+            keyrings = self.rebuild()
+        if backend is not None:
+            keyrings = {
+                name: entry
+                for name, entry in keyrings.items()
+                if entry.get("backend") == backend
+            }
+        return keyrings
+
+    def rebuild(self) -> Dict[str, CatalogEntry]:
+        if not self._root.is_dir():
+            return {}
+        with FileLock(self._lock_path):
+            keyrings = self._scan()
+            self._write(keyrings)
+        return keyrings
+
+    def record(self, name: str, **entry: Any) -> None:
+        with FileLock(self._lock_path):
+            keyrings = self._read()
+            if keyrings is None:
+                keyrings = self._scan()
+            keyrings[name] = {**keyrings.get(name, {}), **entry}
+            self._write(keyrings)
+
+    def remove(self, name: str) -> None:
+        with FileLock(self._lock_path):
+            keyrings = self._read()
+            if keyrings is None:
+                keyrings = self._scan()
+            keyrings.pop(name, None)
+            self._write(keyrings)
+
+    def reshard(
+        self, levels: int, lock_timeout: Optional[float] = DEFAULT_LOCK_TIMEOUT
+    ) -> List[str]:
+        if not 0 <= levels <= MAX_SHARD_LEVELS:
+            raise ValueError("InvalidShardLevels")
+        with FileLock(self._lock_path), ExitStack() as locks:
+            moves = []
+            for path in list(_scan(self._root, shard_levels(self._root))):
+                name = path.name.removesuffix(FILE_EXTENSION)
+                target = self._root / _shard(name, levels) / path.name
+                if target != path:
+                    locks.enter_context(FileLock(lock_path(path), timeout=lock_timeout))
+                    moves.append((name, path, target))
+
+            moved = []
+            for name, path, target in moves:
+                target.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(path, target)
+                if blobs_path(path).is_dir():
+                    os.replace(blobs_path(path), blobs_path(target))
+                lock_path(path).unlink(missing_ok=True)
+                moved.append(name)
+            write_atomic(
+                self._root / LAYOUT_FILE, json.dumps({"shards": levels}).encode()
+            )
+        return moved
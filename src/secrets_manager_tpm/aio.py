@@ -0,0 +1,182 @@
+import asyncio
+import time
+from concurrent.futures import Executor
+from functools import partial
+from types import TracebackType
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Dict,
+    List,
+    Literal,
+    Optional,
+    Self,
+    Tuple,
+    Type,
+)
+
+from secrets_manager.locking import DEFAULT_LOCK_TIMEOUT
+from secrets_manager_tpm.keyring import Keyring
+
+UnwrappedKey = Optional[Tuple[bytes, bytes]]
+
+
+class KeyringClosedError(Exception):
+    def __init__(self) -> None:
+        pass
+
+
+_unlocks: Dict[Tuple[Any, ...], "asyncio.Future[UnwrappedKey]"] = {}
+
+
+async def _unwrap_key(
+    name: str, password: bytes, executor: Optional[Executor]
+) -> UnwrappedKey:
+    loop = asyncio.get_running_loop()
+    unlock = (loop, name, password)
+    future = _unlocks.get(unlock)
+    if future is None:
+        future = asyncio.ensure_future(
+            loop.run_in_executor(executor, Keyring.unwrap_key, name, password)
+        )
+        _unlocks[unlock] = future
+        future.add_done_callback(lambda _: _unlocks.pop(unlock, None))
+    return await asyncio.shield(future)
+
+
+class AsyncKeyring:
+    def __init__(
+        self,
+        name: str,
+        password: bytes,
+        read_only: bool = False,
+        lock_timeout: Optional[float] = DEFAULT_LOCK_TIMEOUT,
+        executor: Optional[Executor] = None,
+        durability: Optional[str] = None,
+        commit_window: Optional[float] = None,
+    ) -> None:
+        self._name = name
+        self._password = password
+        self._read_only = read_only
+        self._lock_timeout = lock_timeout
+        self._executor = executor
+        self._durability = durability
+        self._commit_window = commit_window
+        self._keyring: Optional[Keyring] = None
+        self._lock = asyncio.Lock()
+        self._flush: Optional[asyncio.TimerHandle] = None
+        self._flushing: Optional["asyncio.Future[bool]"] = None
+
+    async def open(self) -> None:
+        unwrapped_key = await _unwrap_key(self._name, self._password, self._executor)
+
+        loop = asyncio.get_running_loop()
+        self._keyring = await loop.run_in_executor(
+            self._executor,
+            partial(
+                Keyring,
+                self._name,
+                self._password,
+                read_only=self._read_only,
+                lock_timeout=self._lock_timeout,
+                unwrapped_key=unwrapped_key,
+                durability=self._durability,
+                commit_window=self._commit_window,
+            ),
+        )
+
+    @property
+    def keyring(self) -> Keyring:
+        if self._keyring is None:
+            raise KeyringClosedError
+        return self._keyring
+
+    async def _run(self, function: Callable[..., Any], *args: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            return await loop.run_in_executor(self._executor, function, *args)
+
+    async def get_secret(self, name: str) -> str:
+        value: str = await self._run(self.keyring.get_secret, name)
+        return value
+
+    async def list_secrets(self) -> List[str]:
+        secrets: List[str] = await self._run(self.keyring.list_secrets)
+        return secrets
+
+    async def add_secret(self, name: str, value: str) -> None:
+        await self._run(self.keyring.add_secret, name, value)
+
+    async def update_secret(self, name: str, value: str) -> None:
+        await self._run(self.keyring.update_secret, name, value)
+
+    async def remove_secret(self, name: str) -> None:
+        await self._run(self.keyring.remove_secret, name)
+
+    async def list_names(
+        self,
+        prefix: str = "",
+        depth: Optional[int] = None,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> Tuple[List[str], Optional[str]]:
+        page: Tuple[List[str], Optional[str]] = await self._run(
+            self.keyring.list_names, prefix, depth, cursor, limit
+        )
+        return page
+
+    async def remove_prefix(self, prefix: str) -> List[str]:
+        names: List[str] = await self._run(self.keyring.remove_prefix, prefix)
+        return names
+
+    async def list_files(self) -> Dict[str, int]:
+        files: Dict[str, int] = await self._run(self.keyring.list_files)
+        return files
+
+    async def put_file(self, name: str, source: BinaryIO) -> None:
+        await self._run(self.keyring.put_file, name, source)
+
+    async def get_file(self, name: str, sink: BinaryIO) -> None:
+        await self._run(self.keyring.get_file, name, sink)
+
+    async def commit(self) -> bool:
+        committed: bool = await self._run(self.keyring.commit)
+        if not committed:
+            self._schedule_flush()
+        return committed
+
+    def _schedule_flush(self) -> None:
+        deadline = self.keyring.commit_deadline
+        if self._flush is not None or deadline is None:
+            return
+        loop = asyncio.get_running_loop()
+        self._flush = loop.call_later(deadline - time.monotonic(), self._start_flush)
+
+    def _start_flush(self) -> None:
+        self._flush = None
+        if self._keyring is not None:
+            self._flushing = asyncio.ensure_future(self.commit())
+
+    async def save(self) -> None:
+        await self._run(self.keyring.save)
+
+    async def close(self) -> None:
+        if self._flush is not None:
+            self._flush.cancel()
+            self._flush = None
+        await self._run(self.keyring.__exit__, None, None, None)
+        self._keyring = None
+
+    async def __aenter__(self) -> Self:
+        await self.open()
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        exc_tb: Optional[TracebackType],
+    ) -> Literal[False]:
+        await self.close()
+        return False
@@ -1,13 +1,60 @@
+from pathlib import Path
+from typing import Dict, Final, Optional
+
 import click
-from secrets_manager_tpm.cli.keyring import keyring
-from secrets_manager_tpm.cli.secrets import secrets
+from click.core import Context
+from secrets_manager.cli.lazy import LazyCommand, LazyGroup
+from secrets_manager.locking import (
+    DEFAULT_DURABILITY,
+    DURABILITIES,
+    DURABILITY_ENV,
+    set_durability,
+)
+from secrets_manager.profiling import Trace, add_hook, remove_hook
+from secrets_manager.store import STORE_ENV, set_root
+
+COMMANDS: Final[Dict[str, LazyCommand]] = {
+    "keyring": ("secrets_manager_tpm.cli.keyring:keyring", "Keyring management"),
+    "secrets": ("secrets_manager_tpm.cli.secrets:secrets", "Secrets management"),
+}
 
 
-@click.group(help="Keyring application to store secrets")
+@click.group(
+    cls=LazyGroup,
+    lazy_commands=COMMANDS,
+    help="Keyring application to store secrets",
+)
 @click.version_option()
-def cli() -> None:
-    pass
+@click.option(
+    "--store",
+    type=click.Path(file_okay=False, path_type=Path),
+    envvar=STORE_ENV,
+    help=f"Directory holding the keyrings (default: ${STORE_ENV} or cwd)",
+)
+@click.option(
+    "--durability",
+    type=click.Choice(DURABILITIES),
+    envvar=DURABILITY_ENV,
+    help=f"How keyring writes are synced to disk (default: {DEFAULT_DURABILITY})",
+)
+@click.option(
+    "--profile",
+    is_flag=True,
+    default=False,
+    help="Print a JSON trace of the time spent in each phase to stderr",
+)
+@click.pass_context
+def cli(
+    ctx: Context, store: Optional[Path], durability: Optional[str], profile: bool
+) -> None:
+    set_root(store)
+    set_durability(durability)
+    if profile:
+        trace = Trace()
+        add_hook(trace)
 
+        def report() -> None:
+            remove_hook(trace)
+            click.echo(trace.dumps(), err=True)
 
-cli.add_command(keyring)
-cli.add_command(secrets)
+        ctx.call_on_close(report)
@@ -1,16 +1,21 @@
+from pathlib import Path
+from typing import Dict, Optional, TextIO, Type
+
 import click
 from click.core import Context
-from secrets_manager_tpm.keyring import (
-    Keyring,
-    KeyringNotFoundError,
-    KeyringAlreadyExistsError,
+from secrets_manager.fileformat import (
+    BACKEND_TPM,
+    COMPRESSIONS,
+    DEFAULT_COMPRESSION_THRESHOLD,
+    FORMAT_NAMES,
+    TPM_STORAGE_FORMATS,
 )
-from secrets_manager_tpm.tpm import (
-    KeyNotFoundError,
-    KeyAlreadyExistsError,
-    PolicyNotFoundError,
-    PolicyValueError,
-    TpmNotFoundError,
+from secrets_manager.locking import DEFAULT_LOCK_TIMEOUT, LOCK_TIMEOUT_ENV
+from secrets_manager.store import (
+    MAX_SHARD_LEVELS,
+    REKEY_JOURNAL,
+    Catalog,
+    KeyringNameInvalidError,
 )
 
 
@@ -36,13 +41,67 @@ def keyring() -> None:
     default=False,
     help="Bind key usage to trusted platform configuration",
 )
+@click.option(
+    "--storage",
+    type=click.Choice(list(TPM_STORAGE_FORMATS)),
+    default="envelope",
+    show_default=True,
+    help="Storage format of the keyring file",
+)
+@click.option(
+    "--compression",
+    type=click.Choice(COMPRESSIONS),
+    default="none",
+    show_default=True,
+    help="Compress payloads before encryption",
+)
+@click.option(
+    "--compression-threshold",
+    type=click.IntRange(min=0),
+    default=DEFAULT_COMPRESSION_THRESHOLD,
+    show_default=True,
+    help="Only compress payloads of at least this many bytes",
+)
 @click.pass_context
-def keyring_create(ctx: Context, name: str, password: str, bind_platform: bool) -> None:
+def keyring_create(
+    ctx: Context,
+    name: str,
+    password: str,
+    bind_platform: bool,
+    storage: str,
+    compression: str,
+    compression_threshold: int,
+) -> None:
+    from secrets_manager.compression import (
+        CompressionUnavailableError,
+        compression_params,
+    )
+    from secrets_manager_tpm.keyring import Keyring, KeyringAlreadyExistsError
+    from secrets_manager_tpm.tpm import (
+        KeyAlreadyExistsError,
+        KeyNotFoundError,
+        PolicyNotFoundError,
+        PolicyValueError,
+        TpmNotFoundError,
+    )
+
     try:
-        Keyring.create_keyring(name, password.encode(), bind_platform)
+        Keyring.create_keyring(
+            name,
+            password.encode(),
+            bind_platform,
+            TPM_STORAGE_FORMATS[storage],
+            compression_params(compression, compression_threshold),
+        )
+    except CompressionUnavailableError:
+        click.echo(f"Error: Compression {compression} is not available.", err=True)
+        ctx.exit(1)
     except KeyringAlreadyExistsError:
         click.echo("Error: Keyring already exists.", err=True)
         ctx.exit(1)
+    except KeyringNameInvalidError:
+        click.echo("Error: Invalid keyring name.", err=True)
+        ctx.exit(1)
     except KeyNotFoundError:
         click.echo("Error: Key not found in keystore.", err=True)
         ctx.exit(1)
@@ -61,24 +120,410 @@ def keyring_create(ctx: Context, name: str, password: str, bind_platform: bool)
 
 
 @keyring.command("list", help="List keyrings")
-def keyring_list() -> None:
-    keyrings = Keyring.list_keyrings()
-    for keyring in keyrings:
-        print(keyring)
+@click.option("--prefix", default="", help="Only list keyrings starting with this")
+@click.option(
+    "--storage",
+    type=click.Choice(list(FORMAT_NAMES.values())),
+    help="Only list keyrings in this storage format",
+)
+@click.option(
+    "--min-secrets",
+    type=click.IntRange(min=0),
+    help="Only list keyrings with at least this many secrets",
+)
+@click.option(
+    "-l", "--long", is_flag=True, help="Show storage format, secrets and size"
+)
+@click.option(
+    "--refresh", is_flag=True, help="Rebuild the catalog from the keyring files"
+)
+def keyring_list(
+    prefix: str,
+    storage: Optional[str],
+    min_secrets: Optional[int],
+    long: bool,
+    refresh: bool,
+) -> None:
+    if refresh:
+        Catalog().rebuild()
+    keyrings = Catalog().entries(BACKEND_TPM)
+
+    for name, entry in sorted(keyrings.items()):
+        if not name.startswith(prefix):
+            continue
+        if storage is not None and FORMAT_NAMES.get(entry["version"]) != storage:
+            continue
+        if min_secrets is not None and (entry["secrets"] or 0) < min_secrets:
+            continue
+        if long:
+            secrets = "-" if entry["secrets"] is None else entry["secrets"]
+            version = FORMAT_NAMES.get(entry["version"], "-")
+            print(f"{name}\t{version}\t{secrets}\t{entry['size']}")
+        else:
+            print(name)
+
+
+@keyring.command("reshard", help="Spread keyring files over hashed subdirectories")
+@click.option(
+    "--levels",
+    required=True,
+    type=click.IntRange(min=0, max=MAX_SHARD_LEVELS),
+    help="Number of subdirectory levels, 0 for a flat store",
+)
+@click.option(
+    "--lock-timeout",
+    type=click.FloatRange(min=0),
+    default=DEFAULT_LOCK_TIMEOUT,
+    show_default=True,
+    envvar=LOCK_TIMEOUT_ENV,
+    help="Seconds to wait for other processes using a keyring",
+)
+@click.pass_context
+def keyring_reshard(ctx: Context, levels: int, lock_timeout: float) -> None:
+    from secrets_manager.locking import LockTimeoutError
+
+    try:
+        moved = Catalog().reshard(levels, lock_timeout)
+    except LockTimeoutError:
+        click.echo("Error: Keyring is locked by another process.", err=True)
+        ctx.exit(1)
+    except OSError as e:
+        click.echo(f"Error: Cannot move keyring files: {e.strerror}.", err=True)
+        ctx.exit(1)
+    print(f"Moved {len(moved)} keyrings.")
 
 
 @keyring.command("remove", help="Remove a keyring")
 @click.argument("name", required=True, type=str)
 @click.pass_context
 def keyring_remove(ctx: Context, name: str) -> None:
+    from secrets_manager.locking import LockTimeoutError
+    from secrets_manager_tpm.keyring import Keyring, KeyringNotFoundError
+    from secrets_manager_tpm.tpm import KeyNotFoundError, TpmNotFoundError
+
     try:
         Keyring.remove_keyring(name)
     except KeyringNotFoundError:
         click.echo("Error: Keyring not found.", err=True)
         ctx.exit(1)
+    except KeyringNameInvalidError:
+        click.echo("Error: Invalid keyring name.", err=True)
+        ctx.exit(1)
+    except LockTimeoutError:
+        click.echo("Error: Keyring is locked by another process.", err=True)
+        ctx.exit(1)
     except KeyNotFoundError:
         click.echo("Error: Key not found on TPM.", err=True)
         ctx.exit(1)
     except TpmNotFoundError:
         click.echo("Error: TPM not found.", err=True)
         ctx.exit(1)
+
+
+@keyring.command("migrate", help="Migrate a keyring to another storage format")
+@click.argument("name", required=True, type=str)
+@click.option(
+    "-p",
+    "--password",
+    required=True,
+    prompt=True,
+    hide_input=True,
+    type=str,
+    help="Password of the keyring",
+)
+@click.option(
+    "--storage",
+    type=click.Choice(list(TPM_STORAGE_FORMATS)),
+    default="log",
+    show_default=True,
+    help="Storage format of the keyring file",
+)
+@click.option(
+    "--compression",
+    type=click.Choice(COMPRESSIONS),
+    default=None,
+    help="Change the compression of payloads before encryption",
+)
+@click.option(
+    "--compression-threshold",
+    type=click.IntRange(min=0),
+    default=DEFAULT_COMPRESSION_THRESHOLD,
+    show_default=True,
+    help="Only compress payloads of at least this many bytes",
+)
+@click.pass_context
+def keyring_migrate(
+    ctx: Context,
+    name: str,
+    password: str,
+    storage: str,
+    compression: Optional[str],
+    compression_threshold: int,
+) -> None:
+    from secrets_manager.compression import (
+        CompressionUnavailableError,
+        compression_params,
+    )
+    from secrets_manager.locking import LockTimeoutError
+    from secrets_manager_tpm.keyring import (
+        Keyring,
+        KeyringFileInvalidError,
+        KeyringNotFoundError,
+    )
+    from secrets_manager_tpm.tpm import (
+        InvalidEncryptedDataError,
+        KeyNotFoundError,
+        TpmNotFoundError,
+        WrongPasswordError,
+    )
+
+    try:
+        if compression is not None:
+            params = compression_params(compression, compression_threshold)
+        with Keyring(name, password.encode()) as instance:
+            instance.migrate(TPM_STORAGE_FORMATS[storage])
+            if compression is not None:
+                instance.set_compression(params)
+    except CompressionUnavailableError:
+        click.echo(f"Error: Compression {compression} is not available.", err=True)
+        ctx.exit(1)
+    except KeyringNotFoundError:
+        click.echo("Error: Keyring not found.", err=True)
+        ctx.exit(1)
+    except KeyringFileInvalidError:
+        click.echo("Error: Keyring file invalid", err=True)
+        ctx.exit(1)
+    except KeyringNameInvalidError:
+        click.echo("Error: Invalid keyring name.", err=True)
+        ctx.exit(1)
+    except LockTimeoutError:
+        click.echo("Error: Keyring is locked by another process.", err=True)
+        ctx.exit(1)
+    except KeyNotFoundError:
+        click.echo("Error: Key not found in keystore.", err=True)
+        ctx.exit(1)
+    except InvalidEncryptedDataError:
+        click.echo("Error: Encrypted data has wrong format.", err=True)
+        ctx.exit(1)
+    except TpmNotFoundError:
+        click.echo("Error: TPM not found.", err=True)
+        ctx.exit(1)
+    except WrongPasswordError:
+        click.echo("Error: Wrong password.", err=True)
+        ctx.exit(1)
+
+
+@keyring.command("compact", help="Compact the log of a log-structured keyring")
+@click.argument("name", required=True, type=str)
+@click.option(
+    "-p",
+    "--password",
+    required=True,
+    prompt=True,
+    hide_input=True,
+    type=str,
+    help="Password of the keyring",
+)
+@click.pass_context
+def keyring_compact(ctx: Context, name: str, password: str) -> None:
+    from secrets_manager.locking import LockTimeoutError
+    from secrets_manager_tpm.keyring import (
+        Keyring,
+        KeyringFileInvalidError,
+        KeyringNotFoundError,
+    )
+    from secrets_manager_tpm.tpm import (
+        InvalidEncryptedDataError,
+        KeyNotFoundError,
+        TpmNotFoundError,
+        WrongPasswordError,
+    )
+
+    try:
+        with Keyring(name, password.encode()) as instance:
+            instance.compact()
+    except KeyringNotFoundError:
+        click.echo("Error: Keyring not found.", err=True)
+        ctx.exit(1)
+    except KeyringFileInvalidError:
+        click.echo("Error: Keyring file invalid", err=True)
+        ctx.exit(1)
+    except KeyringNameInvalidError:
+        click.echo("Error: Invalid keyring name.", err=True)
+        ctx.exit(1)
+    except LockTimeoutError:
+        click.echo("Error: Keyring is locked by another process.", err=True)
+        ctx.exit(1)
+    except KeyNotFoundError:
+        click.echo("Error: Key not found in keystore.", err=True)
+        ctx.exit(1)
+    except InvalidEncryptedDataError:
+        click.echo("Error: Encrypted data has wrong format.", err=True)
+        ctx.exit(1)
+    except TpmNotFoundError:
+        click.echo("Error: TPM not found.", err=True)
+        ctx.exit(1)
+    except WrongPasswordError:
+        click.echo("Error: Wrong password.", err=True)
+        ctx.exit(1)
+
+
+@keyring.command("rekey", help="Change the password of a keyring and its TPM key")
+@click.argument("name", required=True, type=str)
+@click.option(
+    "-p",
+    "--password",
+    required=True,
+    prompt=True,
+    hide_input=True,
+    type=str,
+    help="Current password of the keyring",
+)
+@click.option(
+    "--new-password",
+    required=True,
+    prompt=True,
+    hide_input=True,
+    confirmation_prompt=True,
+    type=str,
+    help="New password for the keyring",
+)
+@click.pass_context
+def keyring_rekey(ctx: Context, name: str, password: str, new_password: str) -> None:
+    from secrets_manager.locking import LockTimeoutError
+    from secrets_manager_tpm.keyring import (
+        Keyring,
+        KeyringFileInvalidError,
+        KeyringNotFoundError,
+    )
+    from secrets_manager_tpm.tpm import (
+        InvalidEncryptedDataError,
+        KeyNotFoundError,
+        TpmNotFoundError,
+        WrongPasswordError,
+    )
+
+    try:
+        with Keyring(name, password.encode()) as instance:
+            instance.rekey(new_password.encode())
+    except KeyringNotFoundError:
+        click.echo("Error: Keyring not found.", err=True)
+        ctx.exit(1)
+    except KeyringFileInvalidError:
+        click.echo("Error: Keyring file invalid", err=True)
+        ctx.exit(1)
+    except KeyringNameInvalidError:
+        click.echo("Error: Invalid keyring name.", err=True)
+        ctx.exit(1)
+    except LockTimeoutError:
+        click.echo("Error: Keyring is locked by another process.", err=True)
+        ctx.exit(1)
+    except KeyNotFoundError:
+        click.echo("Error: Key not found in keystore.", err=True)
+        ctx.exit(1)
+    except InvalidEncryptedDataError:
+        click.echo("Error: Encrypted data has wrong format.", err=True)
+        ctx.exit(1)
+    except TpmNotFoundError:
+        click.echo("Error: TPM not found.", err=True)
+        ctx.exit(1)
+    except WrongPasswordError:
+        click.echo("Error: Wrong password.", err=True)
+        ctx.exit(1)
+
+
+@keyring.command("rekey-all", help="Change the passwords of many keyrings")
+@click.option(
+    "--from-file",
+    "from_file",
+    required=True,
+    type=click.File("r"),
+    help="Tab-separated lines of keyring name, current and new password",
+)
+@click.option(
+    "--journal",
+    "journal_path",
+    type=click.Path(dir_okay=False, path_type=Path),
+    help=f"Journal of finished keyrings to resume from (default: {REKEY_JOURNAL})",
+)
+@click.option(
+    "-j",
+    "--jobs",
+    type=click.IntRange(min=1),
+    help="Number of worker processes (default: number of CPUs)",
+)
+@click.option(
+    "--lock-timeout",
+    type=click.FloatRange(min=0),
+    default=DEFAULT_LOCK_TIMEOUT,
+    show_default=True,
+    envvar=LOCK_TIMEOUT_ENV,
+    help="Seconds to wait for other processes using a keyring",
+)
+@click.pass_context
+def keyring_rekey_all(
+    ctx: Context,
+    from_file: TextIO,
+    journal_path: Optional[Path],
+    jobs: Optional[int],
+    lock_timeout: float,
+) -> None:
+    from secrets_manager.locking import LockTimeoutError
+    from secrets_manager.rekey import (
+        Journal,
+        RekeyFileInvalidError,
+        read_rekey_file,
+        rekey_all,
+    )
+    from secrets_manager_tpm.keyring import (
+        KEYRING_ERRORS,
+        KeyringFileInvalidError,
+        KeyringNotFoundError,
+    )
+    from secrets_manager_tpm.rekey import rekey_keyring
+    from secrets_manager_tpm.tpm import (
+        InvalidEncryptedDataError,
+        KeyNotFoundError,
+        TpmNotFoundError,
+        WrongPasswordError,
+    )
+
+    errors: Dict[Type[Exception], str] = {
+        KeyringNotFoundError: "Keyring not found.",
+        KeyringFileInvalidError: "Keyring file invalid",
+        KeyringNameInvalidError: "Invalid keyring name.",
+        LockTimeoutError: "Keyring is locked by another process.",
+        KeyNotFoundError: "Key not found in keystore.",
+        InvalidEncryptedDataError: "Encrypted data has wrong format.",
+        TpmNotFoundError: "TPM not found.",
+        WrongPasswordError: "Wrong password.",
+    }
+
+    try:
+        entries = read_rekey_file(from_file)
+    except RekeyFileInvalidError as e:
+        click.echo(f"Error: Invalid line {e.line} in rekey file.", err=True)
+        ctx.exit(1)
+
+    journal = Journal(journal_path)
+    failed = 0
+    results = rekey_all(
+        entries, journal, rekey_keyring, jobs, lock_timeout, errors=KEYRING_ERRORS
+    )
+    for i, (name, status, error) in enumerate(results, 1):
+        if error is not None:
+            failed += 1
+            reason = next(
+                (msg for cls, msg in errors.items() if isinstance(error, cls)),
+                type(error).__name__,
+            )
+            status = f"{status}: {reason}"
+        click.echo(f"[{i}/{len(entries)}] {name}: {status}", err=True)
+
+    if failed:
+        click.echo(
+            f"Error: {failed} keyrings failed, rerun to resume from {journal.path}.",
+            err=True,
+        )
+        ctx.exit(1)
+    journal.remove()
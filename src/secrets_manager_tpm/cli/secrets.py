@@ -1,11 +1,27 @@
+import json
+import os
+import sys
+from pathlib import Path
+from typing import BinaryIO, Dict, Final, List, Optional, TextIO, Tuple, Type
+
 import click
 from click.core import Context
+from secrets_manager import batch, environ
+from secrets_manager.blobs import BlobInvalidError, BlobNotFoundError, save_file
+from secrets_manager.environ import MappingInvalidError
+from secrets_manager.locking import (
+    DEFAULT_LOCK_TIMEOUT,
+    LOCK_TIMEOUT_ENV,
+    LockTimeoutError,
+)
+from secrets_manager.store import KeyringNameInvalidError
 from secrets_manager_tpm.keyring import (
     Keyring,
     KeyringNotFoundError,
     KeyringFileInvalidError,
     SecretNotFoundError,
     SecretAlreadyExistsError,
+    SecretTypeError,
 )
 from secrets_manager_tpm.tpm import (
     KeyNotFoundError,
@@ -14,28 +30,67 @@ from secrets_manager_tpm.tpm import (
     WrongPasswordError,
 )
 
+READ_ONLY_COMMANDS: Final[Tuple[str, ...]] = ("get", "get-file", "list", "exec")
+BATCH_ERRORS: Final[Dict[Type[Exception], str]] = {
+    SecretAlreadyExistsError: "Secret already exists.",
+    SecretNotFoundError: "Secret not found.",
+    SecretTypeError: "Secret is a file.",
+}
+
 
 @click.group("secrets", help="Secrets management")
 @click.option("-k", "--keyring", required=True, type=str, help="Name of the keyring")
 @click.option(
     "-p",
     "--password",
-    required=True,
-    hide_input=True,
-    prompt=True,
+    required=False,
     type=str,
-    help="Password of the keyring",
+    help="Password of the keyring, prompted if not given",
+)
+@click.option(
+    "--password-fd",
+    required=False,
+    type=int,
+    help="Read the password from a file descriptor",
+)
+@click.option(
+    "--lock-timeout",
+    type=click.FloatRange(min=0),
+    default=DEFAULT_LOCK_TIMEOUT,
+    show_default=True,
+    envvar=LOCK_TIMEOUT_ENV,
+    help="Seconds to wait for other processes using the keyring",
 )
 @click.pass_context
-def secrets(ctx: Context, keyring: str, password: str) -> None:
+def secrets(
+    ctx: Context,
+    keyring: str,
+    password: Optional[str],
+    password_fd: Optional[int],
+    lock_timeout: float,
+) -> None:
+    read_only = ctx.invoked_subcommand in READ_ONLY_COMMANDS
+    if password_fd is not None:
+        with os.fdopen(password_fd) as f:
+            password = f.readline().rstrip("\n")
+    elif password is None:
+        password = click.prompt("Password", hide_input=True, type=str)
     try:
-        ctx.obj = ctx.with_resource(Keyring(keyring, password.encode()))
+        ctx.obj = ctx.with_resource(
+            Keyring(keyring, password.encode(), read_only, lock_timeout)
+        )
     except KeyringNotFoundError:
         click.echo("Error: Keyring not found.", err=True)
         ctx.exit(1)
+    except KeyringNameInvalidError:
+        click.echo("Error: Keyring name invalid.", err=True)
+        ctx.exit(1)
     except KeyringFileInvalidError:
         click.echo("Error: Keyring file invalid", err=True)
         ctx.exit(1)
+    except LockTimeoutError:
+        click.echo("Error: Keyring is locked by another process.", err=True)
+        ctx.exit(1)
     except KeyNotFoundError:
         click.echo("Error: Key not found in keystore.", err=True)
         ctx.exit(1)
@@ -88,15 +143,51 @@ def secrets_update(ctx: Context, name: str, secret: str) -> None:
     except SecretNotFoundError:
         click.echo("Error: Secret not found.", err=True)
         ctx.exit(1)
+    except SecretTypeError:
+        click.echo("Error: Secret is a file, use put-file.", err=True)
+        ctx.exit(1)
 
 
 @secrets.command("list", help="List secrets")
+@click.option(
+    "--prefix",
+    default="",
+    type=str,
+    help="Only list secrets whose name starts with this prefix",
+)
+@click.option(
+    "--depth",
+    type=click.IntRange(min=1),
+    help="Show namespaces deeper than this many levels below the prefix as one entry",
+)
+@click.option(
+    "--limit",
+    type=click.IntRange(min=1),
+    help="Maximum number of entries to list",
+)
+@click.option(
+    "--cursor",
+    type=str,
+    help="List the entries after this one, as printed by a previous --limit",
+)
 @click.pass_context
-def secrets_list(ctx: Context) -> None:
-    secrets = ctx.obj.list_secrets()
+def secrets_list(
+    ctx: Context,
+    prefix: str,
+    depth: Optional[int],
+    limit: Optional[int],
+    cursor: Optional[str],
+) -> None:
+    if not prefix and depth is None and limit is None and cursor is None:
+        secrets = ctx.obj.list_secrets() + list(ctx.obj.list_files())
+        next_cursor = None
+    else:
+        secrets, next_cursor = ctx.obj.list_names(prefix, depth, cursor, limit)
 
     for secret in secrets:
         print(secret)
+    if next_cursor is not None:
+        click.echo(f"Next cursor: {next_cursor}", err=True)
 
 
 @secrets.command("get", help="Get a secret")
@@ -108,16 +199,171 @@ def secrets_get(ctx: Context, name: str) -> None:
     except SecretNotFoundError:
         click.echo("Error: Secret not found.", err=True)
         ctx.exit(1)
+    except SecretTypeError:
+        click.echo("Error: Secret is a file, use get-file.", err=True)
+        ctx.exit(1)
 
     print(f"Secret: {secret}")
 
 
-@secrets.command("remove", help="Remove a secret")
+@secrets.command("put-file", help="Add or replace a file secret")
+@click.option("-n", "--name", required=True, type=str, help="Name of the secret")
+@click.argument("source", default="-", type=click.File("rb"))
+@click.pass_context
+def secrets_put_file(ctx: Context, name: str, source: BinaryIO) -> None:
+    try:
+        ctx.obj.put_file(name, source)
+    except SecretTypeError:
+        click.echo("Error: Secret is not a file, use update.", err=True)
+        ctx.exit(1)
+
+
+@secrets.command("get-file", help="Get a file secret")
 @click.argument("name", required=True, type=str)
+@click.option(
+    "-o",
+    "--output",
+    type=click.Path(dir_okay=False, path_type=Path),
+    help="File to write the secret to (default: stdout)",
+)
 @click.pass_context
-def secrets_remove(ctx: Context, name: str) -> None:
+def secrets_get_file(ctx: Context, name: str, output: Optional[Path]) -> None:
+    try:
+        chunks = ctx.obj.iter_file(name)
+        if output is None:
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+        else:
+            save_file(output, chunks)
+    except SecretNotFoundError:
+        click.echo("Error: Secret not found.", err=True)
+        ctx.exit(1)
+    except SecretTypeError:
+        click.echo("Error: Secret is not a file, use get.", err=True)
+        ctx.exit(1)
+    except BlobNotFoundError:
+        click.echo("Error: Content of the file secret is missing.", err=True)
+        ctx.exit(1)
+    except BlobInvalidError:
+        click.echo("Error: Content of the file secret is invalid.", err=True)
+        ctx.exit(1)
+
+
+@secrets.command("remove", help="Remove a secret")
+@click.argument("name", required=False, type=str)
+@click.option(
+    "--prefix",
+    type=str,
+    help="Remove every secret whose name starts with this prefix",
+)
+@click.pass_context
+def secrets_remove(ctx: Context, name: Optional[str], prefix: Optional[str]) -> None:
+    if (name is None) == (prefix is None):
+        click.echo("Error: Give either a name or --prefix.", err=True)
+        ctx.exit(1)
+    if prefix is not None:
+        if not prefix:
+            click.echo("Error: Prefix must not be empty.", err=True)
+            ctx.exit(1)
+        if not ctx.obj.remove_prefix(prefix):
+            click.echo("Error: Secret not found.", err=True)
+            ctx.exit(1)
+        return
+
     try:
         ctx.obj.remove_secret(name)
     except SecretNotFoundError:
         click.echo("Error: Secret not found.", err=True)
         ctx.exit(1)
+
+
+@secrets.command("batch", help="Apply JSON Lines operations under a single unlock")
+@click.option(
+    "-i",
+    "--input",
+    "input_file",
+    default="-",
+    type=click.File("r"),
+    help="File with one JSON operation per line (default: stdin)",
+)
+@click.option(
+    "--atomic",
+    is_flag=True,
+    default=False,
+    help="Roll back all operations if one of them fails",
+)
+@click.pass_context
+def secrets_batch(ctx: Context, input_file: TextIO, atomic: bool) -> None:
+    snapshot = ctx.obj.snapshot()
+    failed = False
+    try:
+        for result in batch.run(
+            ctx.obj, input_file, BATCH_ERRORS, stop_on_error=atomic
+        ):
+            print(json.dumps(result), flush=True)
+            failed = failed or not result["ok"]
+    except BaseException:
+        if atomic:
+            ctx.obj.restore(snapshot)
+        raise
+
+    if failed:
+        if atomic:
+            ctx.obj.restore(snapshot)
+        ctx.exit(1)
+
+
+@secrets.command(
+    "exec",
+    help="Run a command with secrets in its environment",
+    context_settings={"ignore_unknown_options": True},
+)
+@click.option(
+    "-m",
+    "--map",
+    "mappings",
+    multiple=True,
+    type=str,
+    help="Environment variable to set from a secret, as VARIABLE=SECRET",
+)
+@click.option(
+    "--all",
+    "all_secrets",
+    is_flag=True,
+    default=False,
+    help="Export every secret, named after the secret in upper case",
+)
+@click.option(
+    "--prefix",
+    default="",
+    type=str,
+    help="Prefix of the variable names exported by --all",
+)
+@click.argument("command", nargs=-1, required=True, type=click.UNPROCESSED)
+@click.pass_context
+def secrets_exec(
+    ctx: Context,
+    mappings: Tuple[str, ...],
+    all_secrets: bool,
+    prefix: str,
+    command: List[str],
+) -> None:
+    try:
+        parsed = environ.parse_mappings(mappings)
+        variables = environ.resolve(ctx.obj, parsed, all_secrets, prefix)
+    except MappingInvalidError as e:
+        click.echo(f"Error: Invalid mapping '{e.mapping}'.", err=True)
+        ctx.exit(1)
+    except SecretNotFoundError:
+        click.echo("Error: Secret not found.", err=True)
+        ctx.exit(1)
+    except SecretTypeError:
+        click.echo("Error: Secret is a file, use get-file.", err=True)
+        ctx.exit(1)
+
+    ctx.find_root().close()
+    try:
+        os.execvpe(command[0], command, {**os.environ, **variables})
+    except OSError as e:
+        click.echo(f"Error: Cannot execute {command[0]}: {e.strerror}.", err=True)
+        ctx.exit(127)
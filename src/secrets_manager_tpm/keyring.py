@@ -1,12 +1,93 @@
-import pickle
-from pickle import UnpicklingError
+import os
+import time
 from pathlib import Path
-from typing import Self, Final, Optional, Literal, Type, List, Dict
+from contextlib import contextmanager
+from typing import (
+    Self,
+    Final,
+    Optional,
+    Literal,
+    Type,
+    List,
+    Dict,
+    Tuple,
+    Any,
+    BinaryIO,
+    Iterator,
+)
 from types import TracebackType
-from secrets_manager_tpm.tpm import Key, PolicyCurrentPcr, POLICY_PLATFORM_PCR
-
-BASE_PATH: Final[Path] = Path.cwd()
-FILE_EXTENSION: Final[str] = ".db"
+from secrets_manager.blobs import (
+    BlobRef,
+    is_blob,
+    iter_blob,
+    new_blob,
+    remove_blobs,
+    write_blob,
+)
+from secrets_manager.compression import (
+    Compression,
+    CompressionUnavailableError,
+    CompressionUnknownError,
+    compress,
+    decompress,
+)
+from secrets_manager.crypto import generate_data_key, seal, unseal
+from secrets_manager.fileformat import (
+    BACKEND_TPM,
+    FORMAT_ENVELOPE,
+    FORMAT_LOG,
+    FORMAT_PICKLE,
+    LOG_DELETE,
+    LOG_PUT,
+    FileFormatError,
+    chain_next,
+    chain_start,
+    detect_format,
+    is_container,
+    legacy_loads,
+    pack_block,
+    pack_mapping,
+    pack_preamble,
+    pack_records,
+    unpack_block,
+    unpack_blocks,
+    unpack_mapping,
+    unpack_preamble,
+    unpack_records,
+    unchain,
+)
+from secrets_manager.namespace import NameIndex
+from secrets_manager.profiling import phase
+from secrets_manager.store import (
+    Catalog,
+    CatalogEntry,
+    KeyringNameInvalidError,
+    blobs_path,
+    keyring_path,
+)
+from secrets_manager.locking import (
+    DEFAULT_LOCK_TIMEOUT,
+    FileLock,
+    LockTimeoutError,
+    get_durability,
+    lock_path,
+    sync_file,
+    write_atomic,
+)
+from secrets_manager_tpm.tpm import (
+    Key,
+    acquire_context,
+    release_context,
+    PolicyCurrentPcr,
+    POLICY_PLATFORM_PCR,
+    InvalidEncryptedDataError,
+    KeyNotFoundError,
+    TpmNotFoundError,
+    WrongPasswordError,
+)
+
+COMPACT_MIN_RECORDS: Final[int] = 64
+COMPACT_DEAD_RATIO: Final[float] = 0.5
 
 
 class KeyringFileInvalidError(Exception):
@@ -24,6 +105,11 @@ class KeyringAlreadyExistsError(Exception):
         pass
 
 
+class KeyringReadOnlyError(Exception):
+    def __init__(self) -> None:
+        pass
+
+
 class SecretNotFoundError(Exception):
     def __init__(self) -> None:
         pass
@@ -34,41 +120,327 @@ class SecretAlreadyExistsError(Exception):
         pass
 
 
+class SecretTypeError(Exception):
+    def __init__(self) -> None:
+        pass
+
+
+KEYRING_ERRORS: Final[Tuple[Type[Exception], ...]] = (
+    KeyringNotFoundError,
+    KeyringFileInvalidError,
+    KeyringNameInvalidError,
+    KeyringReadOnlyError,
+    SecretTypeError,
+    LockTimeoutError,
+    KeyNotFoundError,
+    InvalidEncryptedDataError,
+    TpmNotFoundError,
+    WrongPasswordError,
+    CompressionUnknownError,
+    CompressionUnavailableError,
+    OSError,
+)
+
+
+def split_files(values: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, BlobRef]]:
+    files = {name: value for name, value in values.items() if is_blob(value)}
+    others = {name: value for name, value in values.items() if name not in files}
+    return others, files
+
+
 class Keyring:
-    def __init__(self, name: str, password: bytes) -> None:
+    def __init__(
+        self,
+        name: str,
+        password: bytes,
+        read_only: bool = False,
+        lock_timeout: Optional[float] = DEFAULT_LOCK_TIMEOUT,
+        unwrapped_key: Optional[Tuple[bytes, bytes]] = None,
+        durability: Optional[str] = None,
+        commit_window: Optional[float] = None,
+    ) -> None:
         self._name = name
         self._password = password
-        self._load()
+        self._read_only = read_only
+        self._lock_timeout = lock_timeout
+        self._unwrapped_key = unwrapped_key
+        self._durability = get_durability(durability)
+        self._commit_window = commit_window
+        self._dirty = False
+        self._dirty_since = 0.0
+        self._log: List[Tuple[str, str, Any]] = []
+        self._log_records = 0
+        self._compact = False
+        self._fapi = acquire_context()
+        try:
+            self._load()
+        except Exception:
+            release_context(self._fapi)
+            raise
 
     def _load(self) -> None:
-        path = BASE_PATH / Path(f"{self._name}{FILE_EXTENSION}")
+        self._names: Optional[NameIndex] = None
+        self._path = keyring_path(self._name)
+        if not self._path.exists():
+            raise KeyringNotFoundError
+        self._lock = FileLock(
+            lock_path(self._path), self._read_only, self._lock_timeout
+        )
+        with phase("lock"):
+            self._lock.acquire()
         try:
-            self._file = open(path, "rb+")
+            self._file = open(self._path, "rb" if self._read_only else "rb+")
         except FileNotFoundError:
+            self._lock.release()
             raise KeyringNotFoundError
 
         try:
-            keyring_db = pickle.load(self._file)
-            secrets_encrypted = keyring_db["secrets"]
-        except UnpicklingError:
+            with phase("read") as current:
+                data = self._file.read()
+                current.add(len(data))
+            self._format = detect_format(data)
+            self._container = is_container(data)
+            if self._format == FORMAT_PICKLE:
+                self._load_pickle(data)
+            elif self._format == FORMAT_ENVELOPE:
+                self._load_envelope(data)
+            elif self._format == FORMAT_LOG:
+                self._load_log(data)
+            else:
+                raise KeyringFileInvalidError
+        except (FileFormatError, KeyError, TypeError):
+            self._close()
             raise KeyringFileInvalidError
+        except Exception:
+            self._close()
+            raise
 
-        with Key(self._name, self._password) as key:
-            secrets_decrypted = key.decrypt(secrets_encrypted)
-        self._secrets: Dict[str, str] = pickle.loads(secrets_decrypted)
+    def _load_pickle(self, data: bytes) -> None:
+        keyring_db = legacy_loads(data)
+        secrets_encrypted = keyring_db["secrets"]
 
-    def _save(self) -> None:
-        with Key(self._name, self._password) as key:
-            secrets = key.encrypt(pickle.dumps(self._secrets))
+        with Key(self._name, self._password, self._fapi) as key:
+            secrets_decrypted = key.decrypt(secrets_encrypted)
+        self._secrets: Dict[str, str]
+        self._files: Dict[str, BlobRef]
+        self._secrets, self._files = split_files(self._loads_mapping(secrets_decrypted))
+        self._data_key: Optional[bytes] = None
+        self._compression: Optional[Compression] = None
+
+    def _load_envelope(self, data: bytes) -> None:
+        _, params, offset = unpack_preamble(data, BACKEND_TPM)
+        self._compression = params.get("compression")
+        block, _ = unpack_block(data, offset)
+
+        with self._unlock(params) as key:
+            self._secrets, self._files = split_files(
+                self._loads_mapping(self._decrypt(key, block))
+            )
+
+    def _load_log(self, data: bytes) -> None:
+        _, params, offset = unpack_preamble(data, BACKEND_TPM)
+        self._compression = params.get("compression")
+        self._secrets = {}
+        self._files = {}
+        self._log_end = offset
+        self._chained = bool(params.get("chain"))
+        self._chain = chain_start(data[:offset])
+
+        with self._unlock(params) as key:
+            for block, end in unpack_blocks(data, offset):
+                try:
+                    decrypted = self._decrypt(key, block)
+                except InvalidEncryptedDataError:
+                    if self._log_end == offset:
+                        raise
+                    if end < len(data):
+                        raise KeyringFileInvalidError
+                    break
+                if self._chained:
+                    decrypted = unchain(decrypted, self._chain)
+                    self._chain = chain_next(self._chain, block)
+                self._replay(self._loads_records(decrypted))
+                self._log_end = end
+        if self._log_end == offset:
+            raise KeyringFileInvalidError
 
-        db = {
-            "secrets": secrets,
-        }
+    @contextmanager
+    def _unlock(self, params: Dict[str, Any]) -> Iterator[Optional[Key]]:
+        if (
+            self._unwrapped_key is not None
+            and params.get("key") == self._unwrapped_key[0]
+        ):
+            self._wrapped_key, self._data_key = self._unwrapped_key
+            yield None
+            return
+
+        with Key(self._name, self._password, self._fapi) as key:
+            self._unwrap(key, params)
+            yield key
+
+    def _unwrap(self, key: Key, params: Dict[str, Any]) -> None:
+        if "key" in params:
+            self._wrapped_key = params["key"]
+            self._data_key = key.decrypt(self._wrapped_key)
+        else:
+            self._data_key = None
 
-        self._file.seek(0)
-        pickle.dump(db, self._file)
-        self._file.truncate()
+    def _decrypt(self, key: Optional[Key], data: bytes) -> bytes:
+        if self._data_key is None:
+            assert key is not None
+            return key.decrypt(data)
+        try:
+            data = unseal(self._data_key, data)
+        except ValueError:
+            raise InvalidEncryptedDataError
+        return decompress(data, self._compression)
+
+    def _loads_mapping(self, data: bytes) -> Dict[str, Any]:
+        if self._container:
+            return unpack_mapping(data)
+        mapping: Dict[str, Any] = legacy_loads(data)
+        return mapping
+
+    def _loads_records(self, data: bytes) -> List[Tuple[str, str, Any]]:
+        if self._container:
+            return unpack_records(data)
+        records: List[Tuple[str, str, Any]] = legacy_loads(data)
+        return records
+
+    def _replay(self, records: List[Tuple[str, str, Any]]) -> None:
+        for op, name, value in records:
+            if op == LOG_PUT and is_blob(value):
+                self._files[name] = value
+                self._secrets.pop(name, None)
+            elif op == LOG_PUT and value is not None:
+                self._secrets[name] = value
+                self._files.pop(name, None)
+            elif op == LOG_DELETE:
+                self._secrets.pop(name, None)
+                self._files.pop(name, None)
+        self._log_records += len(records)
+
+    def _needs_compaction(self) -> bool:
+        records = self._log_records + len(self._log)
+        if self._compact or not self._container or not self._chained:
+            return True
+        if records < COMPACT_MIN_RECORDS:
+            return False
+        live = len(self._secrets) + len(self._files)
+        return 1 - live / records > COMPACT_DEAD_RATIO
+
+    def _write(self) -> None:
+        if self._data_key is None:
+            self._data_key = generate_data_key()
+            with Key(self._name, self._password, self._fapi) as key:
+                self._wrapped_key = key.encrypt(self._data_key)
+            if self._format == FORMAT_PICKLE:
+                self._format = FORMAT_ENVELOPE
+            self._compact = True
+
+        if self._format == FORMAT_LOG and not self._needs_compaction():
+            payload = self._chain + pack_records(self._log)
+            block = seal(self._data_key, compress(payload, self._compression))
+            self._chain = chain_next(self._chain, block)
+            block = pack_block(block)
+
+            with phase("write", len(block)):
+                self._file.seek(self._log_end)
+                self._file.write(block)
+                self._file.truncate()
+                self._file.flush()
+            sync_file(self._file.fileno(), self._durability)
+            self._log_records += len(self._log)
+            self._log_end = self._file.tell()
+        else:
+            values = {**self._secrets, **self._files}
+            db = self._dump(
+                self._format,
+                self._wrapped_key,
+                self._data_key,
+                {name: values[name] for name in self._name_index().scope()},
+                self._compression,
+            )
+            write_atomic(self._path, db, self._durability)
+            self._file.close()
+            self._file = open(self._path, "rb+")
+            self._log_records = len(self._secrets) + len(self._files)
+            self._log_end = len(db)
+            self._container = True
+            if self._format == FORMAT_LOG:
+                _, _, offset = unpack_preamble(db, BACKEND_TPM)
+                block, _ = unpack_block(db, offset)
+                self._chained = True
+                self._chain = chain_next(chain_start(db[:offset]), block)
+        self._collect()
+        self._record()
+
+    def _collect(self) -> None:
+        directory = blobs_path(self._path)
+        if not directory.is_dir():
+            return
+        referenced = {blob["blob"] for blob in self._files.values()}
+        for path in directory.iterdir():
+            if path.name not in referenced:
+                path.unlink(missing_ok=True)
+
+    def _record(self) -> None:
+        Catalog().record(
+            self._name,
+            backend=BACKEND_TPM,
+            version=self._format,
+            secrets=len(self._secrets) + len(self._files),
+            size=os.path.getsize(self._path),
+        )
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+        self._write()
+        self._log = []
+        self._compact = False
+        self._dirty = False
+
+    @property
+    def commit_deadline(self) -> Optional[float]:
+        if not self._dirty or self._commit_window is None:
+            return None
+        return self._dirty_since + self._commit_window
+
+    def commit(self) -> bool:
+        if not self._dirty:
+            return True
+        deadline = self.commit_deadline
+        if deadline is not None and time.monotonic() < deadline:
+            return False
+        self.save()
+        return True
+
+    def _close(self) -> None:
         self._file.close()
+        self._lock.release()
+
+    @staticmethod
+    def _dump(
+        version: int,
+        wrapped_key: bytes,
+        data_key: bytes,
+        secrets: Dict[str, Any],
+        compression: Optional[Compression] = None,
+    ) -> bytes:
+        params: Dict[str, Any] = {"key": wrapped_key}
+        if compression is not None:
+            params["compression"] = dict(compression)
+        if version == FORMAT_LOG:
+            params["chain"] = 1
+            preamble = pack_preamble(version, params, BACKEND_TPM)
+            records = [(LOG_PUT, secret, value) for secret, value in secrets.items()]
+            payload = chain_start(preamble) + pack_records(records)
+        else:
+            preamble = pack_preamble(version, params, BACKEND_TPM)
+            payload = pack_mapping(secrets)
+        block = seal(data_key, compress(payload, compression))
+        return preamble + pack_block(block)
 
     def __enter__(self) -> Self:
         return self
@@ -79,66 +451,244 @@ class Keyring:
         exc_value: Optional[BaseException],
         exc_tb: Optional[TracebackType],
     ) -> Literal[False]:
-        self._save()
+        try:
+            if self._dirty:
+                self._write()
+        finally:
+            self._close()
+            release_context(self._fapi)
         return False
 
     @classmethod
-    def create_keyring(cls, name: str, password: bytes, bind_platform: bool) -> None:
-        path = BASE_PATH / Path(f"{name}{FILE_EXTENSION}")
+    def create_keyring(
+        cls,
+        name: str,
+        password: bytes,
+        bind_platform: bool,
+        version: int = FORMAT_ENVELOPE,
+        compression: Optional[Compression] = None,
+    ) -> None:
+        path = keyring_path(name)
         if Path.exists(path):
             raise KeyringAlreadyExistsError
 
-        if bind_platform:
-            PolicyCurrentPcr.create(PolicyCurrentPcr(POLICY_PLATFORM_PCR))
-        Key.create(name, password, bind_platform)
-
-        with Key(name, password) as key:
-            secrets = key.encrypt(pickle.dumps({}))
+        data_key = generate_data_key()
+        fapi = acquire_context()
+        try:
+            if bind_platform:
+                PolicyCurrentPcr.create(PolicyCurrentPcr(POLICY_PLATFORM_PCR), fapi)
+            Key.create(name, password, bind_platform, fapi)
+            with Key(name, password, fapi) as key:
+                wrapped_key = key.encrypt(data_key)
+        finally:
+            release_context(fapi)
+
+        db = cls._dump(version, wrapped_key, data_key, {}, compression)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with FileLock(lock_path(path)):
+            if Path.exists(path):
+                raise KeyringAlreadyExistsError
+            write_atomic(path, db)
+            Catalog().record(
+                name, backend=BACKEND_TPM, version=version, secrets=0, size=len(db)
+            )
 
-        db = {
-            "secrets": secrets,
-        }
+    @classmethod
+    def unwrap_key(cls, name: str, password: bytes) -> Optional[Tuple[bytes, bytes]]:
+        path = keyring_path(name)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            raise KeyringNotFoundError
 
-        with open(path, "wb") as f:
-            pickle.dump(db, f)
+        try:
+            if detect_format(data) == FORMAT_PICKLE:
+                return None
+            _, params, _ = unpack_preamble(data, BACKEND_TPM)
+        except FileFormatError:
+            raise KeyringFileInvalidError
+        if "key" not in params:
+            return None
+        with Key(name, password) as key:
+            return params["key"], key.decrypt(params["key"])
 
     @classmethod
     def list_keyrings(cls) -> List[str]:
-        paths = BASE_PATH.glob("*" + FILE_EXTENSION)
-        files = [path for path in paths if path.is_file()]
-        return [file.name.rstrip(FILE_EXTENSION) for file in files]
+        return sorted(Catalog().entries(BACKEND_TPM))
+
+    @classmethod
+    def describe_keyrings(cls) -> Dict[str, CatalogEntry]:
+        return Catalog().entries(BACKEND_TPM)
 
     @classmethod
     def remove_keyring(cls, name: str) -> None:
-        path = BASE_PATH / Path(f"{name}{FILE_EXTENSION}")
-        if Path.exists(path):
-            path.unlink()
-        else:
+        path = keyring_path(name)
+        if not Path.exists(path):
             raise KeyringNotFoundError
+        with FileLock(lock_path(path)):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                raise KeyringNotFoundError
+            lock_path(path).unlink()
+            remove_blobs(blobs_path(path))
+            Catalog().remove(name)
         Key.delete(name)
 
+    @property
+    def dirty(self) -> bool:
+        return self._dirty
+
+    @property
+    def version(self) -> int:
+        return self._format
+
+    @property
+    def compression(self) -> Optional[Dict[str, Any]]:
+        return dict(self._compression) if self._compression is not None else None
+
+    def _modify(self) -> None:
+        if self._read_only:
+            raise KeyringReadOnlyError
+        if not self._dirty:
+            self._dirty_since = time.monotonic()
+        self._dirty = True
+
+    def migrate(self, version: int) -> None:
+        if version != self._format or not self._container:
+            self._modify()
+            self._format = version
+            self._compact = True
+
+    def set_compression(self, compression: Optional[Compression]) -> None:
+        self._modify()
+        self._compression = compression
+        self._compact = True
+
+    def compact(self) -> None:
+        if self._format != FORMAT_LOG:
+            return
+        self._modify()
+        self._compact = True
+
+    def rekey(self, password: bytes) -> None:
+        self._modify()
+        with Key(self._name, self._password, self._fapi) as key:
+            self._data_key = generate_data_key()
+            self._wrapped_key = key.encrypt(self._data_key)
+            if self._format == FORMAT_PICKLE:
+                self._format = FORMAT_ENVELOPE
+            self._compact = True
+            self.save()
+            key.change_auth(password)
+        self._password = password
+
+    def snapshot(self) -> Tuple[Any, ...]:
+        return (
+            dict(self._secrets),
+            dict(self._files),
+            list(self._log),
+            self._format,
+            self._compact,
+            self._dirty,
+        )
+
+    def restore(self, snapshot: Tuple[Any, ...]) -> None:
+        secrets, files, log, self._format, self._compact, self._dirty = snapshot
+        self._secrets = dict(secrets)
+        self._files = dict(files)
+        self._log = list(log)
+        self._names = None
+
     def _secret_exists(self, name: str) -> bool:
-        return True if name in self._secrets.keys() else False
+        return name in self._secrets or name in self._files
 
     def add_secret(self, name: str, value: str) -> None:
         if self._secret_exists(name):
             raise SecretAlreadyExistsError
+        self._modify()
         self._secrets[name] = value
+        self._log.append((LOG_PUT, name, value))
+        if self._names is not None:
+            self._names.add(name)
 
     def update_secret(self, name: str, value: str) -> None:
         if not self._secret_exists(name):
             raise SecretNotFoundError
+        if name in self._files:
+            raise SecretTypeError
+        self._modify()
         self._secrets[name] = value
+        self._log.append((LOG_PUT, name, value))
 
     def get_secret(self, name: str) -> str:
         if not self._secret_exists(name):
             raise SecretNotFoundError
+        if name in self._files:
+            raise SecretTypeError
         return self._secrets[name]
 
     def list_secrets(self) -> List[str]:
         return list(self._secrets.keys())
 
+    def list_files(self) -> Dict[str, int]:
+        return {name: blob["size"] for name, blob in self._files.items()}
+
+    def _name_index(self) -> NameIndex:
+        if self._names is None:
+            self._names = NameIndex([*self._secrets, *self._files])
+        return self._names
+
+    def list_names(
+        self,
+        prefix: str = "",
+        depth: Optional[int] = None,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> Tuple[List[str], Optional[str]]:
+        return self._name_index().list(prefix, depth, cursor, limit)
+
+    def put_file(self, name: str, source: BinaryIO) -> None:
+        if name in self._secrets:
+            raise SecretTypeError
+        self._modify()
+        blob = write_blob(
+            blobs_path(self._path), new_blob(), source, durability=self._durability
+        )
+        self._files[name] = blob
+        self._log.append((LOG_PUT, name, blob))
+        if self._names is not None:
+            self._names.add(name)
+
+    def iter_file(self, name: str) -> Iterator[bytes]:
+        if not self._secret_exists(name):
+            raise SecretNotFoundError
+        if name not in self._files:
+            raise SecretTypeError
+        return iter_blob(blobs_path(self._path), self._files[name])
+
+    def get_file(self, name: str, sink: BinaryIO) -> None:
+        for chunk in self.iter_file(name):
+            sink.write(chunk)
+
     def remove_secret(self, name: str) -> None:
         if not self._secret_exists(name):
             raise SecretNotFoundError
-        del self._secrets[name]
+        self._modify()
+        self._secrets.pop(name, None)
+        self._files.pop(name, None)
+        self._log.append((LOG_DELETE, name, None))
+        if self._names is not None:
+            self._names.remove(name)
+
+    def remove_prefix(self, prefix: str) -> List[str]:
+        if not self._name_index().scope(prefix):
+            return []
+        self._modify()
+        names = self._name_index().remove_scope(prefix)
+        for name in names:
+            self._secrets.pop(name, None)
+            self._files.pop(name, None)
+            self._log.append((LOG_DELETE, name, None))
+        return names
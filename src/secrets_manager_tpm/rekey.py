@@ -0,0 +1,28 @@
+from pathlib import Path
+from typing import Optional
+
+from secrets_manager import store
+from secrets_manager.locking import DEFAULT_LOCK_TIMEOUT
+from secrets_manager.rekey import REKEY_ALREADY, REKEY_DONE
+from secrets_manager_tpm.keyring import Keyring
+from secrets_manager_tpm.tpm import WrongPasswordError
+
+
+def rekey_keyring(
+    root: Path,
+    name: str,
+    old_password: str,
+    new_password: str,
+    lock_timeout: Optional[float] = DEFAULT_LOCK_TIMEOUT,
+) -> str:
+    store.set_root(root)
+    try:
+        with Keyring(name, old_password.encode(), lock_timeout=lock_timeout) as keyring:
+            keyring.rekey(new_password.encode())
+    except WrongPasswordError:
+        with Keyring(
+            name, new_password.encode(), read_only=True, lock_timeout=lock_timeout
+        ):
+            pass
+        return REKEY_ALREADY
+    return REKEY_DONE
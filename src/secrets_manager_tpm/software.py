@@ -0,0 +1,185 @@
+import json
+import os
+import time
+from pathlib import Path
+from types import TracebackType
+from typing import Any, Callable, Dict, Final, List, Literal, Optional, Self, Type
+
+from tpm2_pytss import TSS2_Exception
+from tpm2_pytss.constants import TSS2_RC
+
+from secrets_manager.crypto import generate_data_key, seal, unseal
+
+PROFILE_PREFIX: Final[str] = "/P_RSA2048SHA256/"
+AUTH_FAIL: Final[int] = 2446
+
+AuthCallback = Callable[[str, str, Any], bytes]
+
+_memory_store: Dict[str, Dict[str, Optional[str]]] = {}
+
+
+class SoftwareFapi:
+    def __init__(self, store: Optional[Path] = None, latency: float = 0.0) -> None:
+        self._store = store
+        self._latency = latency
+        self._callback: Optional[AuthCallback] = None
+        self._user_data: Any = None
+        self._objects: Dict[str, Dict[str, Optional[str]]] = self._read()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        exc_tb: Optional[TracebackType],
+    ) -> Literal[False]:
+        self.close()
+        return False
+
+    def close(self) -> None:
+        pass
+
+    def _read(self) -> Dict[str, Dict[str, Optional[str]]]:
+        if self._store is None:
+            return _memory_store
+        if not self._store.exists():
+            return {}
+        with open(self._store) as f:
+            objects: Dict[str, Dict[str, Optional[str]]] = json.load(f)
+        return objects
+
+    def _write(self) -> None:
+        if self._store is None:
+            return
+        path_tmp = self._store.with_name(f".{self._store.name}.tmp")
+        with open(path_tmp, "w") as f:
+            json.dump(self._objects, f)
+        os.replace(path_tmp, self._store)
+
+    def _round_trip(self) -> None:
+        if self._latency > 0:
+            time.sleep(self._latency)
+        if self._store is not None:
+            self._objects = self._read()
+
+    @staticmethod
+    def _normalize(path: str) -> str:
+        if path.startswith("/policy"):
+            return path
+        return PROFILE_PREFIX + path.lstrip("/")
+
+    def _key(self, path: str) -> Dict[str, Optional[str]]:
+        try:
+            return self._objects[self._normalize(path)]
+        except KeyError:
+            raise TSS2_Exception(TSS2_RC.FAPI_RC_KEY_NOT_FOUND)
+
+    def set_auth_callback(
+        self, callback: Optional[AuthCallback], user_data: Any = None
+    ) -> None:
+        self._callback = callback
+        self._user_data = user_data
+
+    def import_object(
+        self, path: str, import_data: str, exists_ok: bool = False
+    ) -> bool:
+        self._round_trip()
+        path = self._normalize(path)
+        if path in self._objects and not exists_ok:
+            raise TSS2_Exception(TSS2_RC.FAPI_RC_PATH_ALREADY_EXISTS)
+        try:
+            json.loads(import_data.replace("'", '"'))
+        except ValueError:
+            raise TSS2_Exception(TSS2_RC.FAPI_RC_BAD_VALUE)
+        self._objects[path] = {"policy": import_data}
+        self._write()
+        return True
+
+    def create_key(
+        self,
+        path: str,
+        type_: Optional[str] = None,
+        policy_path: Optional[str] = None,
+        auth_value: Optional[bytes] = None,
+        exists_ok: bool = False,
+    ) -> bool:
+        self._round_trip()
+        path = self._normalize(path)
+        if path in self._objects:
+            if exists_ok:
+                return False
+            raise TSS2_Exception(TSS2_RC.FAPI_RC_PATH_ALREADY_EXISTS)
+        if (
+            policy_path is not None
+            and self._normalize(policy_path) not in self._objects
+        ):
+            raise TSS2_Exception(TSS2_RC.FAPI_RC_POLICY_UNKNOWN)
+        self._objects[path] = {
+            "secret": generate_data_key().hex(),
+            "auth": (auth_value or b"").hex(),
+            "policy_path": policy_path,
+        }
+        self._write()
+        return True
+
+    def encrypt(self, path: str, plaintext: bytes) -> bytes:
+        self._round_trip()
+        secret = self._key(path).get("secret")
+        if secret is None:
+            raise TSS2_Exception(TSS2_RC.FAPI_RC_BAD_PATH)
+        return seal(bytes.fromhex(secret), bytes(plaintext))
+
+    def decrypt(self, path: str, ciphertext: bytes) -> bytes:
+        self._round_trip()
+        key = self._key(path)
+        secret = key.get("secret")
+        if secret is None:
+            raise TSS2_Exception(TSS2_RC.FAPI_RC_BAD_PATH)
+        auth = b""
+        if self._callback is not None:
+            auth = self._callback(path, "", self._user_data)
+        if auth.hex() != key.get("auth"):
+            raise TSS2_Exception(AUTH_FAIL)
+        try:
+            return unseal(bytes.fromhex(secret), bytes(ciphertext))
+        except ValueError:
+            raise TSS2_Exception(TSS2_RC.TPM_RC_LAYER)
+
+    def change_auth(self, path: str, auth_value: Optional[bytes] = None) -> None:
+        self._round_trip()
+        key = self._key(path)
+        auth = b""
+        if self._callback is not None:
+            auth = self._callback(path, "", self._user_data)
+        if auth.hex() != key.get("auth"):
+            raise TSS2_Exception(AUTH_FAIL)
+        key["auth"] = (auth_value or b"").hex()
+        self._write()
+
+    def list(self, search_path: str = "") -> List[str]:
+        self._round_trip()
+        paths = list(self._objects)
+        if search_path:
+            prefix = self._normalize(search_path).rstrip("/")
+            paths = [
+                path
+                for path in paths
+                if path == prefix or path.startswith(prefix + "/")
+            ]
+        if not paths:
+            raise TSS2_Exception(TSS2_RC.FAPI_RC_PATH_NOT_FOUND)
+        return paths
+
+    def delete(self, path: str) -> None:
+        self._round_trip()
+        path = self._normalize(path)
+        if path not in self._objects:
+            raise TSS2_Exception(TSS2_RC.FAPI_RC_BAD_PATH)
+        del self._objects[path]
+        self._write()
+
+
+def reset_memory_store() -> None:
+    _memory_store.clear()
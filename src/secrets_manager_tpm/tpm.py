@@ -1,7 +1,26 @@
+import os
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
 from tpm2_pytss import FAPI, TSS2_Exception
 from tpm2_pytss.constants import TSS2_RC
 from types import TracebackType
-from typing import Final, List, Literal, Self, Optional, Type, Union, Any, Mapping
+from secrets_manager.profiling import phase
+from typing import (
+    Final,
+    List,
+    Literal,
+    Self,
+    Optional,
+    Type,
+    Union,
+    Any,
+    Mapping,
+    Callable,
+    Dict,
+    Iterator,
+)
 
 
 POLICY_BASE_PATH: Final[str] = "/policy/secret-manager-tpm"
@@ -14,6 +33,21 @@ POLICY_PLATFORM_PCR: Final[List[int]] = [
 ]
 KEY_BASE_PATH: Final[str] = "HS/SRK/secret-manager-tpm"
 KEY_TYPE: Final[str] = "decrypt"
+CONTEXT_POOL_SIZE: Final[int] = 4
+FAPI_PROVIDER_ENV: Final[str] = "SECRETS_MANAGER_TPM_FAPI"
+FAPI_STORE_ENV: Final[str] = "SECRETS_MANAGER_TPM_FAPI_STORE"
+FAPI_LATENCY_ENV: Final[str] = "SECRETS_MANAGER_TPM_FAPI_LATENCY_MS"
+TPM_OPERATIONS: Final[List[str]] = [
+    "create_key",
+    "encrypt",
+    "decrypt",
+    "list",
+    "delete",
+    "import_object",
+    "change_auth",
+]
+
+FapiProvider = Callable[[], Any]
 
 
 class KeyNotFoundError(Exception):
@@ -51,14 +85,168 @@ class WrongPasswordError(Exception):
         pass
 
 
+class FapiProviderUnknownError(Exception):
+    def __init__(self) -> None:
+        pass
+
+
+def _software_provider() -> Any:
+    from secrets_manager_tpm.software import SoftwareFapi
+
+    store = os.environ.get(FAPI_STORE_ENV)
+    latency = float(os.environ.get(FAPI_LATENCY_ENV, "0")) / 1000
+    return SoftwareFapi(Path(store) if store else None, latency)
+
+
+FAPI_PROVIDERS: Final[Dict[str, FapiProvider]] = {
+    "tpm": FAPI,
+    "software": _software_provider,
+}
+
+_provider: Optional[FapiProvider] = None
+
+
+def set_provider(provider: Optional[FapiProvider]) -> None:
+    global _provider
+    _provider = provider
+
+
+def get_provider() -> FapiProvider:
+    if _provider is not None:
+        return _provider
+    name = os.environ.get(FAPI_PROVIDER_ENV, "tpm")
+    try:
+        return FAPI_PROVIDERS[name]
+    except KeyError:
+        raise FapiProviderUnknownError
+
+
+_call_counters: List[Counter[str]] = []
+
+
+@contextmanager
+def count_calls() -> Iterator[Counter[str]]:
+    counter: Counter[str] = Counter()
+    _call_counters.append(counter)
+    try:
+        yield counter
+    finally:
+        _call_counters.remove(counter)
+
+
+def _record_call(operation: str) -> None:
+    for counter in _call_counters:
+        counter[operation] += 1
+
+
+class CountingContext:
+    def __init__(self, fapi: Any) -> None:
+        self._fapi = fapi
+
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self._fapi, name)
+        if name not in TPM_OPERATIONS:
+            return attribute
+
+        def call(*args: Any, **kwargs: Any) -> Any:
+            _record_call(name)
+            with phase(f"tpm.{name}"):
+                return attribute(*args, **kwargs)
+
+        return call
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        exc_tb: Optional[TracebackType],
+    ) -> Literal[False]:
+        self._fapi.close()
+        return False
+
+
+def open_context(provider: Optional[FapiProvider] = None) -> FAPI:
+    provider = provider if provider is not None else get_provider()
+    try:
+        with phase("tpm.open"):
+            fapi = provider()
+    except TSS2_Exception as e:
+        if e.rc == TSS2_RC.FAPI_RC_NO_TPM:
+            raise TpmNotFoundError
+        raise
+    _record_call("open")
+    return CountingContext(fapi)
+
+
+class ContextPool:
+    def __init__(self, size: int = CONTEXT_POOL_SIZE) -> None:
+        self._size = size
+        self._idle: List[FAPI] = []
+        self._lock = threading.Lock()
+
+    def acquire(self) -> FAPI:
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return open_context()
+
+    def release(self, fapi: FAPI) -> None:
+        with self._lock:
+            if len(self._idle) < self._size:
+                self._idle.append(fapi)
+                return
+        fapi.close()
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for fapi in idle:
+            fapi.close()
+
+
+_context_pool: Optional[ContextPool] = None
+
+
+def enable_context_pool(size: int = CONTEXT_POOL_SIZE) -> ContextPool:
+    global _context_pool
+    if _context_pool is None:
+        _context_pool = ContextPool(size)
+    return _context_pool
+
+
+def disable_context_pool() -> None:
+    global _context_pool
+    if _context_pool is not None:
+        _context_pool.close()
+        _context_pool = None
+
+
+def acquire_context() -> FAPI:
+    if _context_pool is not None:
+        return _context_pool.acquire()
+    return open_context()
+
+
+def release_context(fapi: FAPI) -> None:
+    if _context_pool is not None:
+        _context_pool.release(fapi)
+    else:
+        fapi.close()
+
+
 class PolicyCurrentPcr(dict[str, Union[str, list[int]]]):
     def __init__(self, pcrs: list[int]) -> None:
         self._pcrs = pcrs
         dict.__init__(self, type="pcr", currentpcrs=self._pcrs)
 
     @classmethod
-    def create(cls, pcr_policy: Self) -> None:
-        Policy.create("platform", Policy(POLICY_NAME, POLICY_DESCRIPTION, [pcr_policy]))
+    def create(cls, pcr_policy: Self, fapi: Optional[FAPI] = None) -> None:
+        Policy.create(
+            "platform", Policy(POLICY_NAME, POLICY_DESCRIPTION, [pcr_policy]), fapi
+        )
 
 
 class Policy(dict[str, Union[str, list[Mapping[Any, Any]]]]):
@@ -73,31 +261,50 @@ class Policy(dict[str, Union[str, list[Mapping[Any, Any]]]]):
         )
 
     @classmethod
-    def create(cls, name: str, policy: Self) -> None:
+    def create(cls, name: str, policy: Self, fapi: Optional[FAPI] = None) -> None:
         path = POLICY_BASE_PATH + "_" + name
+        context = fapi if fapi is not None else acquire_context()
         try:
-            with FAPI() as fapi:
-                fapi.import_object(path, str(policy), True)
+            context.import_object(path, str(policy), True)
         except TSS2_Exception as e:
             if e.rc == TSS2_RC.FAPI_RC_BAD_VALUE:
                 raise PolicyValueError
             elif e.rc == TSS2_RC.FAPI_RC_NO_TPM:
                 raise TpmNotFoundError
+        finally:
+            if fapi is None:
+                release_context(context)
 
 
 class Key:
-    def __init__(self, name: str, password: bytes) -> None:
+    def __init__(
+        self,
+        name: str,
+        password: bytes,
+        fapi: Optional[FAPI] = None,
+        provider: Optional[FapiProvider] = None,
+    ) -> None:
         self._name = name
         self._key_path = KEY_BASE_PATH + "_" + self._name
-        try:
-            self._fapi = FAPI()
-        except TSS2_Exception as e:
-            if e.rc == TSS2_RC.FAPI_RC_NO_TPM:
-                raise TpmNotFoundError
+        self._owns_context = fapi is None
+        self._pooled = fapi is None and provider is None
+        if fapi is not None:
+            self._fapi = fapi
+        elif provider is not None:
+            self._fapi = open_context(provider)
+        else:
+            self._fapi = acquire_context()
         self._fapi.set_auth_callback(callback=self._callback_auth, user_data=password)
         if not self._exists():
+            self._close()
             raise KeyNotFoundError
 
+    def _close(self) -> None:
+        if self._pooled:
+            release_context(self._fapi)
+        elif self._owns_context:
+            self._fapi.close()
+
     def __enter__(self) -> Self:
         return self
 
@@ -107,14 +314,22 @@ class Key:
         exc_value: Optional[BaseException],
         exc_tb: Optional[TracebackType],
     ) -> Literal[False]:
-        self._fapi.close()
+        self._close()
         return False
 
     def _exists(self) -> bool:
-        for path in self._fapi.list():
-            if path.endswith(self._key_path):
-                return True
-        return False
+        try:
+            return len(self._fapi.list(self._key_path)) > 0
+        except TSS2_Exception as e:
+            if e.rc in (
+                TSS2_RC.FAPI_RC_PATH_NOT_FOUND,
+                TSS2_RC.FAPI_RC_KEY_NOT_FOUND,
+                TSS2_RC.FAPI_RC_BAD_PATH,
+            ):
+                return False
+            elif e.rc == TSS2_RC.FAPI_RC_NO_TPM:
+                raise TpmNotFoundError
+            raise
 
     def encrypt(self, data: bytes) -> bytes:
         try:
@@ -136,20 +351,37 @@ class Key:
                 raise WrongPasswordError
         return data_decrypted
 
+    def change_auth(self, password: bytes) -> None:
+        try:
+            self._fapi.change_auth(self._key_path, password)
+        except TSS2_Exception as e:
+            if e.rc == TSS2_RC.FAPI_RC_NO_TPM:
+                raise TpmNotFoundError
+            elif e.rc == 2446:
+                raise WrongPasswordError
+            raise
+        self._fapi.set_auth_callback(callback=self._callback_auth, user_data=password)
+
     @staticmethod
     def _callback_auth(path: str, description: str, user_data: bytes) -> bytes:
         return user_data
 
     @classmethod
-    def create(cls, name: str, password: bytes, bind_platform: bool) -> None:
+    def create(
+        cls,
+        name: str,
+        password: bytes,
+        bind_platform: bool,
+        fapi: Optional[FAPI] = None,
+    ) -> None:
         key_path = KEY_BASE_PATH + "_" + name
+        context = fapi if fapi is not None else acquire_context()
         try:
-            with FAPI() as fapi:
-                if bind_platform:
-                    policy_path = POLICY_BASE_PATH + "_" + "platform"
-                    fapi.create_key(key_path, KEY_TYPE, policy_path, password)
-                else:
-                    fapi.create_key(key_path, KEY_TYPE, auth_value=password)
+            if bind_platform:
+                policy_path = POLICY_BASE_PATH + "_" + "platform"
+                context.create_key(key_path, KEY_TYPE, policy_path, password)
+            else:
+                context.create_key(key_path, KEY_TYPE, auth_value=password)
         except TSS2_Exception as e:
             if e.rc == TSS2_RC.FAPI_RC_PATH_ALREADY_EXISTS:
                 raise KeyAlreadyExistsError
@@ -157,15 +389,21 @@ class Key:
                 raise PolicyNotFoundError
             elif e.rc == TSS2_RC.FAPI_RC_NO_TPM:
                 raise TpmNotFoundError
+        finally:
+            if fapi is None:
+                release_context(context)
 
     @classmethod
-    def delete(cls, name: str) -> None:
+    def delete(cls, name: str, fapi: Optional[FAPI] = None) -> None:
         key_path = KEY_BASE_PATH + "_" + name
+        context = fapi if fapi is not None else acquire_context()
         try:
-            with FAPI() as fapi:
-                fapi.delete(key_path)
+            context.delete(key_path)
         except TSS2_Exception as e:
             if e.rc == TSS2_RC.FAPI_RC_BAD_PATH:
                 raise KeyNotFoundError
             elif e.rc == TSS2_RC.FAPI_RC_NO_TPM:
                 raise TpmNotFoundError
+        finally:
+            if fapi is None:
+                release_context(context)
@@ -0,0 +1,28 @@
+from pathlib import Path
+from typing import Any, Callable, Dict, Final, Iterator
+
+import pytest
+
+from secrets_manager import store
+from secrets_manager.fileformat import FORMAT_LOG, KDF_PBKDF2_SHA256
+from secrets_manager.keyring import Keyring
+
+PASSWORD: Final[str] = "password"
+TEST_KDF: Final[Dict[str, Any]] = {"algorithm": KDF_PBKDF2_SHA256, "iterations": 1000}
+
+
+@pytest.fixture
+def root(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Iterator[Path]:
+    monkeypatch.delenv(store.STORE_ENV, raising=False)
+    store.set_root(tmp_path)
+    yield tmp_path
+    store.set_root(None)
+
+
+@pytest.fixture
+def create(root: Path) -> Callable[..., Path]:
+    def create(name: str = "test", version: int = FORMAT_LOG, **kwargs: Any) -> Path:
+        Keyring.create_keyring(name, PASSWORD.encode(), version, kdf=TEST_KDF, **kwargs)
+        return store.keyring_path(name)
+
+    return create
@@ -0,0 +1,80 @@
+import os
+import socket
+import stat
+import threading
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+from secrets_manager import agent
+from secrets_manager.agent import (
+    AgentAlreadyRunningError,
+    AgentServer,
+    AgentSocketInsecureError,
+)
+
+
+@pytest.fixture
+def path(tmp_path: Path) -> Path:
+    return tmp_path / "agent" / "agent.sock"
+
+
+@pytest.fixture
+def server(path: Path) -> Iterator[AgentServer]:
+    with AgentServer(path, agent.AGENT_TTL, agent.AGENT_MAX_ENTRIES) as server:
+        thread = threading.Thread(target=server.serve_forever, args=(0.05,))
+        thread.start()
+        yield server
+        server.shutdown()
+        thread.join()
+
+
+def test_agent_caches_keys(path: Path, server: AgentServer) -> None:
+    assert stat.S_IMODE(os.stat(path.parent).st_mode) == 0o700
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+
+    request = {"op": "add", "keyring": "test", "salt": "00", "key": "key"}
+    assert agent._request(request, path) == {"ok": True}
+    response = agent._request({"op": "get", "keyring": "test", "salt": "00"}, path)
+    assert response == {"ok": True, "key": "key"}
+
+
+def test_agent_rejects_shared_directory(path: Path) -> None:
+    path.parent.mkdir(mode=0o755)
+    os.chmod(path.parent, 0o755)
+    with pytest.raises(AgentSocketInsecureError):
+        AgentServer(path, agent.AGENT_TTL, agent.AGENT_MAX_ENTRIES)
+
+    os.chmod(path.parent, 0o700)
+    path.write_bytes(b"")
+    with pytest.raises(AgentSocketInsecureError):
+        AgentServer(path, agent.AGENT_TTL, agent.AGENT_MAX_ENTRIES)
+    assert path.is_file()
+
+
+def test_agent_replaces_only_stale_sockets(path: Path, server: AgentServer) -> None:
+    with pytest.raises(AgentAlreadyRunningError):
+        AgentServer(path, agent.AGENT_TTL, agent.AGENT_MAX_ENTRIES)
+
+    stale = path.with_name("stale.sock")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+        conn.bind(str(stale))
+    os.chmod(stale, 0o600)
+    with AgentServer(stale, agent.AGENT_TTL, agent.AGENT_MAX_ENTRIES):
+        assert stat.S_ISSOCK(os.lstat(stale).st_mode)
+
+
+def test_client_checks_socket(
+    path: Path, server: AgentServer, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    os.chmod(path.parent, 0o750)
+    with pytest.raises(AgentSocketInsecureError):
+        agent._request({"op": "lock"}, path)
+    os.chmod(path.parent, 0o700)
+
+    monkeypatch.setattr(agent, "peer_uid", lambda conn: os.getuid() + 1)
+    request = {"op": "add", "keyring": "test", "salt": "00", "key": "key"}
+    with pytest.raises(AgentSocketInsecureError):
+        agent._request(request, path)
+    assert len(server.cache) == 0
@@ -0,0 +1,129 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List
+
+import pytest
+
+from secrets_manager import aio
+from secrets_manager import keyring as secrets_keyring
+from secrets_manager.aio import AsyncKeyring, KeyringClosedError
+from secrets_manager.keyring import Keyring
+
+from conftest import PASSWORD, TEST_KDF
+
+Create = Callable[..., Path]
+
+
+@pytest.fixture
+def executor() -> Iterator[ThreadPoolExecutor]:
+    with ThreadPoolExecutor() as executor:
+        yield executor
+
+
+@pytest.fixture
+def derivations(create: Create, monkeypatch: pytest.MonkeyPatch) -> List[bytes]:
+    create()
+    calls: List[bytes] = []
+    generate_key = aio.generate_key
+
+    def counting(password: bytes, salt: bytes, kdf: Dict[str, Any]) -> bytes:
+        calls.append(salt)
+        time.sleep(0.1)
+        return generate_key(password, salt, kdf)
+
+    def forbidden(*args: Any) -> bytes:
+        raise AssertionError("key derived outside kdf_executor")
+
+    monkeypatch.setattr(aio, "generate_key", counting)
+    monkeypatch.setattr(secrets_keyring, "generate_key", forbidden)
+    return calls
+
+
+def _keyring(
+    password: str, executor: ThreadPoolExecutor, read_only: bool = False
+) -> AsyncKeyring:
+    return AsyncKeyring(
+        "test", password, read_only, executor=executor, kdf_executor=executor
+    )
+
+
+def test_open_add_get_close(
+    executor: ThreadPoolExecutor, derivations: List[bytes]
+) -> None:
+    async def run() -> None:
+        keyring = _keyring(PASSWORD, executor)
+        with pytest.raises(KeyringClosedError):
+            keyring.keyring
+        await keyring.open()
+        await keyring.add_secret("a", "1")
+        await keyring.save()
+        assert await keyring.get_secret("a") == "1"
+        assert await keyring.list_secrets() == ["a"]
+        await keyring.close()
+        with pytest.raises(KeyringClosedError):
+            await keyring.get_secret("a")
+
+        async with _keyring(PASSWORD, executor) as reopened:
+            assert await reopened.get_secret("a") == "1"
+
+    asyncio.run(run())
+    assert len(derivations) == 2
+
+
+def test_concurrent_opens_share_derivation(
+    executor: ThreadPoolExecutor, derivations: List[bytes]
+) -> None:
+    async def run() -> None:
+        keyrings = [_keyring(PASSWORD, executor, True) for _ in range(3)]
+        await asyncio.gather(*(keyring.open() for keyring in keyrings))
+        assert not aio._unlocks
+        for keyring in keyrings:
+            assert await keyring.list_secrets() == []
+            await keyring.close()
+
+    asyncio.run(run())
+    assert len(derivations) == 1
+
+
+def test_wrong_password_derives_once(
+    executor: ThreadPoolExecutor, derivations: List[bytes]
+) -> None:
+    async def run() -> None:
+        keyrings = [_keyring("wrong", executor, True) for _ in range(2)]
+        results = await asyncio.gather(
+            *(keyring.open() for keyring in keyrings), return_exceptions=True
+        )
+        assert all(isinstance(result, ValueError) for result in results)
+
+    asyncio.run(run())
+    assert len(derivations) == 1
+
+
+def test_open_rederives_after_rewrap(
+    create: Create, executor: ThreadPoolExecutor, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    create()
+    salt, _ = Keyring.kdf_params("test")
+    salts: List[bytes] = []
+    generate_key = aio.generate_key
+
+    def rewrapping(password: bytes, salt: bytes, kdf: Dict[str, Any]) -> bytes:
+        salts.append(salt)
+        key = generate_key(password, salt, kdf)
+        if len(salts) == 1:
+            with Keyring("test", PASSWORD) as keyring:
+                keyring.rewrap(TEST_KDF)
+        return key
+
+    monkeypatch.setattr(aio, "generate_key", rewrapping)
+
+    async def run() -> None:
+        async with _keyring(PASSWORD, executor) as keyring:
+            assert await keyring.list_secrets() == []
+
+    asyncio.run(run())
+    new_salt, _ = Keyring.kdf_params("test")
+    assert salts == [salt, new_salt]
+    assert new_salt != salt
@@ -0,0 +1,160 @@
+import io
+import json
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+import pytest
+from click.testing import CliRunner, Result
+
+from secrets_manager import batch
+from secrets_manager.cli import cli
+from secrets_manager.keyring import Keyring
+
+from conftest import PASSWORD
+
+Create = Callable[..., Path]
+
+
+def _secrets(root: Path, *args: str, input: str = "") -> Result:
+    return CliRunner().invoke(
+        cli,
+        ["--store", str(root), "secrets", "-k", "test", "-p", PASSWORD, "--no-agent"]
+        + list(args),
+        input=input,
+    )
+
+
+def _operations(*operations: Dict[str, Any]) -> str:
+    return "".join(json.dumps(operation) + "\n" for operation in operations)
+
+
+def _names() -> List[str]:
+    with Keyring("test", PASSWORD, read_only=True) as keyring:
+        return keyring.list_secrets()
+
+
+def test_batch_applies_operations(root: Path, create: Create) -> None:
+    create()
+    result = _secrets(
+        root,
+        "batch",
+        input=_operations(
+            {"op": "add", "name": "a", "value": "1"},
+            {"op": "add", "name": "a", "value": "2"},
+            {"op": "add", "name": "b", "value": "3"},
+        ),
+    )
+    assert result.exit_code == 1
+    assert [json.loads(line)["ok"] for line in result.output.splitlines()] == [
+        True,
+        False,
+        True,
+    ]
+    assert _names() == ["a", "b"]
+
+
+def test_batch_atomic_rolls_back_on_error(root: Path, create: Create) -> None:
+    create()
+    result = _secrets(
+        root,
+        "batch",
+        "--atomic",
+        input=_operations(
+            {"op": "add", "name": "a", "value": "1"},
+            {"op": "update", "name": "missing", "value": "2"},
+            {"op": "add", "name": "b", "value": "3"},
+        ),
+    )
+    assert result.exit_code == 1
+    assert len(result.output.splitlines()) == 2
+    assert _names() == []
+
+
+def test_batch_atomic_rolls_back_on_exception(
+    root: Path, create: Create, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    create()
+    apply = batch.apply
+
+    def failing(store: batch.SecretStore, operation: Dict[str, Any]) -> Dict[str, Any]:
+        if operation.get("name") == "b":
+            raise RuntimeError
+        return apply(store, operation)
+
+    monkeypatch.setattr(batch, "apply", failing)
+    result = _secrets(
+        root,
+        "batch",
+        "--atomic",
+        input=_operations(
+            {"op": "add", "name": "a", "value": "1"},
+            {"op": "add", "name": "b", "value": "2"},
+        ),
+    )
+    assert isinstance(result.exception, RuntimeError)
+    assert _names() == []
+
+
+def test_batch_reports_file_secrets(root: Path, create: Create) -> None:
+    create()
+    with Keyring("test", PASSWORD) as keyring:
+        keyring.put_file("cert", io.BytesIO(b"data"))
+
+    result = _secrets(root, "batch", input=_operations({"op": "get", "name": "cert"}))
+    assert result.exit_code == 1
+    assert json.loads(result.output)["error"] == "Secret is a file."
+
+
+def test_exec_rejects_file_secrets(root: Path, create: Create) -> None:
+    create()
+    with Keyring("test", PASSWORD) as keyring:
+        keyring.put_file("cert", io.BytesIO(b"data"))
+
+    result = _secrets(root, "exec", "-m", "CERT=cert", "true")
+    assert result.exit_code == 1
+    assert "Error: Secret is a file, use get-file." in result.output
+
+
+class _Store:
+    def __init__(self) -> None:
+        self.secrets: Dict[str, str] = {}
+
+    def add_secret(self, name: str, value: str) -> None:
+        if name in self.secrets:
+            raise _DuplicateError
+        self.secrets[name] = value
+
+    def update_secret(self, name: str, value: str) -> None:
+        self.secrets[name] = value
+
+    def get_secret(self, name: str) -> str:
+        return self.secrets[name]
+
+    def list_secrets(self) -> List[str]:
+        return list(self.secrets)
+
+    def remove_secret(self, name: str) -> None:
+        del self.secrets[name]
+
+
+class _DuplicateError(ValueError):
+    pass
+
+
+def test_run_maps_error_subclasses() -> None:
+    lines = _operations(
+        {"op": "add", "name": "a", "value": "1"},
+        {"op": "add", "name": "a", "value": "2"},
+        {"op": "get", "name": "b"},
+        {"op": "copy"},
+    ).splitlines() + ["{", "[]"]
+    errors = {LookupError: "Secret not found.", ValueError: "Invalid value."}
+    results = list(batch.run(_Store(), lines, errors))
+    assert [result.get("error") for result in results] == [
+        None,
+        "Invalid value.",
+        "Secret not found.",
+        "Unknown operation.",
+        "Invalid JSON.",
+        "Operation is not an object.",
+    ]
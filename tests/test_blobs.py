@@ -0,0 +1,87 @@
+import io
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from secrets_manager.blobs import (
+    BlobInvalidError,
+    BlobNotFoundError,
+    BlobRef,
+    iter_blob,
+    new_blob,
+    write_blob,
+)
+
+CHUNK: int = 16
+HEADER_SIZE: int = 16
+SEALED: int = CHUNK + 16
+
+
+def _write(directory: Path, data: bytes) -> BlobRef:
+    return write_blob(directory, new_blob(), io.BytesIO(data), CHUNK)
+
+
+def _chunks(path: Path) -> List[bytes]:
+    data = path.read_bytes()
+    body = data[HEADER_SIZE:]
+    return [data[:HEADER_SIZE]] + [
+        body[i : i + SEALED] for i in range(0, len(body), SEALED)
+    ]
+
+
+@pytest.mark.parametrize("size", [0, 1, CHUNK, CHUNK + 1, 3 * CHUNK])
+def test_blob_round_trip(tmp_path: Path, size: int) -> None:
+    data = bytes(range(size))
+    blob = _write(tmp_path, data)
+    assert blob["size"] == size
+    assert b"".join(iter_blob(tmp_path, blob)) == data
+
+
+def test_blob_missing(tmp_path: Path) -> None:
+    with pytest.raises(BlobNotFoundError):
+        list(iter_blob(tmp_path, new_blob()))
+
+
+def test_blob_rejects_truncated_stream(tmp_path: Path) -> None:
+    blob = _write(tmp_path, b"x" * (3 * CHUNK))
+    path = tmp_path / blob["blob"]
+    chunks = _chunks(path)
+
+    path.write_bytes(b"".join(chunks[:-1]))
+    with pytest.raises(BlobInvalidError):
+        list(iter_blob(tmp_path, blob))
+
+    path.write_bytes(chunks[0])
+    with pytest.raises(BlobInvalidError):
+        list(iter_blob(tmp_path, blob))
+
+    path.write_bytes(chunks[0][:-1])
+    with pytest.raises(BlobInvalidError):
+        list(iter_blob(tmp_path, blob))
+
+
+def test_blob_rejects_reordered_chunks(tmp_path: Path) -> None:
+    blob = _write(tmp_path, b"a" * CHUNK + b"b" * CHUNK + b"c" * CHUNK)
+    path = tmp_path / blob["blob"]
+    header, first, second, last = _chunks(path)
+
+    path.write_bytes(header + second + first + last)
+    with pytest.raises(BlobInvalidError):
+        list(iter_blob(tmp_path, blob))
+
+
+def test_blob_rejects_tampered_chunk(tmp_path: Path) -> None:
+    blob = _write(tmp_path, b"x" * (2 * CHUNK))
+    path = tmp_path / blob["blob"]
+    header, first, last = _chunks(path)
+
+    tampered = first[:-1] + bytes([first[-1] ^ 1])
+    path.write_bytes(header + tampered + last)
+    with pytest.raises(BlobInvalidError):
+        list(iter_blob(tmp_path, blob))
+
+    tampered_header = header[:-1] + bytes([header[-1] ^ 1])
+    path.write_bytes(tampered_header + first + last)
+    with pytest.raises(BlobInvalidError):
+        list(iter_blob(tmp_path, blob))
@@ -0,0 +1,110 @@
+import os
+from pathlib import Path
+from typing import Callable
+
+import pytest
+
+from secrets_manager.compression import (
+    CompressionUnknownError,
+    compress,
+    compression_params,
+    decompress,
+)
+from secrets_manager.fileformat import (
+    COMPRESSION_NONE,
+    COMPRESSION_ZLIB,
+    COMPRESSION_ZSTD,
+    FORMAT_LOG,
+    FORMAT_RECORDS,
+    FileFormatError,
+)
+from secrets_manager.keyring import Keyring
+
+from conftest import PASSWORD
+
+Create = Callable[..., Path]
+
+DATA: bytes = b"compressible " * 200
+VALUE: str = "value " * 500
+
+
+def _round_trip(algorithm: str) -> None:
+    compression = compression_params(algorithm, threshold=64)
+    compressed = compress(DATA, compression)
+    assert len(compressed) < len(DATA)
+    assert decompress(compressed, compression) == DATA
+
+    short = compress(DATA[:10], compression)
+    assert short[1:] == DATA[:10]
+    assert decompress(short, compression) == DATA[:10]
+
+    noise = os.urandom(1024)
+    assert decompress(compress(noise, compression), compression) == noise
+
+
+def test_zlib_round_trip() -> None:
+    _round_trip(COMPRESSION_ZLIB)
+
+
+def test_zstd_round_trip() -> None:
+    pytest.importorskip("zstandard")
+    _round_trip(COMPRESSION_ZSTD)
+
+
+def test_compression_params() -> None:
+    assert compression_params(COMPRESSION_NONE) is None
+    assert compression_params(COMPRESSION_ZLIB, 10) == {
+        "algorithm": COMPRESSION_ZLIB,
+        "threshold": 10,
+    }
+    with pytest.raises(CompressionUnknownError):
+        compression_params("lzma")
+
+
+def test_decompress_rejects_corrupt_payload() -> None:
+    compression = compression_params(COMPRESSION_ZLIB, threshold=0)
+    compressed = compress(DATA, compression)
+    with pytest.raises(FileFormatError):
+        decompress(compressed[:-4] + bytes(4), compression)
+    with pytest.raises(FileFormatError):
+        decompress(b"\xff" + compressed[1:], compression)
+
+
+@pytest.mark.parametrize("version", [FORMAT_RECORDS, FORMAT_LOG])
+def test_compressed_keyring_reopens(create: Create, version: int) -> None:
+    compression = compression_params(COMPRESSION_ZLIB, threshold=64)
+    path = create(version=version, compression=compression)
+    with Keyring("test", PASSWORD) as keyring:
+        keyring.add_secret("large", VALUE)
+        keyring.add_secret("small", "1")
+    assert path.stat().st_size < len(VALUE)
+
+    with Keyring("test", PASSWORD, read_only=True) as keyring:
+        assert keyring.compression == compression
+        assert keyring.get_secret("large") == VALUE
+        assert keyring.get_secret("small") == "1"
+
+
+@pytest.mark.parametrize("version", [FORMAT_RECORDS, FORMAT_LOG])
+def test_set_compression_keeps_secrets(create: Create, version: int) -> None:
+    compression = compression_params(COMPRESSION_ZLIB, threshold=64)
+    path = create(version=version)
+    with Keyring("test", PASSWORD) as keyring:
+        keyring.add_secret("large", VALUE)
+        keyring.add_secret("small", "1")
+    uncompressed = path.stat().st_size
+
+    with Keyring("test", PASSWORD) as keyring:
+        keyring.set_compression(compression)
+    assert path.stat().st_size < uncompressed
+    with Keyring("test", PASSWORD, read_only=True) as keyring:
+        assert keyring.compression == compression
+        assert keyring.get_secret("large") == VALUE
+
+    with Keyring("test", PASSWORD) as keyring:
+        keyring.migrate(FORMAT_LOG if version == FORMAT_RECORDS else FORMAT_RECORDS)
+        keyring.set_compression(None)
+    with Keyring("test", PASSWORD, read_only=True) as keyring:
+        assert keyring.compression is None
+        assert keyring.get_secret("large") == VALUE
+        assert keyring.get_secret("small") == "1"
@@ -0,0 +1,25 @@
+import pytest
+
+from secrets_manager.crypto import (
+    KDF_BACKENDS,
+    KdfBackend,
+    KdfUnknownError,
+    default_kdf,
+    get_kdf,
+)
+from secrets_manager.fileformat import KDF_ALGORITHMS
+
+
+def test_kdf_backend_is_abstract() -> None:
+    with pytest.raises(TypeError):
+        KdfBackend()  # type: ignore[abstract]
+
+
+def test_kdf_backends_are_registered() -> None:
+    assert sorted(KDF_BACKENDS) == sorted(KDF_ALGORITHMS)
+    for algorithm in KDF_ALGORITHMS:
+        backend = get_kdf(algorithm)
+        assert default_kdf(algorithm) == {"algorithm": algorithm, **backend.defaults}
+        assert backend.scale(backend.minimum) == backend.minimum
+    with pytest.raises(KdfUnknownError):
+        get_kdf("md5")
@@ -0,0 +1,97 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable
+
+import pytest
+
+from secrets_manager.aio import AsyncKeyring
+from secrets_manager.fileformat import FORMAT_LOG, FORMAT_RECORDS
+from secrets_manager.keyring import Keyring
+
+from conftest import PASSWORD
+
+Create = Callable[..., Path]
+
+
+def test_save_keeps_keyring_open(
+    create: Create, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    create(version=FORMAT_LOG)
+    with Keyring("test", PASSWORD) as keyring:
+        monkeypatch.setattr(Keyring, "_open", None)
+        for i in range(80):
+            keyring.add_secret(f"s{i}", "value")
+            keyring.save()
+        for i in range(60):
+            keyring.remove_secret(f"s{i}")
+            keyring.save()
+        keyring.compact()
+        keyring.save()
+        keyring.update_secret("s70", "updated")
+        keyring.save()
+        monkeypatch.undo()
+
+    with Keyring("test", PASSWORD, read_only=True) as keyring:
+        assert keyring.list_secrets() == [f"s{i}" for i in range(60, 80)]
+        assert keyring.get_secret("s70") == "updated"
+
+
+def test_save_rewrites_records(create: Create, monkeypatch: pytest.MonkeyPatch) -> None:
+    create(version=FORMAT_RECORDS)
+    with Keyring("test", PASSWORD) as keyring:
+        monkeypatch.setattr(Keyring, "_open", None)
+        keyring.add_secret("a", "1")
+        keyring.add_secret("b", "2")
+        keyring.save()
+        keyring.update_secret("a", "3")
+        keyring.save()
+        assert keyring.get_secret("b") == "2"
+        keyring.migrate(FORMAT_LOG)
+        keyring.save()
+        keyring.add_secret("c", "4")
+        keyring.save()
+        monkeypatch.undo()
+
+    with Keyring("test", PASSWORD, read_only=True) as keyring:
+        assert keyring.version == FORMAT_LOG
+        assert [keyring.get_secret(name) for name in "abc"] == ["3", "2", "4"]
+
+
+def test_commit_waits_for_window(create: Create) -> None:
+    path = create()
+    size = path.stat().st_size
+    with Keyring("test", PASSWORD, commit_window=60) as keyring:
+        keyring.add_secret("a", "1")
+        assert keyring.commit() is False
+        deadline = keyring.commit_deadline
+        assert deadline is not None and deadline > time.monotonic()
+        keyring.add_secret("b", "2")
+        assert keyring.commit_deadline == deadline
+        assert path.stat().st_size == size
+
+    with Keyring("test", PASSWORD, commit_window=0) as keyring:
+        assert keyring.commit_deadline is None
+        keyring.add_secret("c", "3")
+        assert keyring.commit() is True
+        assert keyring.commit_deadline is None
+        assert path.stat().st_size > size
+
+
+def test_async_commit_flushes_at_deadline(create: Create) -> None:
+    path = create()
+
+    async def run(executor: ThreadPoolExecutor) -> None:
+        async with AsyncKeyring(
+            "test", PASSWORD, kdf_executor=executor, commit_window=0.05
+        ) as keyring:
+            await keyring.add_secret("a", "1")
+            assert await keyring.commit() is False
+            size = path.stat().st_size
+            await asyncio.sleep(0.2)
+            assert not keyring.keyring.dirty
+            assert path.stat().st_size > size
+
+    with ThreadPoolExecutor() as executor:
+        asyncio.run(run(executor))
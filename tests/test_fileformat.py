@@ -0,0 +1,110 @@
+import os
+import pickle
+from pathlib import Path
+from typing import Callable
+
+import pytest
+
+from secrets_manager.blobs import new_blob
+from secrets_manager.crypto import CIPHER_FERNET, encrypt, generate_key
+from secrets_manager.fileformat import (
+    BACKEND,
+    BACKEND_TPM,
+    FORMAT_LOG,
+    FORMAT_PICKLE,
+    FORMAT_RECORDS,
+    LOG_DELETE,
+    LOG_PUT,
+    FileFormatError,
+    detect_format,
+    is_container,
+    legacy_loads,
+    pack_mapping,
+    pack_preamble,
+    pack_records,
+    unpack_header,
+    unpack_mapping,
+    unpack_preamble,
+    unpack_records,
+)
+from secrets_manager.keyring import Keyring
+from secrets_manager.store import keyring_path
+
+from conftest import PASSWORD, TEST_KDF
+
+Create = Callable[..., Path]
+
+
+def test_records_round_trip() -> None:
+    text = [(LOG_PUT, f"secret-{i}", "välue" * i) for i in range(100)]
+    assert unpack_records(pack_records(text)) == text
+
+    blob = new_blob()
+    mixed = [(LOG_PUT, "a", "1"), (LOG_PUT, "cert", blob), (LOG_DELETE, "a", None)]
+    assert unpack_records(pack_records(mixed)) == mixed
+    assert unpack_records(pack_records([])) == []
+
+
+def test_records_reject_truncated_data() -> None:
+    data = pack_records([(LOG_PUT, "a", "value")])
+    with pytest.raises(FileFormatError):
+        unpack_records(data[:-1])
+
+
+def test_mapping_round_trip() -> None:
+    mapping = {"a": "1", "b": (0, 12), "cert": new_blob()}
+    assert unpack_mapping(pack_mapping(mapping)) == mapping
+
+
+def test_preamble_round_trip() -> None:
+    params = {
+        "salt": os.urandom(16),
+        "cipher": "aes-256-gcm",
+        "chain": 1,
+        "kdf": {"algorithm": "scrypt", "n": 2**15, "r": 8, "p": 1},
+        "compression": {"algorithm": "zlib", "threshold": 1024},
+    }
+    preamble = pack_preamble(FORMAT_RECORDS, params, BACKEND)
+    data = preamble + b"payload"
+    assert is_container(data)
+    assert detect_format(data) == FORMAT_RECORDS
+    assert unpack_header(data) == (FORMAT_RECORDS, BACKEND, params, len(preamble))
+    with pytest.raises(FileFormatError):
+        unpack_preamble(data, BACKEND_TPM)
+    with pytest.raises(FileFormatError):
+        unpack_header(preamble[:-1])
+
+
+def test_preamble_rejects_unknown_fields() -> None:
+    with pytest.raises(FileFormatError):
+        pack_preamble(FORMAT_LOG, {"unknown": b""}, BACKEND)
+
+
+def test_legacy_loads_is_restricted() -> None:
+    data = {"salt": b"salt", "secrets": b"data", "names": {"a", "b"}}
+    assert legacy_loads(pickle.dumps(data, protocol=2)) == data
+    assert detect_format(pickle.dumps(data)) == FORMAT_PICKLE
+
+    with pytest.raises(FileFormatError):
+        legacy_loads(pickle.dumps(os.getcwd))
+    with pytest.raises(FileFormatError):
+        legacy_loads(b"not a pickle")
+
+
+def test_keyring_migrates_legacy_pickle(root: Path) -> None:
+    salt = os.urandom(16)
+    key = generate_key(PASSWORD.encode(), salt, TEST_KDF)
+    secrets = pickle.dumps({"a": "1", "b": "2"})
+    db = {"salt": salt, "kdf": TEST_KDF, "secrets": encrypt(key, secrets)}
+    path = keyring_path("legacy")
+    path.write_bytes(pickle.dumps(db))
+
+    with Keyring("legacy", PASSWORD) as keyring:
+        assert keyring.version == FORMAT_PICKLE
+        assert keyring.get_secret("b") == "2"
+        keyring.migrate(FORMAT_LOG)
+
+    assert detect_format(path.read_bytes()) == FORMAT_LOG
+    with Keyring("legacy", PASSWORD, read_only=True) as keyring:
+        assert keyring.list_secrets() == ["a", "b"]
+        assert keyring._cipher != CIPHER_FERNET
@@ -0,0 +1,26 @@
+from pathlib import Path
+from typing import Tuple
+
+import pytest
+
+from benchmarks import imports
+
+
+@pytest.mark.parametrize("command", imports.FAST_PATHS, ids=" ".join)
+def test_fast_paths_import_no_heavy_modules(
+    tmp_path: Path, command: Tuple[str, ...]
+) -> None:
+    _, imported = imports.measure(command, tmp_path)
+    assert imported == []
+
+
+def test_help_forbids_subcommand_modules() -> None:
+    forbidden = imports.forbidden_modules(("secrets_manager", "--help"))
+    assert "cryptography" in forbidden
+    assert "secrets_manager.cli.keyring" in forbidden
+    assert "secrets_manager.cli.secrets" in forbidden
+
+    forbidden = imports.forbidden_modules(("secrets_manager_tpm", "keyring", "list"))
+    assert "tpm2_pytss" in forbidden
+    assert "secrets_manager_tpm.cli.secrets" in forbidden
+    assert "secrets_manager_tpm.cli.keyring" not in forbidden
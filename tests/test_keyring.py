@@ -0,0 +1,96 @@
+from pathlib import Path
+from typing import Callable, List
+
+import pytest
+from click.testing import CliRunner
+
+from secrets_manager.cli import cli
+from secrets_manager.fileformat import (
+    FORMAT_LOG,
+    FORMAT_RECORDS,
+    KDF_PBKDF2_SHA256,
+    KDF_SCRYPT,
+)
+from secrets_manager.keyring import Keyring
+from secrets_manager.locking import FileLock, LockTimeoutError
+
+from conftest import PASSWORD, TEST_KDF
+
+Create = Callable[..., Path]
+
+COMMANDS: List[List[str]] = [
+    ["migrate", "--storage", "records"],
+    ["compact"],
+    ["tune", "--target-ms", "1"],
+    ["rekey", "--new-password", "new"],
+]
+
+
+def _invoke(root: Path, *args: str) -> str:
+    result = CliRunner().invoke(cli, ["--store", str(root), "keyring", *args])
+    assert result.exit_code == 1
+    return result.output
+
+
+@pytest.mark.parametrize("command", COMMANDS, ids=lambda command: command[0])
+def test_keyring_commands_report_errors(
+    root: Path, create: Create, monkeypatch: pytest.MonkeyPatch, command: List[str]
+) -> None:
+    create()
+    name, *options = command
+    output = _invoke(root, name, "test", "-p", "wrong", *options)
+    assert "Error: Invalid password." in output
+    output = _invoke(root, name, ".bad", "-p", PASSWORD, *options)
+    assert "Error: Invalid keyring name." in output
+
+    def locked(self: FileLock) -> None:
+        raise LockTimeoutError
+
+    monkeypatch.setattr(FileLock, "acquire", locked)
+    output = _invoke(root, name, "test", "-p", PASSWORD, *options)
+    assert "Error: Keyring is locked by another process." in output
+
+
+def test_keyring_remove_reports_errors(
+    root: Path, create: Create, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    create()
+    assert "Error: Invalid keyring name." in _invoke(root, "remove", ".bad")
+    assert "Error: Keyring not found." in _invoke(root, "remove", "other")
+
+    def locked(self: FileLock) -> None:
+        raise LockTimeoutError
+
+    monkeypatch.setattr(FileLock, "acquire", locked)
+    output = _invoke(root, "remove", "test")
+    assert "Error: Keyring is locked by another process." in output
+
+
+@pytest.mark.parametrize("version", [FORMAT_RECORDS, FORMAT_LOG])
+@pytest.mark.parametrize("algorithm", [KDF_PBKDF2_SHA256, KDF_SCRYPT])
+def test_keyring_tune_persists_kdf(
+    root: Path, create: Create, version: int, algorithm: str
+) -> None:
+    create(version=version)
+    with Keyring("test", PASSWORD) as keyring:
+        keyring.add_secret("a", "1")
+    salt, _ = Keyring.kdf_params("test")
+
+    result = CliRunner().invoke(
+        cli,
+        ["--store", str(root), "keyring", "tune", "test", "-p", PASSWORD]
+        + ["--target-ms", "1", "--kdf", algorithm],
+    )
+    assert result.exit_code == 0
+    new_salt, kdf = Keyring.kdf_params("test")
+    assert kdf["algorithm"] == algorithm
+    assert kdf != TEST_KDF
+    assert new_salt != salt
+    assert result.output == ", ".join(f"{k}={v}" for k, v in kdf.items()) + "\n"
+
+    with Keyring("test", PASSWORD, read_only=True) as keyring:
+        assert keyring.kdf == kdf
+        assert keyring.version == version
+        assert keyring.get_secret("a") == "1"
+    with pytest.raises(ValueError):
+        Keyring("test", "wrong", read_only=True)
@@ -0,0 +1,75 @@
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+import pytest
+
+from secrets_manager import locking
+from secrets_manager.locking import FileLock, LockTimeoutError, write_atomic
+
+
+@pytest.fixture
+def path(tmp_path: Path) -> Path:
+    return tmp_path / ".test.lock"
+
+
+def test_readers_share_lock(path: Path) -> None:
+    with FileLock(path, shared=True, timeout=0):
+        with FileLock(path, shared=True, timeout=0):
+            pass
+
+
+def test_writer_excludes_readers_and_writers(path: Path) -> None:
+    with FileLock(path, timeout=0):
+        with pytest.raises(LockTimeoutError):
+            FileLock(path, shared=True, timeout=0).acquire()
+        with pytest.raises(LockTimeoutError):
+            FileLock(path, timeout=0).acquire()
+
+    with FileLock(path, shared=True, timeout=0):
+        with pytest.raises(LockTimeoutError):
+            FileLock(path, timeout=0).acquire()
+
+    with FileLock(path, timeout=0):
+        pass
+
+
+def test_lock_times_out(path: Path) -> None:
+    with FileLock(path):
+        start = time.monotonic()
+        with pytest.raises(LockTimeoutError):
+            FileLock(path, timeout=0.1).acquire()
+        assert time.monotonic() - start >= 0.1
+
+
+def test_lock_waits_for_release(path: Path) -> None:
+    holder = FileLock(path)
+    holder.acquire()
+    timer = threading.Timer(0.05, holder.release)
+    timer.start()
+    try:
+        with FileLock(path, timeout=5):
+            pass
+    finally:
+        timer.join()
+
+
+def test_write_atomic_keeps_old_file_on_failure(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    target = tmp_path / "test.db"
+    write_atomic(target, b"old")
+
+    def failing(fd: int, durability: Optional[str] = None) -> None:
+        raise OSError
+
+    monkeypatch.setattr(locking, "sync_file", failing)
+    with pytest.raises(OSError):
+        write_atomic(target, b"new")
+    assert target.read_bytes() == b"old"
+    assert [entry.name for entry in tmp_path.iterdir()] == ["test.db"]
+
+    monkeypatch.undo()
+    write_atomic(target, b"new")
+    assert target.read_bytes() == b"new"
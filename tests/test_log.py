@@ -0,0 +1,121 @@
+from pathlib import Path
+from typing import Callable, List, Tuple
+
+import pytest
+
+from secrets_manager.fileformat import (
+    BACKEND,
+    FORMAT_LOG,
+    LOG_PUT,
+    pack_block,
+    pack_preamble,
+    pack_records,
+    unpack_blocks,
+    unpack_preamble,
+)
+from secrets_manager.keyring import Keyring, KeyringFileInvalidError
+
+from conftest import PASSWORD
+
+Create = Callable[..., Path]
+
+
+def _append(name: str, *values: Tuple[str, str]) -> None:
+    with Keyring(name, PASSWORD) as keyring:
+        for secret, value in values:
+            keyring.add_secret(secret, value)
+
+
+def _blocks(path: Path) -> Tuple[bytes, List[bytes]]:
+    data = path.read_bytes()
+    _, _, offset = unpack_preamble(data, BACKEND)
+    blocks = []
+    start = offset
+    for _, end in unpack_blocks(data, offset):
+        blocks.append(data[start:end])
+        start = end
+    return data[:offset], blocks
+
+
+def _corrupt(block: bytes) -> bytes:
+    return block[:-1] + bytes([block[-1] ^ 1])
+
+
+def test_log_replays_appended_blocks(create: Create) -> None:
+    path = create()
+    _append("test", ("a", "1"))
+    _append("test", ("b", "2"))
+    _append("test", ("c", "3"))
+    assert len(_blocks(path)[1]) == 4
+
+    with Keyring("test", PASSWORD, read_only=True) as keyring:
+        assert keyring.list_secrets() == ["a", "b", "c"]
+
+
+def test_log_tolerates_torn_final_block(create: Create) -> None:
+    path = create()
+    _append("test", ("a", "1"))
+    _append("test", ("b", "2"))
+    preamble, blocks = _blocks(path)
+
+    path.write_bytes(preamble + b"".join(blocks[:-1]) + _corrupt(blocks[-1]))
+    with Keyring("test", PASSWORD, read_only=True) as keyring:
+        assert keyring.list_secrets() == ["a"]
+
+    path.write_bytes(preamble + b"".join(blocks[:-1]) + blocks[-1][:-3])
+    with Keyring("test", PASSWORD) as keyring:
+        assert keyring.list_secrets() == ["a"]
+        keyring.add_secret("c", "3")
+    with Keyring("test", PASSWORD, read_only=True) as keyring:
+        assert keyring.list_secrets() == ["a", "c"]
+
+
+def test_log_rejects_corrupt_middle_block(create: Create) -> None:
+    path = create()
+    _append("test", ("a", "1"))
+    _append("test", ("b", "2"))
+    preamble, blocks = _blocks(path)
+
+    blocks[1] = _corrupt(blocks[1])
+    path.write_bytes(preamble + b"".join(blocks))
+    with pytest.raises(KeyringFileInvalidError):
+        Keyring("test", PASSWORD, read_only=True)
+
+
+def test_log_rejects_dropped_block(create: Create) -> None:
+    path = create()
+    _append("test", ("a", "1"))
+    _append("test", ("b", "2"))
+    preamble, blocks = _blocks(path)
+
+    path.write_bytes(preamble + blocks[0] + blocks[2])
+    with pytest.raises(KeyringFileInvalidError):
+        Keyring("test", PASSWORD, read_only=True)
+
+
+def test_log_rejects_reordered_blocks(create: Create) -> None:
+    path = create()
+    _append("test", ("a", "1"))
+    _append("test", ("b", "2"))
+    preamble, blocks = _blocks(path)
+
+    path.write_bytes(preamble + blocks[0] + blocks[2] + blocks[1])
+    with pytest.raises(KeyringFileInvalidError):
+        Keyring("test", PASSWORD, read_only=True)
+
+
+def test_log_upgrades_unchained_log(create: Create) -> None:
+    path = create()
+    _, params, _ = unpack_preamble(path.read_bytes(), BACKEND)
+    del params["chain"]
+    with Keyring("test", PASSWORD, read_only=True) as keyring:
+        block = keyring._encrypt(pack_records([(LOG_PUT, "a", "1")]))
+    path.write_bytes(pack_preamble(FORMAT_LOG, params, BACKEND) + pack_block(block))
+
+    with Keyring("test", PASSWORD) as keyring:
+        assert keyring.list_secrets() == ["a"]
+        keyring.add_secret("b", "2")
+    _, params, _ = unpack_preamble(path.read_bytes(), BACKEND)
+    assert params["chain"] == 1
+    with Keyring("test", PASSWORD, read_only=True) as keyring:
+        assert keyring.list_secrets() == ["a", "b"]
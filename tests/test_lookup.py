@@ -0,0 +1,98 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, List
+
+import pytest
+from click.testing import CliRunner
+
+from secrets_manager import lookup
+from secrets_manager.agent import AGENT_SOCKET_ENV
+from secrets_manager.cli import cli
+from secrets_manager.keyring import Keyring, KeyringNotFoundError
+from secrets_manager.lookup import KeyringLookupError, SecretsNotFoundError, get_many
+from secrets_manager.store import KeyringNameInvalidError
+
+from conftest import PASSWORD
+
+Create = Callable[..., Path]
+
+
+@pytest.fixture
+def keyrings(create: Create) -> None:
+    for name in ("a", "b"):
+        create(name)
+        with Keyring(name, PASSWORD) as keyring:
+            keyring.add_secret("x", f"{name}-x")
+            keyring.add_secret("y", f"{name}-y")
+
+
+def test_get_many(keyrings: None) -> None:
+    with ThreadPoolExecutor() as executor:
+        values = get_many(["a/x", "b/y", "a/y"], PASSWORD, executor=executor)
+        assert values == {"a/x": "a-x", "b/y": "b-y", "a/y": "a-y"}
+
+        with pytest.raises(SecretsNotFoundError) as missing:
+            get_many(["a/x", "b/z"], PASSWORD, executor=executor)
+        assert missing.value.references == ["b/z"]
+
+
+def test_get_many_reports_keyring_errors(keyrings: None) -> None:
+    with ThreadPoolExecutor() as executor:
+        with pytest.raises(KeyringLookupError) as error:
+            get_many(["a/x", "c/x"], PASSWORD, executor=executor)
+        assert error.value.keyring == "c"
+        assert isinstance(error.value.error, KeyringNotFoundError)
+
+        with pytest.raises(KeyringLookupError) as error:
+            get_many(["a/x"], "wrong", executor=executor)
+        assert isinstance(error.value.error, ValueError)
+
+        with pytest.raises(KeyringLookupError) as error:
+            get_many(["a/x", ".bad/x"], PASSWORD, executor=executor)
+        assert error.value.keyring == ".bad"
+        assert isinstance(error.value.error, KeyringNameInvalidError)
+
+
+def test_get_many_raises_unexpected_errors(
+    keyrings: None, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    def failing(*args: Any) -> None:
+        raise RuntimeError
+
+    monkeypatch.setattr(lookup, "_lookup", failing)
+    with ThreadPoolExecutor() as executor:
+        with pytest.raises(RuntimeError):
+            get_many(["a/x"], PASSWORD, executor=executor)
+
+
+@pytest.fixture
+def threads(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    monkeypatch.setattr(lookup, "_executor", ThreadPoolExecutor)
+    monkeypatch.setenv(AGENT_SOCKET_ENV, str(tmp_path / "agent.sock"))
+
+
+def test_get_command(root: Path, keyrings: None, threads: None) -> None:
+    result = CliRunner().invoke(
+        cli, ["--store", str(root), "get", "a/x", "b/y", "-p", PASSWORD]
+    )
+    assert result.exit_code == 0
+    assert result.output == '{"a/x": "a-x", "b/y": "b-y"}\n'
+
+
+@pytest.mark.parametrize(
+    "args, message",
+    [
+        (["a/x", "-p", "wrong"], "Error: Invalid password for keyring a."),
+        (["a/x", "c/x", "-p", PASSWORD], "Error: Keyring c not found."),
+        (["a/x", ".bad/x", "-p", PASSWORD], "Error: Keyring name .bad invalid."),
+        ([".bad/x"], "Error: Keyring name .bad invalid."),
+        (["a/x", "b/z", "-p", PASSWORD], "Error: Secret not found: b/z"),
+        (["a"], "Error: Invalid reference a."),
+    ],
+)
+def test_get_command_reports_errors(
+    root: Path, keyrings: None, threads: None, args: List[str], message: str
+) -> None:
+    result = CliRunner().invoke(cli, ["--store", str(root), "get", *args])
+    assert result.exit_code == 1
+    assert message in result.output
@@ -0,0 +1,108 @@
+import io
+from pathlib import Path
+from typing import Callable, List, Optional
+
+import pytest
+
+from secrets_manager.keyring import Keyring
+from secrets_manager.namespace import MAX_CHAR, NameIndex
+
+from conftest import PASSWORD
+
+Create = Callable[..., Path]
+
+NAMES = [
+    "db",
+    "prod/api/key",
+    "prod/api/token",
+    "prod/db/password",
+    "prod/web/",
+    "prod/web/cert",
+    "production",
+    "stage/api/key",
+]
+
+
+def _pages(
+    index: NameIndex, prefix: str, depth: Optional[int], limit: int
+) -> List[str]:
+    entries: List[str] = []
+    cursor = None
+    while True:
+        page, cursor = index.list(prefix, depth, cursor, limit)
+        entries.extend(page)
+        if cursor is None:
+            return entries
+
+
+def test_index_scope() -> None:
+    index = NameIndex(reversed(NAMES))
+    assert len(index) == len(NAMES)
+    assert "prod/api/key" in index and "prod/api" not in index
+    assert index.scope("prod/") == NAMES[1:6]
+    assert index.scope("prod") == NAMES[1:7]
+    assert index.scope("") == NAMES
+    assert index.scope("zzz") == []
+
+    index.add("prod/api/key")
+    index.add("prod/a")
+    assert index.scope("prod/a") == ["prod/a", "prod/api/key", "prod/api/token"]
+    index.remove("prod/a")
+    index.remove("missing")
+    assert index.remove_scope("prod/api/") == ["prod/api/key", "prod/api/token"]
+    assert index.scope("prod/") == ["prod/db/password", "prod/web/", "prod/web/cert"]
+
+
+def test_index_scope_of_max_char_prefix() -> None:
+    names = ["a" + MAX_CHAR, "a" + MAX_CHAR + "b", "b"]
+    assert NameIndex(names).scope("a" + MAX_CHAR) == names[:2]
+    assert NameIndex([MAX_CHAR]).scope(MAX_CHAR) == [MAX_CHAR]
+
+
+def test_index_list_depth() -> None:
+    index = NameIndex(NAMES)
+    assert index.list("prod/", 1) == (["prod/api/", "prod/db/", "prod/web/"], None)
+    assert index.list("prod/", 2) == (NAMES[1:6], None)
+    assert index.list("", 1) == (["db", "prod/", "production", "stage/"], None)
+    assert index.list("prod/api/key", 1) == (["prod/api/key"], None)
+
+
+@pytest.mark.parametrize("depth", [None, 1, 2])
+@pytest.mark.parametrize("limit", [1, 2, 3, 100])
+def test_index_list_pages(depth: Optional[int], limit: int) -> None:
+    index = NameIndex(NAMES)
+    for prefix in ("", "prod/", "prod", "stage/"):
+        entries, _ = index.list(prefix, depth)
+        assert _pages(index, prefix, depth, limit) == entries
+
+
+def test_index_list_rejects_invalid_arguments() -> None:
+    with pytest.raises(ValueError):
+        NameIndex().list(depth=0)
+    with pytest.raises(ValueError):
+        NameIndex().list(limit=0)
+
+
+def test_keyring_namespaces(create: Create) -> None:
+    create()
+    with Keyring("test", PASSWORD) as keyring:
+        for name in NAMES[:4]:
+            keyring.add_secret(name, name)
+        keyring.put_file("prod/web/cert", io.BytesIO(b"cert"))
+        assert keyring.list_names("prod/", 1) == (
+            ["prod/api/", "prod/db/", "prod/web/"],
+            None,
+        )
+        assert keyring.remove_prefix("prod/a") == ["prod/api/key", "prod/api/token"]
+        assert keyring.remove_prefix("missing/") == []
+
+    with Keyring("test", PASSWORD) as keyring:
+        assert keyring.list_names("prod/") == (
+            ["prod/db/password", "prod/web/cert"],
+            None,
+        )
+        assert keyring.remove_prefix("prod/") == ["prod/db/password", "prod/web/cert"]
+
+    with Keyring("test", PASSWORD, read_only=True) as keyring:
+        assert keyring.list_names() == (["db"], None)
+        assert keyring.list_files() == {}
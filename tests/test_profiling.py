@@ -0,0 +1,68 @@
+import json
+from pathlib import Path
+from typing import Callable, List, Tuple
+
+import pytest
+from click.testing import CliRunner
+
+from secrets_manager import profiling
+from secrets_manager.cli import cli
+from secrets_manager.keyring import Keyring
+
+from conftest import PASSWORD
+
+Create = Callable[..., Path]
+
+
+@pytest.fixture
+def keyring(create: Create) -> None:
+    create()
+    with Keyring("test", PASSWORD) as instance:
+        instance.add_secret("a", "1")
+
+
+def _get(root: Path, *options: str) -> Tuple[str, str]:
+    args = ["--store", str(root), *options, "secrets", "-k", "test", "-p", PASSWORD]
+    result = CliRunner().invoke(cli, [*args, "--no-agent", "get", "a"])
+    assert result.exit_code == 0
+    return result.stdout, result.stderr
+
+
+def test_profile_reports_phases(root: Path, keyring: None) -> None:
+    stdout, stderr = _get(root, "--profile")
+    assert stdout == "Secret: 1\n"
+
+    summary = json.loads(stderr)
+    assert {"lock", "read", "kdf", "decrypt"} <= set(summary["phases"])
+    assert summary["phases"]["kdf"]["count"] == 1
+    assert summary["phases"]["read"]["bytes"] > 0
+    assert all(event["seconds"] >= 0 for event in summary["events"])
+    assert not profiling._hooks
+
+
+def test_profile_disabled(root: Path, keyring: None) -> None:
+    assert profiling.phase("kdf") is profiling._DISABLED
+    assert _get(root) == ("Secret: 1\n", "")
+
+
+def test_hooks_receive_phases() -> None:
+    calls: List[Tuple[str, int]] = []
+
+    def hook(name: str, seconds: float, size: int) -> None:
+        calls.append((name, size))
+
+    profiling.add_hook(hook)
+    try:
+        with profiling.phase("outer", 1) as current:
+            current.add(2)
+    finally:
+        profiling.remove_hook(hook)
+    with profiling.phase("ignored"):
+        pass
+    assert calls == [("outer", 3)]
+
+    with profiling.trace() as recorder:
+        with profiling.phase("traced"):
+            pass
+    assert [event["phase"] for event in recorder.events] == ["traced"]
+    assert not profiling._hooks
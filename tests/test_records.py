@@ -0,0 +1,115 @@
+import struct
+from pathlib import Path
+from typing import Callable, List, Tuple
+
+import pytest
+
+from secrets_manager.crypto import CIPHER_FERNET
+from secrets_manager.fileformat import (
+    BACKEND,
+    COMPRESSION_ZLIB,
+    FORMAT_LOG,
+    FORMAT_RECORDS,
+    unpack_block,
+    unpack_preamble,
+)
+from secrets_manager.keyring import Keyring
+
+from conftest import PASSWORD
+
+Create = Callable[..., Path]
+
+ZLIB = {"algorithm": COMPRESSION_ZLIB, "threshold": 1024}
+
+
+def _records(path: Path, count: int) -> Tuple[bytes, List[bytes]]:
+    data = path.read_bytes()
+    _, _, offset = unpack_preamble(data, BACKEND)
+    _, end = unpack_block(data, offset)
+    size = (len(data) - end) // count
+    return data[:end], [data[i : i + size] for i in range(end, len(data), size)]
+
+
+def _fill(name: str, **secrets: str) -> None:
+    with Keyring(name, PASSWORD) as keyring:
+        for secret, value in secrets.items():
+            keyring.add_secret(secret, value)
+
+
+def test_records_read_secrets_from_file(create: Create) -> None:
+    create(version=FORMAT_RECORDS)
+    _fill("test", a="1", b="22", c="333")
+
+    with Keyring("test", PASSWORD) as keyring:
+        keyring.update_secret("b", "updated")
+    with Keyring("test", PASSWORD, read_only=True) as keyring:
+        assert keyring.version == FORMAT_RECORDS
+        assert keyring.list_secrets() == ["a", "b", "c"]
+        assert keyring.get_secret("a") == "1"
+        assert keyring.get_secret("b") == "updated"
+        assert keyring.get_secret("c") == "333"
+
+
+def test_records_reject_swapped_records(create: Create) -> None:
+    path = create(version=FORMAT_RECORDS)
+    _fill("test", a="one", b="two")
+    header, records = _records(path, 2)
+
+    path.write_bytes(header + records[1] + records[0])
+    with Keyring("test", PASSWORD, read_only=True) as keyring:
+        with pytest.raises(ValueError):
+            keyring.get_secret("a")
+        with pytest.raises(ValueError):
+            keyring.get_secret("b")
+
+
+def test_records_reject_tampered_record(create: Create) -> None:
+    path = create(version=FORMAT_RECORDS)
+    _fill("test", a="one", b="two")
+    header, records = _records(path, 2)
+
+    tampered = records[1][:-1] + bytes([records[1][-1] ^ 1])
+    path.write_bytes(header + records[0] + tampered)
+    with Keyring("test", PASSWORD, read_only=True) as keyring:
+        assert keyring.get_secret("a") == "one"
+        with pytest.raises(ValueError):
+            keyring.get_secret("b")
+
+
+def test_records_bind_index_to_header(create: Create) -> None:
+    path = create(version=FORMAT_RECORDS, compression=ZLIB)
+    _fill("test", a="1")
+
+    data = path.read_bytes()
+    field = struct.pack(">BHI", 33, 4, ZLIB["threshold"])
+    assert data.count(field) == 1
+    path.write_bytes(data.replace(field, struct.pack(">BHI", 33, 4, 1)))
+    with pytest.raises(ValueError):
+        Keyring("test", PASSWORD, read_only=True)
+
+
+def test_records_without_associated_data_are_upgraded(create: Create) -> None:
+    path = create(version=FORMAT_RECORDS, cipher=CIPHER_FERNET)
+    _fill("test", a="1", b="2")
+    _, params, _ = unpack_preamble(path.read_bytes(), BACKEND)
+    assert "aad" not in params
+
+    with Keyring("test", PASSWORD) as keyring:
+        keyring.migrate(FORMAT_RECORDS)
+    _, params, _ = unpack_preamble(path.read_bytes(), BACKEND)
+    assert params["aad"] == 1
+    with Keyring("test", PASSWORD, read_only=True) as keyring:
+        assert keyring.get_secret("a") == "1"
+        assert keyring.get_secret("b") == "2"
+
+
+def test_records_migrate_from_log(create: Create) -> None:
+    create(version=FORMAT_LOG)
+    _fill("test", a="1", b="2")
+
+    with Keyring("test", PASSWORD) as keyring:
+        keyring.migrate(FORMAT_RECORDS)
+    with Keyring("test", PASSWORD, read_only=True) as keyring:
+        assert keyring.version == FORMAT_RECORDS
+        assert keyring.get_secret("a") == "1"
+        assert keyring.get_secret("b") == "2"
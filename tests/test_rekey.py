@@ -0,0 +1,115 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Optional
+
+import pytest
+from click.testing import CliRunner
+
+from secrets_manager.cli import cli
+from secrets_manager.keyring import Keyring, KeyringNotFoundError
+from secrets_manager.rekey import (
+    REKEY_ALREADY,
+    REKEY_DONE,
+    REKEY_FAILED,
+    REKEY_SKIPPED,
+    Journal,
+    rekey_all,
+)
+
+from conftest import PASSWORD
+
+Create = Callable[..., Path]
+
+
+def test_rekey_all_resumes_from_journal(root: Path, create: Create) -> None:
+    create("a")
+    create("b")
+    entries = [("a", PASSWORD, "new"), ("b", "wrong", "new"), ("c", PASSWORD, "new")]
+    journal = Journal()
+
+    with ThreadPoolExecutor() as executor:
+        results = {
+            name: (status, error)
+            for name, status, error in rekey_all(entries, journal, executor=executor)
+        }
+        assert results["a"] == (REKEY_DONE, None)
+        assert results["b"][0] == REKEY_FAILED
+        assert isinstance(results["b"][1], ValueError)
+        assert results["c"][0] == REKEY_FAILED
+        assert isinstance(results["c"][1], KeyringNotFoundError)
+
+        entries[1] = ("b", PASSWORD, "new")
+        results = {
+            name: (status, error)
+            for name, status, error in rekey_all(entries, journal, executor=executor)
+        }
+        assert results["a"] == (REKEY_SKIPPED, None)
+        assert results["b"] == (REKEY_DONE, None)
+
+        journal.remove()
+        entries = [("b", PASSWORD, "new")]
+        results = {
+            name: (status, error)
+            for name, status, error in rekey_all(entries, journal, executor=executor)
+        }
+        assert results["b"] == (REKEY_ALREADY, None)
+
+    with Keyring("a", "new", read_only=True) as keyring:
+        assert keyring.list_secrets() == []
+
+
+def test_rekey_all_raises_unexpected_errors(root: Path) -> None:
+    def failing(
+        root: Path, name: str, old: str, new: str, timeout: Optional[float]
+    ) -> str:
+        raise RuntimeError
+
+    with ThreadPoolExecutor() as executor:
+        with pytest.raises(RuntimeError):
+            list(
+                rekey_all([("a", "old", "new")], Journal(), failing, executor=executor)
+            )
+
+
+class _WorkerError(Exception):
+    pass
+
+
+def test_rekey_all_continues_after_worker_errors(root: Path) -> None:
+    def worker(
+        root: Path, name: str, old: str, new: str, timeout: Optional[float]
+    ) -> str:
+        if name == "b":
+            raise _WorkerError
+        return REKEY_DONE
+
+    journal = Journal()
+    entries = [(name, "old", "new") for name in ("a", "b", "c")]
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        results = list(
+            rekey_all(
+                entries, journal, worker, executor=executor, errors=(_WorkerError,)
+            )
+        )
+    statuses = {name: status for name, status, _ in results}
+    assert statuses == {"a": REKEY_DONE, "b": REKEY_FAILED, "c": REKEY_DONE}
+    assert journal.completed() == {"a", "c"}
+
+
+def test_rekey_all_cli_reports_failures(root: Path, create: Create) -> None:
+    create("a")
+    create("b")
+    rekey_file = root.parent / "rekey.tsv"
+    rekey_file.write_text(
+        f"a\t{PASSWORD}\tnew\nb\twrong\tnew\nc\t{PASSWORD}\tnew\n.bad\tx\ty\n"
+    )
+    result = CliRunner().invoke(
+        cli,
+        ["--store", str(root), "keyring", "rekey-all", "--from-file", str(rekey_file)]
+        + ["--jobs", "1"],
+    )
+    assert result.exit_code == 1
+    assert "a: rekeyed" in result.output
+    assert "b: failed: Invalid password." in result.output
+    assert "c: failed: Keyring not found." in result.output
+    assert ".bad: failed: Invalid keyring name." in result.output
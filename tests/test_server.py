@@ -0,0 +1,152 @@
+import os
+import stat
+import threading
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional, Tuple
+
+import pytest
+from click.testing import CliRunner
+
+from secrets_manager import server as secrets_server
+from secrets_manager import store
+from secrets_manager.agent import AgentSocketInsecureError
+from secrets_manager.cli import cli
+from secrets_manager.client import Client, ServerNotRunningError
+from secrets_manager.keyring import Keyring, SecretNotFoundError
+from secrets_manager.server import (
+    SecretsServer,
+    ServedKeyring,
+    ServerAlreadyRunningError,
+)
+
+from conftest import PASSWORD
+
+Create = Callable[..., Path]
+Credentials = Optional[Tuple[int, int, int]]
+
+
+@pytest.fixture
+def path(tmp_path: Path) -> Path:
+    return tmp_path / "server" / "server.sock"
+
+
+@pytest.fixture
+def keyring(create: Create) -> ServedKeyring:
+    create()
+    with Keyring("test", PASSWORD) as instance:
+        instance.add_secret("a", "1")
+        instance.add_secret("b", "2")
+    return ServedKeyring("test", PASSWORD, False)
+
+
+def _start(server: SecretsServer) -> threading.Thread:
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,))
+    thread.start()
+    return thread
+
+
+@pytest.fixture
+def server(path: Path, keyring: ServedKeyring) -> Iterator[SecretsServer]:
+    with SecretsServer(path, [keyring]) as server:
+        thread = _start(server)
+        yield server
+        server.shutdown()
+        thread.join()
+
+
+def _peer(monkeypatch: pytest.MonkeyPatch, creds: Credentials) -> None:
+    monkeypatch.setattr(secrets_server, "peer_credentials", lambda conn: creds)
+
+
+def test_server_serves_secrets(path: Path, server: SecretsServer) -> None:
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+    with Client(path) as client:
+        assert client.keyrings() == ["test"]
+        assert client.get("test", "a") == "1"
+        assert client.get_many("test", ["a", "c"]) == {"a": "1", "c": None}
+        assert sorted(client.list("test")) == ["a", "b"]
+        with pytest.raises(SecretNotFoundError):
+            client.get("test", "c")
+
+
+@pytest.mark.parametrize(
+    "creds", [None, (1, os.getuid() + 1, os.getgid() + 1)], ids=["unknown", "other"]
+)
+def test_server_rejects_denied_peers(
+    path: Path,
+    server: SecretsServer,
+    monkeypatch: pytest.MonkeyPatch,
+    creds: Credentials,
+) -> None:
+    _peer(monkeypatch, creds)
+    with Client(path) as client:
+        with pytest.raises(ServerNotRunningError):
+            client.get("test", "a")
+
+
+def test_server_accepts_allowed_group(
+    tmp_path: Path, keyring: ServedKeyring, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    path = tmp_path / "shared" / "server.sock"
+    path.parent.mkdir()
+    os.chmod(path.parent, 0o755)
+    _peer(monkeypatch, (1, os.getuid() + 1, os.getgid()))
+
+    with SecretsServer(path, [keyring], allowed_gids=[os.getgid()]) as server:
+        thread = _start(server)
+        try:
+            assert stat.S_IMODE(os.stat(path).st_mode) == 0o660
+            with Client(path) as client:
+                assert client.get("test", "a") == "1"
+        finally:
+            server.shutdown()
+            thread.join()
+
+
+def test_server_checks_socket_path(
+    path: Path, keyring: ServedKeyring, server: SecretsServer
+) -> None:
+    with pytest.raises(ServerAlreadyRunningError):
+        SecretsServer(path, [keyring])
+
+    stale = path.with_name("stale")
+    stale.write_bytes(b"")
+    with pytest.raises(AgentSocketInsecureError):
+        SecretsServer(stale, [keyring])
+    assert stale.is_file()
+
+    os.chmod(path.parent, 0o755)
+    try:
+        with pytest.raises(AgentSocketInsecureError):
+            SecretsServer(path.with_name("other.sock"), [keyring])
+    finally:
+        os.chmod(path.parent, 0o700)
+
+
+def test_server_reports_reload_errors(path: Path, keyring: ServedKeyring) -> None:
+    errors: List[str] = []
+    with SecretsServer(
+        path, [keyring], on_reload_error=lambda name, e: errors.append(name)
+    ) as server:
+        store.keyring_path("test").write_bytes(b"invalid")
+        assert server.reload() == []
+        assert errors == ["test"]
+        assert keyring.secrets == {"a": "1", "b": "2"}
+
+
+@pytest.mark.parametrize(
+    "args, message",
+    [
+        (["-k", "test"], "Error: Invalid password for keyring test."),
+        (["-k", ".bad"], "Error: Keyring name .bad invalid."),
+        (["-k", "test", "--allow-gid", "0"], "Error: --allow-uid and --allow-gid"),
+    ],
+)
+def test_serve_reports_errors(
+    root: Path, keyring: ServedKeyring, args: List[str], message: str
+) -> None:
+    result = CliRunner().invoke(
+        cli, ["--store", str(root), "serve", "--no-agent", *args], input="wrong\n"
+    )
+    assert result.exit_code == 1
+    assert message in result.output
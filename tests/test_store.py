@@ -0,0 +1,68 @@
+import io
+from pathlib import Path
+from typing import Callable
+
+import pytest
+from click.testing import CliRunner
+
+from secrets_manager import store
+from secrets_manager.cli import cli
+from secrets_manager.locking import FileLock, LockTimeoutError, lock_path
+from secrets_manager.keyring import Keyring
+
+from conftest import PASSWORD
+
+Create = Callable[..., Path]
+
+
+def test_reshard_moves_keyrings(root: Path, create: Create) -> None:
+    create("a")
+    create("b")
+    with Keyring("a", PASSWORD) as keyring:
+        keyring.add_secret("secret", "value")
+        keyring.put_file("cert", io.BytesIO(b"data"))
+
+    assert sorted(store.Catalog().reshard(2)) == ["a", "b"]
+    assert store.shard_levels() == 2
+    path = store.keyring_path("a")
+    assert path.parent.parent.parent == root
+    assert store.blobs_path(path).is_dir()
+    assert not (root / "a.db.lock").exists()
+    with Keyring("a", PASSWORD, read_only=True) as keyring:
+        assert keyring.get_secret("secret") == "value"
+        assert b"".join(keyring.iter_file("cert")) == b"data"
+
+    assert store.Catalog().reshard(2) == []
+    assert sorted(store.Catalog().reshard(0)) == ["a", "b"]
+    assert (root / "a.db").is_file()
+
+
+def test_reshard_waits_for_keyring_lock(root: Path, create: Create) -> None:
+    path = create("a")
+    create("b")
+    with FileLock(lock_path(path)):
+        with pytest.raises(LockTimeoutError):
+            store.Catalog().reshard(1, lock_timeout=0)
+    assert store.shard_levels() == 0
+    assert path.is_file()
+    assert store.keyring_path("b").is_file()
+
+
+def test_reshard_reports_locked_keyring(root: Path, create: Create) -> None:
+    path = create("a")
+    with FileLock(lock_path(path)):
+        result = CliRunner().invoke(
+            cli,
+            ["--store", str(root), "keyring", "reshard", "--levels", "1"]
+            + ["--lock-timeout", "0"],
+        )
+    assert result.exit_code == 1
+    assert "Error: Keyring is locked by another process." in result.output
+
+
+def test_secrets_reports_invalid_keyring_name(root: Path) -> None:
+    result = CliRunner().invoke(
+        cli, ["--store", str(root), "secrets", "-k", ".hidden", "-p", "x", "list"]
+    )
+    assert result.exit_code == 1
+    assert "Error: Keyring name invalid." in result.output
@@ -0,0 +1,72 @@
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+pytest.importorskip("tpm2_pytss")
+
+from secrets_manager_tpm import tpm
+from secrets_manager_tpm.keyring import Keyring
+from secrets_manager_tpm.software import SoftwareFapi
+
+from conftest import PASSWORD
+
+
+@pytest.fixture
+def fapi(root: Path, tmp_path: Path) -> Iterator[Path]:
+    store = tmp_path / "fapi.json"
+    tpm.set_provider(lambda: SoftwareFapi(store))
+    yield store
+    tpm.set_provider(None)
+
+
+def _create(name: str = "test") -> None:
+    Keyring.create_keyring(name, PASSWORD.encode(), False)
+
+
+def test_create_calls(fapi: Path) -> None:
+    with tpm.count_calls() as calls:
+        _create()
+    assert calls == {"open": 1, "create_key": 1, "list": 1, "encrypt": 1}
+
+
+def test_add_calls(fapi: Path) -> None:
+    _create()
+    with tpm.count_calls() as calls:
+        with Keyring("test", PASSWORD.encode()) as keyring:
+            keyring.add_secret("a", "1")
+    assert calls == {"open": 1, "list": 1, "decrypt": 1}
+
+
+def test_get_calls(fapi: Path) -> None:
+    _create()
+    with Keyring("test", PASSWORD.encode()) as keyring:
+        keyring.add_secret("a", "1")
+
+    with tpm.count_calls() as calls:
+        with Keyring("test", PASSWORD.encode(), True) as keyring:
+            assert keyring.get_secret("a") == "1"
+    assert calls == {"open": 1, "list": 1, "decrypt": 1}
+
+
+def test_save_makes_no_calls(fapi: Path) -> None:
+    _create()
+    with Keyring("test", PASSWORD.encode()) as keyring:
+        for i in range(3):
+            keyring.add_secret(f"secret-{i}", str(i))
+            with tpm.count_calls() as calls:
+                keyring.save()
+            assert calls == {}
+
+
+def test_context_pool_reuses_contexts(fapi: Path) -> None:
+    _create()
+    tpm.enable_context_pool()
+    try:
+        with tpm.count_calls() as calls:
+            for _ in range(3):
+                with Keyring("test", PASSWORD.encode(), True) as keyring:
+                    keyring.list_secrets()
+    finally:
+        tpm.disable_context_pool()
+    assert calls == {"open": 1, "list": 3, "decrypt": 3}